@@ -0,0 +1,65 @@
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# Set bit positions of every byte value, used to decode bitsets quickly
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Yield the positions of the set bits of a bitset in ascending order"""
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    for byte_index, byte in enumerate(data):
+        if byte:
+            base = byte_index * 8
+            for bit in _BYTE_BITS[byte]:
+                yield base + bit
+
+
+def bits_from_ids(ids: Iterable[int]) -> int:
+    """Build a bitset with the given positions set"""
+    data = bytearray()
+    for doc_id in ids:
+        byte_index = doc_id >> 3
+        if byte_index >= len(data):
+            data.extend(bytes(byte_index + 1 - len(data)))
+        data[byte_index] |= 1 << (doc_id & 7)
+    return int.from_bytes(data, "little")
+
+
+class BitmapIndex:
+    """One bitset per (field, value) pair, using Python ints with bit N = record N"""
+
+    def __init__(self, fields: Iterable[str]):
+        self._bitmaps: Dict[str, Dict[Any, int]] = {field: {} for field in fields}
+        # Every live record
+        self.all = 0
+
+    def add(self, doc_id: int, values: Dict[str, Any]):
+        """Set the record's bit in the bitmap of each of its field values"""
+        bit = 1 << doc_id
+        for field, bitmaps in self._bitmaps.items():
+            value = values.get(field)
+            if value is not None:
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+        self.all |= bit
+
+    def remove(self, doc_id: int, values: Dict[str, Any]):
+        """Clear the record's bit from the bitmaps of the given field values"""
+        bit = 1 << doc_id
+        for field, bitmaps in self._bitmaps.items():
+            value = values.get(field)
+            if value in bitmaps:
+                bitmaps[value] &= ~bit
+                if not bitmaps[value]:
+                    del bitmaps[value]
+        self.all &= ~bit
+
+    def match(self, criteria: Dict[str, Optional[Any]]) -> int:
+        """AND together the bitmaps of every non-None criterion"""
+        mask = self.all
+        for field, value in criteria.items():
+            if value is None:
+                continue
+            mask &= self._bitmaps[field].get(value, 0)
+            if not mask:
+                break
+        return mask
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Bulk import of dinosaur catalogs into PostgreSQL
+
+Rows are read from NDJSON (one object per line) or CSV files, optionally gzipped,
+validated against DinosaurCreate and streamed in batches into a temporary staging
+table with COPY FROM STDIN. They are then merged into dinosaurs with set-based
+INSERTs in the same transaction, so the dataset version and the stats triggers fire
+once per import rather than once per row.
+
+Rows carrying an "id" are upserted on it, the others get a new ID. In CSV files the
+list columns (special_features, interesting_facts, synonyms) hold JSON arrays and
+empty cells are NULL.
+
+Usage: python bulk_import.py catalog.ndjson [--format csv] [--batch-size 10000] [--skip-existing]
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import sys
+import time
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from pydantic import Field, ValidationError
+
+from models import (
+    DinosaurCreate, DinosaurPeriod, DinosaurClade, DinosaurGroup, DinosaurDiet,
+    DinosaurSize, DinosaurLocomotion, DinosaurHabitat, FossilQuality
+)
+
+# Columns loaded from the files, in COPY order
+COLUMNS = tuple(DinosaurCreate.model_fields)
+LIST_COLUMNS = ("special_features", "interesting_facts", "synonyms")
+
+STAGING_TABLE = "dinosaurs_import"
+
+# Validation errors kept in the result; the count of rejected rows is always exact
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportRow(DinosaurCreate):
+    """A catalog row: DinosaurCreate plus the ID to upsert on, if any"""
+    id: Optional[int] = Field(None, gt=0)
+
+
+class ImportResult(NamedTuple):
+    rows_read: int
+    rows_written: int
+    rows_rejected: int
+    errors: List[Tuple[int, str]]
+    seconds: float
+
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def open_source(path: str) -> IO[str]:
+    """Open a catalog file as text, transparently un-gzipping *.gz files"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def detect_format(path: str) -> str:
+    """'csv' or 'ndjson' from a file name"""
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.lower().endswith(".csv") else "ndjson"
+
+
+def read_ndjson(stream: IO[str]) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, raw JSON text) for each non-blank line; it's decoded during validation"""
+    for line_number, line in enumerate(stream, 1):
+        if line.strip():
+            yield line_number, line
+
+
+def read_csv(stream: IO[str]) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, row dict) for each CSV record; empty cells become None"""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        values: Dict[str, Any] = {key: (value if value != "" else None) for key, value in row.items() if key}
+        try:
+            for column in LIST_COLUMNS:
+                if values.get(column) is not None:
+                    values[column] = json.loads(values[column])
+        except ValueError as exc:
+            yield reader.line_num, exc
+            continue
+        yield reader.line_num, values
+
+
+def validate(line_number: int, raw: Any) -> Tuple[Optional[ImportRow], Optional[str]]:
+    """Validate one row (JSON text or dict), or return the reason it was rejected"""
+    if isinstance(raw, Exception):
+        return None, f"line {line_number}: {raw}"
+    try:
+        if isinstance(raw, str):
+            return ImportRow.model_validate_json(raw), None
+        return ImportRow.model_validate(raw), None
+    except ValidationError as exc:
+        problems = "; ".join(
+            f"{'.'.join(map(str, error['loc'])) or 'row'}: {error['msg']}" for error in exc.errors()
+        )
+        return None, f"line {line_number}: {problems}"
+
+
+_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+_NULL = "\\N"
+
+
+def _copy_array(items: List[str]) -> str:
+    elements = ('"' + item.replace("\\", "\\\\").replace('"', '\\"') + '"' for item in items)
+    return ("{" + ",".join(elements) + "}").translate(_ESCAPES)
+
+
+# COPY text-format encoders by value type; enum members map to their pre-encoded value
+_ENCODERS: Dict[type, Callable[[Any], str]] = {
+    type(None): lambda value: _NULL,
+    str: lambda value: value.translate(_ESCAPES),
+    float: repr,
+    int: repr,
+    bool: lambda value: "t" if value else "f",
+    list: _copy_array,
+}
+for _enum in (
+    DinosaurPeriod, DinosaurClade, DinosaurGroup, DinosaurDiet,
+    DinosaurSize, DinosaurLocomotion, DinosaurHabitat, FossilQuality
+):
+    _ENCODERS[_enum] = {member: member.value.translate(_ESCAPES) for member in _enum}.__getitem__
+
+
+def encode_batch(rows: Iterable[Tuple[int, ImportRow]]) -> io.StringIO:
+    """COPY text-format buffer of (line number, row) pairs in (source_line, id, COLUMNS) order"""
+    encoders = _ENCODERS
+    buffer = io.StringIO()
+    for line_number, row in rows:
+        values = row.__dict__
+        fields = [repr(line_number), encoders[type(row.id)](row.id)]
+        for column in COLUMNS:
+            value = values[column]
+            fields.append(encoders[type(value)](value))
+        buffer.write("\t".join(fields))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+def _quoted(columns: Iterable[str]) -> str:
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+def _staging_ddl() -> List[str]:
+    return [
+        f"CREATE TEMP TABLE {STAGING_TABLE} (LIKE dinosaurs) ON COMMIT DROP",
+        # New rows leave the ID to the dinosaurs sequence
+        f"ALTER TABLE {STAGING_TABLE} ALTER COLUMN id DROP NOT NULL",
+        f"ALTER TABLE {STAGING_TABLE} ADD COLUMN source_line bigint",
+    ]
+
+
+def _merge_sql(skip_existing: bool) -> List[str]:
+    """Statements moving the staged rows into dinosaurs; the last row per ID wins"""
+    columns = _quoted(COLUMNS)
+    if skip_existing:
+        conflict = "DO NOTHING"
+    else:
+        conflict = "DO UPDATE SET " + ", ".join(f'"{column}" = excluded."{column}"' for column in COLUMNS)
+    return [
+        f"""
+        INSERT INTO dinosaurs (id, {columns})
+        SELECT DISTINCT ON (id) id, {columns} FROM {STAGING_TABLE}
+        WHERE id IS NOT NULL
+        ORDER BY id, source_line DESC
+        ON CONFLICT (id) {conflict}
+        """,
+        # Explicit IDs bypass the sequence, move it past them before assigning new ones
+        """
+        SELECT setval(pg_get_serial_sequence('dinosaurs', 'id'), max(id))
+        FROM dinosaurs HAVING max(id) IS NOT NULL
+        """,
+        f"""
+        INSERT INTO dinosaurs ({columns})
+        SELECT {columns} FROM {STAGING_TABLE}
+        WHERE id IS NULL
+        ORDER BY source_line
+        """,
+    ]
+
+
+def bulk_import(
+    rows: Iterable[Tuple[int, Any]],
+    batch_size: int = 10000,
+    skip_existing: bool = False,
+    progress: Optional[ProgressCallback] = None,
+    engine=None
+) -> ImportResult:
+    """Validate and load decoded rows (see read_ndjson/read_csv) in a single transaction.
+
+    Invalid rows are rejected and reported, the valid ones are still loaded. With
+    `skip_existing`, rows whose ID already exists are left alone instead of updated.
+    `progress` is called after every batch with (rows read, rows rejected).
+    """
+    if engine is None:
+        from db_config import get_engine
+        engine = get_engine()
+    started = time.perf_counter()
+    rows_read = rows_rejected = rows_written = 0
+    errors: List[Tuple[int, str]] = []
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for statement in _staging_ddl():
+            cursor.execute(statement)
+        copy_sql = f"COPY {STAGING_TABLE} (source_line, id, {_quoted(COLUMNS)}) FROM STDIN"
+
+        batch: List[Tuple[int, ImportRow]] = []
+
+        def flush():
+            cursor.copy_expert(copy_sql, encode_batch(batch))
+            batch.clear()
+            if progress:
+                progress(rows_read, rows_rejected)
+
+        for line_number, raw in rows:
+            rows_read += 1
+            valid, error = validate(line_number, raw)
+            if error:
+                rows_rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append((line_number, error))
+                continue
+            batch.append((line_number, valid))
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+
+        for statement in _merge_sql(skip_existing):
+            cursor.execute(statement)
+            if statement.lstrip().startswith("INSERT"):
+                rows_written += max(cursor.rowcount, 0)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    return ImportResult(rows_read, rows_written, rows_rejected, errors, time.perf_counter() - started)
+
+
+def import_file(path: str, file_format: Optional[str] = None, **options) -> ImportResult:
+    """Bulk import an NDJSON or CSV catalog file (see bulk_import for the options)"""
+    reader = read_csv if (file_format or detect_format(path)) == "csv" else read_ndjson
+    with open_source(path) as stream:
+        return bulk_import(reader(stream), **options)
+
+
+def print_progress(rows_read: int, rows_rejected: int):
+    """Progress callback writing a single updating line to stderr"""
+    sys.stderr.write(f"\r  {rows_read:,} rows read, {rows_rejected:,} rejected")
+    sys.stderr.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import a dinosaur catalog into PostgreSQL")
+    parser.add_argument("path", help="NDJSON or CSV file, optionally .gz")
+    parser.add_argument("--format", choices=("ndjson", "csv"), help="file format (default: from the file name)")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows per COPY batch")
+    parser.add_argument("--skip-existing", action="store_true", help="keep existing rows instead of updating them")
+    args = parser.parse_args()
+
+    print(f"🦕 Importing {args.path}...")
+    result = import_file(
+        args.path,
+        file_format=args.format,
+        batch_size=args.batch_size,
+        skip_existing=args.skip_existing,
+        progress=print_progress
+    )
+    sys.stderr.write("\n")
+    for _, message in result.errors:
+        print(f"  ⚠️  {message}")
+    if result.rows_rejected > len(result.errors):
+        print(f"  ... and {result.rows_rejected - len(result.errors)} more rejected rows")
+    rate = result.rows_read / result.seconds if result.seconds else 0
+    print(
+        f"✅ {result.rows_written:,} rows written, {result.rows_rejected:,} rejected "
+        f"out of {result.rows_read:,} in {result.seconds:.1f}s ({rate:,.0f} rows/s)"
+    )
+    if result.rows_rejected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
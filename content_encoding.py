@@ -0,0 +1,287 @@
+import gzip
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import brotli
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Bodies smaller than this aren't worth a Content-Encoding
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "512"))
+
+# Levels trading CPU for ratio; the defaults suit per-request compression
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+# Memory for compressed bodies of responses that carry an ETag
+COMPRESSED_CACHE_BYTES = int(os.getenv("COMPRESSED_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+# Server preference among codings the client accepts with the same quality
+ENCODINGS = ("zstd", "br", "gzip")
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+_COMPRESS: Dict[str, Callable[[bytes], bytes]] = {
+    "gzip": lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+    "br": lambda body: brotli.compress(body, quality=BROTLI_QUALITY),
+    "zstd": lambda body: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body),
+}
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a whole body with one of ENCODINGS at its configured level"""
+    return _COMPRESS[encoding](body)
+
+
+class StreamCompressor:
+    """Incremental compressor for bodies sent in several chunks"""
+
+    def __init__(self, encoding: str):
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        self._brotli = encoding == "br"
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self._brotli:
+            return self._compressor.process(chunk)
+        return self._compressor.compress(chunk)
+
+    def finish(self) -> bytes:
+        if self._brotli:
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best of ENCODINGS for an Accept-Encoding header, or None for an uncompressed response.
+
+    The highest quality wins, ties go to the server preference; q=0 refuses a coding and
+    * stands for every coding not named.
+    """
+    qualities: Dict[str, float] = {}
+    for coding in (accept_encoding or "").split(","):
+        name, *params = [part.strip() for part in coding.split(";")]
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressedCache:
+    """Byte-bounded LRU of compressed bodies by (ETag, encoding).
+
+    An ETag names one exact body (a dataset version and URL, or the content hash of
+    reference data), so a hit can be sent as is without compressing again.
+    """
+
+    def __init__(self, max_bytes: int = COMPRESSED_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, etag: str, encoding: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get((etag, encoding))
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((etag, encoding))
+            self.hits += 1
+            return body
+
+    def set(self, etag: str, encoding: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop((etag, encoding), None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[(etag, encoding)] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def _weak(etag: str) -> str:
+    # The compressed bytes differ from the identity body, but If-None-Match still matches
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+class CompressionMiddleware:
+    """Compresses JSON, NDJSON and text responses with the best coding the client accepts.
+
+    Whole bodies with an ETag are compressed once and then served from `cache`; streamed
+    bodies are compressed chunk by chunk. Responses that already have a Content-Encoding,
+    aren't 200, or are below `minimum_size` are passed through.
+
+    Every compressible 200 carries Vary: Accept-Encoding, compressed or not. When the request
+    negotiated a coding, its ETag is weak whatever the body size, and so is the ETag of a 304
+    answering it: a 200 and its revalidation always carry the same validator.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE, cache: Optional[CompressedCache] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = cache if cache is not None else CompressedCache()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # HEAD responses have no body to compress, but still get the Vary header
+        encoding = None if scope["method"] == "HEAD" else negotiate(Headers(scope=scope).get("accept-encoding"))
+        await self.app(scope, receive, _Responder(self, encoding, send).send)
+
+
+class _Responder:
+    """Per-request send wrapper: holds the response start until the first body chunk decides"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start: Optional[Message] = None
+        self.mode: Optional[str] = None  # "identity", "whole" or "stream"
+        self.compressor: Optional[StreamCompressor] = None
+        self.chunks = []
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        content_type = headers.get("content-type", "")
+        return (
+            self.start["status"] == 200
+            and "content-encoding" not in headers
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+
+    def _negotiated_headers(self, headers: MutableHeaders):
+        headers.add_vary_header("Accept-Encoding")
+        if self.encoding is not None and "etag" in headers:
+            headers["ETag"] = _weak(headers["etag"])
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            if message["status"] == 304:
+                # The revalidation of a compressible response: same validator and Vary as its 200
+                self._negotiated_headers(MutableHeaders(raw=message["headers"]))
+                self.mode = "identity"
+                await self.downstream(message)
+            return
+        if message["type"] != "http.response.body":
+            await self.downstream(message)
+            return
+
+        if self.mode is None:
+            await self._begin(message)
+        elif self.mode == "whole":
+            self.chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                await self._send_whole(message)
+        elif self.mode == "stream":
+            body = self.compressor.compress(message.get("body", b""))
+            if not message.get("more_body", False):
+                body += self.compressor.finish()
+            if body or not message.get("more_body", False):
+                await self.downstream({**message, "body": body})
+        else:
+            await self.downstream(message)
+
+    async def _begin(self, message: Message):
+        headers = MutableHeaders(raw=self.start["headers"])
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        # A declared length means a whole body, even when it arrives in chunks (e.g. through BaseHTTPMiddleware)
+        length = int(headers["content-length"]) if "content-length" in headers else None
+
+        if not self._compressible(headers):
+            self.mode = "identity"
+        else:
+            self._negotiated_headers(headers)
+            size = length if length is not None else len(body)
+            if self.encoding is None or (length is not None or not more_body) and size < self.middleware.minimum_size:
+                self.mode = "identity"
+
+        if self.mode == "identity":
+            await self.downstream(self.start)
+            await self.downstream(message)
+            return
+
+        if more_body and length is None:
+            self.mode = "stream"
+            self.compressor = StreamCompressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            await self.downstream(self.start)
+            chunk = self.compressor.compress(body)
+            if chunk:
+                await self.downstream({**message, "body": chunk})
+            return
+
+        self.mode = "whole"
+        self.chunks.append(body)
+        if not more_body:
+            await self._send_whole(message)
+
+    async def _send_whole(self, message: Message):
+        headers = MutableHeaders(raw=self.start["headers"])
+        body = b"".join(self.chunks)
+        self.chunks = []
+        etag = headers.get("etag")
+        cache = self.middleware.cache
+        compressed = cache.get(etag, self.encoding) if etag else None
+        if compressed is None:
+            compressed = compress(body, self.encoding)
+            if etag:
+                cache.set(etag, self.encoding, compressed)
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        await self.downstream(self.start)
+        await self.downstream({**message, "body": compressed, "more_body": False})
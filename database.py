@@ -1,14 +1,49 @@
-from typing import List, Optional, Dict, Any
+import heapq
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Iterator, List, Optional, Dict, Any, Tuple
 from models import (
-    Dinosaur, DinosaurPeriod, DinosaurDiet, DinosaurSize, 
+    Dinosaur, DinosaurCreate, DinosaurUpdate, DinosaurPeriod, DinosaurDiet, DinosaurSize, 
     DinosaurClade, DinosaurGroup, DinosaurLocomotion, 
-    DinosaurHabitat, FossilQuality
+    DinosaurHabitat, FossilQuality, DinosaurSortField
+)
+from pagination import Page, decode_cursor, next_cursor
+from query_cache import QueryCache, cached_query
+from search_index import SUBSTRING_FIELDS, InvertedIndex, TrigramIndex
+from bitmap_index import BitmapIndex, iter_bits
+from interval_index import IntervalIndex
+from sorted_index import SortedIndex
+from record_store import DinosaurRecord, RecordStore
+from numeric_columns import NumericColumns
+from running_stats import RunningStats
+
+# Enum fields served from the bitmap index
+CATEGORICAL_FIELDS = ("period", "diet", "size", "clade", "group", "locomotion", "habitat", "fossil_quality")
+
+# Numeric fields kept as NumPy columns, plus the normalized age range ("age_low", "age_high")
+NUMERIC_FIELDS = (
+    "length_meters", "height_meters", "weight_kg", "skull_length_cm",
+    "age_start_mya", "age_end_mya", "discovered_year"
 )
 
 class DinosaurDatabase:
     def __init__(self):
-        self.dinosaurs: Dict[int, Dinosaur] = {}
+        # Compact records, materialized as Dinosaur models only when returned
+        self.records = RecordStore()
         self.next_id = 1
+        self.search_index = InvertedIndex()
+        # Trigrams of the name columns, for the substring fallback of search()
+        self.trigram_index = TrigramIndex(SUBSTRING_FIELDS)
+        self.bitmap_index = BitmapIndex(CATEGORICAL_FIELDS)
+        self.age_index = IntervalIndex()
+        # (name, id) order for name-sorted pages
+        self.name_index = SortedIndex()
+        self.columns = NumericColumns(NUMERIC_FIELDS + ("age_low", "age_high"))
+        self.stats = RunningStats(("period", "diet", "size"), ("length_meters", "weight_kg"))
+        self.version = 1
+        self.last_modified = datetime.now(timezone.utc)
+        # Query results, dropped on every write
+        self.cache = QueryCache()
         self._populate_initial_data()
     
     def _populate_initial_data(self):
@@ -380,10 +415,138 @@ class DinosaurDatabase:
         
         for i, dino_data in enumerate(initial_dinosaurs, 1):
             dinosaur = Dinosaur(id=i, **dino_data)
-            self.dinosaurs[i] = dinosaur
+            self.records.put(dinosaur)
+            self._index(dinosaur)
             
         self.next_id = len(initial_dinosaurs) + 1
     
+    @staticmethod
+    def _age_range(dinosaur: Dinosaur) -> Optional[Tuple[float, float]]:
+        """Age range in Mya, or a single point when only one bound is known"""
+        bounds = [age for age in (dinosaur.age_end_mya, dinosaur.age_start_mya) if age is not None]
+        if not bounds:
+            return None
+        return min(bounds), max(bounds)
+    
+    def _index(self, dinosaur: Dinosaur):
+        """Add a dinosaur to the search, bitmap, age and name indexes, the numeric columns and the running stats"""
+        self.stats.add(dinosaur)
+        self.name_index.add(dinosaur.name, dinosaur.id)
+        self.bitmap_index.add(dinosaur.id, {field: getattr(dinosaur, field) for field in CATEGORICAL_FIELDS})
+        age_range = self._age_range(dinosaur)
+        if age_range:
+            self.age_index.add(dinosaur.id, *age_range)
+        numeric = {field: getattr(dinosaur, field) for field in NUMERIC_FIELDS}
+        numeric["age_low"], numeric["age_high"] = age_range or (None, None)
+        self.columns.set(dinosaur.id, numeric)
+        self.search_index.add(dinosaur.id, {
+            "name": [dinosaur.name],
+            "species": [dinosaur.species],
+            "genus": [dinosaur.genus],
+            "synonyms": dinosaur.synonyms or [],
+            "description": [dinosaur.description],
+            "interesting_facts": dinosaur.interesting_facts or [],
+        })
+        self.trigram_index.add(dinosaur.id, {field: getattr(dinosaur, field) for field in SUBSTRING_FIELDS})
+    
+    def _unindex(self, dinosaur: Dinosaur):
+        """Remove a dinosaur from the search, bitmap, age and name indexes, the numeric columns and the running stats"""
+        self.stats.remove(dinosaur)
+        self.name_index.remove(dinosaur.name, dinosaur.id)
+        self.age_index.remove(dinosaur.id)
+        self.columns.clear(dinosaur.id)
+        self.bitmap_index.remove(dinosaur.id, {field: getattr(dinosaur, field) for field in CATEGORICAL_FIELDS})
+        self.search_index.remove(dinosaur.id)
+        self.trigram_index.remove(dinosaur.id, {field: getattr(dinosaur, field) for field in SUBSTRING_FIELDS})
+    
+    def _touch(self):
+        """Record that the data changed"""
+        self.version += 1
+        self.last_modified = datetime.now(timezone.utc)
+    
+    def _cache_version(self) -> int:
+        return self.version
+    
+    def get_version(self) -> Tuple[int, datetime]:
+        """Get the (version, last modified) of the data; it changes on every write"""
+        return self.version, self.last_modified
+    
+    def create(self, dinosaur_data: DinosaurCreate) -> Dinosaur:
+        """Add a new dinosaur"""
+        dinosaur = Dinosaur(id=self.next_id, **dinosaur_data.model_dump())
+        self.records.put(dinosaur)
+        self._index(dinosaur)
+        self.next_id += 1
+        self._touch()
+        return dinosaur
+    
+    def update(self, dinosaur_id: int, dinosaur_data: DinosaurUpdate) -> Optional[Dinosaur]:
+        """Update an existing dinosaur"""
+        current = self.records.get(dinosaur_id)
+        if not current:
+            return None
+        updated = current.model_copy(update=dinosaur_data.model_dump(exclude_unset=True))
+        self._unindex(current)
+        self.records.put(updated)
+        self._index(updated)
+        self._touch()
+        return updated
+    
+    def delete(self, dinosaur_id: int) -> bool:
+        """Delete a dinosaur"""
+        dinosaur = self.records.pop(dinosaur_id)
+        if not dinosaur:
+            return False
+        self._unindex(dinosaur)
+        self._touch()
+        return True
+    
+    def _match(self,
+                period: Optional[DinosaurPeriod] = None,
+                diet: Optional[DinosaurDiet] = None,
+                size: Optional[DinosaurSize] = None,
+                clade: Optional[DinosaurClade] = None,
+                group: Optional[DinosaurGroup] = None,
+                locomotion: Optional[DinosaurLocomotion] = None,
+                habitat: Optional[DinosaurHabitat] = None,
+                fossil_quality: Optional[FossilQuality] = None,
+                min_length: Optional[float] = None,
+                max_length: Optional[float] = None,
+                min_age: Optional[float] = None,
+                max_age: Optional[float] = None) -> int:
+        """Bitset of the IDs matching every filter"""
+        mask = self.bitmap_index.match({
+            "period": period,
+            "diet": diet,
+            "size": size,
+            "clade": clade,
+            "group": group,
+            "locomotion": locomotion,
+            "habitat": habitat,
+            "fossil_quality": fossil_quality
+        })
+        # Numeric predicates are vectorized over the NumPy columns and folded into the bitset
+        if mask and (min_length is not None or max_length is not None):
+            mask &= self.columns.range_bits("length_meters", min_length, max_length)
+        if mask and (min_age is not None or max_age is not None):
+            # Keep dinosaurs whose age range overlaps [min_age, max_age]
+            if min_age is not None and max_age is not None and min_age > max_age:
+                min_age, max_age = max_age, min_age
+            mask &= self.columns.overlap_bits("age_low", "age_high", min_age, max_age)
+        return mask
+    
+    def _filter(self, after_id: Optional[int] = None, **filters) -> Tuple[Iterator[DinosaurRecord], int]:
+        """Lazily yield records matching the filters (see _match) in ID order, plus their count.
+        
+        `after_id` skips every record up to and including that ID without affecting the count.
+        """
+        mask = self._match(**filters)
+        total = mask.bit_count()
+        if after_id is not None:
+            mask = mask >> (after_id + 1) << (after_id + 1)
+        return self.records.records(iter_bits(mask)), total
+    
+    @cached_query
     def get_all(self, skip: int = 0, limit: int = 100, 
                 period: Optional[DinosaurPeriod] = None,
                 diet: Optional[DinosaurDiet] = None,
@@ -398,89 +561,123 @@ class DinosaurDatabase:
                 min_age: Optional[float] = None,
                 max_age: Optional[float] = None) -> List[Dinosaur]:
         """Get all dinosaurs with comprehensive filtering options"""
-        dinosaurs = list(self.dinosaurs.values())
-        
-        # Make this less DRY?
-        # Apply filters
-        if period:
-            dinosaurs = [d for d in dinosaurs if d.period == period]
-        if diet:
-            dinosaurs = [d for d in dinosaurs if d.diet == diet]
-        if size:
-            dinosaurs = [d for d in dinosaurs if d.size == size]
-        if clade:
-            dinosaurs = [d for d in dinosaurs if d.clade == clade]
-        if group:
-            dinosaurs = [d for d in dinosaurs if d.group == group]
-        if locomotion:
-            dinosaurs = [d for d in dinosaurs if d.locomotion == locomotion]
-        if habitat:
-            dinosaurs = [d for d in dinosaurs if d.habitat == habitat]
-        if fossil_quality:
-            dinosaurs = [d for d in dinosaurs if d.fossil_quality == fossil_quality]
-        if min_length is not None:
-            dinosaurs = [d for d in dinosaurs if d.length_meters and d.length_meters >= min_length]
-        if max_length is not None:
-            dinosaurs = [d for d in dinosaurs if d.length_meters and d.length_meters <= max_length]
-        if min_age is not None:
-            dinosaurs = [d for d in dinosaurs if d.age_end_mya and d.age_end_mya >= min_age]
-        if max_age is not None:
-            dinosaurs = [d for d in dinosaurs if d.age_start_mya and d.age_start_mya <= max_age]
+        dinosaurs, _ = self._filter(
+            period=period, diet=diet, size=size, clade=clade, group=group,
+            locomotion=locomotion, habitat=habitat, fossil_quality=fossil_quality,
+            min_length=min_length, max_length=max_length, min_age=min_age, max_age=max_age
+        )
         
         # Apply pagination
-        return dinosaurs[skip:skip + limit]
+        return self.records.materialize(islice(dinosaurs, skip, skip + limit))
+    
+    @cached_query
+    def get_page(self, skip: int = 0, limit: int = 100,
+                 sort: DinosaurSortField = DinosaurSortField.ID,
+                 cursor: Optional[str] = None,
+                 fields: Optional[Tuple[str, ...]] = None,
+                 **filters) -> Page:
+        """Get one page of dinosaurs, the exact number of matches and the next page cursor.
+        
+        Accepts the same filters as get_all. With a cursor, `skip` is ignored and the page
+        starts right after the cursor position. With `fields` (see projection.parse_fields)
+        the page holds dicts of just those fields. Raises ValueError for an invalid cursor.
+        """
+        position = decode_cursor(cursor, sort) if cursor else None
+        
+        if sort == DinosaurSortField.ID:
+            after_id = position[1] if position else None
+            dinosaurs, total = self._filter(after_id=after_id, **filters)
+            if position:
+                skip = 0
+        else:
+            # Walk the name index from the cursor position, keeping the matches
+            ids = self.name_index.after(position)
+            if any(value is not None for value in filters.values()):
+                matches = set(iter_bits(self._match(**filters)))
+                ids = (doc_id for doc_id in ids if doc_id in matches)
+                total = len(matches)
+            else:
+                total = len(self.records)
+            dinosaurs = self.records.records(ids)
+            if position:
+                skip = 0
+        
+        # Fetch one row more than asked to find out whether another page follows
+        rows = list(islice(dinosaurs, skip, skip + limit + 1))
+        return Page(self.records.project(rows[:limit], fields), total, next_cursor(rows, limit, sort))
+    
+    def export(self, **filters) -> Iterator[Dinosaur]:
+        """Yield every matching dinosaur in ID order, materializing one at a time"""
+        records, _ = self._filter(**filters)
+        for record in records:
+            yield record.to_model()
     
     def get_by_id(self, dinosaur_id: int) -> Optional[Dinosaur]:
         """Get a dinosaur by ID"""
-        return self.dinosaurs.get(dinosaur_id)
+        return self.records.get(dinosaur_id)
     
-    def search(self, query: str) -> List[Dinosaur]:
-        """Search dinosaurs by name, species, or description"""
-        query = query.lower()
-        results = []
-        for dinosaur in self.dinosaurs.values():
-            if (query in dinosaur.name.lower() or 
-                query in dinosaur.species.lower() or 
-                query in dinosaur.genus.lower() or
-                query in dinosaur.description.lower() or
-                any(query in fact.lower() for fact in dinosaur.interesting_facts)):
-                results.append(dinosaur)
-        return results
+    def get_many(self, dinosaur_ids: List[int]) -> List[Optional[Dinosaur]]:
+        """Get dinosaurs by ID, in the given order, None for the missing ones"""
+        return [self.records.get(dinosaur_id) for dinosaur_id in dinosaur_ids]
     
-    def get_stats(self) -> Dict[str, Any]:
-        """Get database statistics"""
-        dinosaurs = list(self.dinosaurs.values())
-        
-        if not dinosaurs:
-            return {
-                "total_dinosaurs": 0,
-                "periods": {},
-                "diets": {},
-                "sizes": {},
-                "average_length": 0,
-                "average_weight": 0
-            }
-        
-        period_counts = {}
-        diet_counts = {}
-        size_counts = {}
-        
-        for dino in dinosaurs:
-            period_counts[dino.period.value] = period_counts.get(dino.period.value, 0) + 1
-            diet_counts[dino.diet.value] = diet_counts.get(dino.diet.value, 0) + 1
-            size_counts[dino.size.value] = size_counts.get(dino.size.value, 0) + 1
-        
-        lengths = [d.length_meters for d in dinosaurs]
-        weights = [d.weight_kg for d in dinosaurs if d.weight_kg is not None]
+    @cached_query
+    def get_alive_at(self, mya: float) -> List[Dinosaur]:
+        """Get dinosaurs alive at the given age in millions of years ago"""
+        return self.records.materialize(self.records.records(self.age_index.alive_at(mya)))
+    
+    @cached_query
+    def get_contemporaries(self, dinosaur_id: int, skip: int = 0, limit: int = 100) -> Optional[List[Dinosaur]]:
+        """Get a page of the dinosaurs whose age range overlaps the given dinosaur's, in ID order,
+        or None if it doesn't exist"""
+        if dinosaur_id not in self.records:
+            return None
+        age_range = self.age_index.get(dinosaur_id)
+        if not age_range:
+            return []
+        ids = (doc_id for doc_id in self.age_index.overlapping(*age_range) if doc_id != dinosaur_id)
+        return self.records.materialize(self.records.records(islice(ids, skip, skip + limit)))
+    
+    @cached_query
+    def search(self, query: str, fields: Optional[Tuple[str, ...]] = None, limit: int = 100) -> List[Any]:
+        """Search dinosaurs by name, species, genus, synonyms, description or facts, the `limit`
+        best matches first.
         
+        With `fields` the results are dicts of just those fields.
+        """
+        hits = self.search_index.search(query, limit)
+        if hits:
+            return self.records.project(self.records.records(doc_id for doc_id, _ in hits), fields)
+        return self.records.project(self._substring_search(query, limit), fields)
+    
+    def _substring_search(self, query: str, limit: int) -> List[DinosaurRecord]:
+        """Case-insensitive substring match on the name columns, most similar first, as the
+        Postgres backend falls back to for queries that match no whole token or prefix"""
+        needle = query.lower()
+        candidates = self.trigram_index.candidates(needle)
+        records = self.records if candidates is None else self.records.records(candidates)
+        matches = [
+            record.id for record in records
+            if any(value and needle in value.lower() for value in (getattr(record, field) for field in SUBSTRING_FIELDS))
+        ]
+        scores = self.trigram_index.similarities(matches, query)
+        best = heapq.nsmallest(limit, matches, key=lambda doc_id: (-scores[doc_id], doc_id))
+        return list(self.records.records(best))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get database statistics from the running totals"""
         return {
-            "total_dinosaurs": len(dinosaurs),
-            "periods": period_counts,
-            "diets": diet_counts,
-            "sizes": size_counts,
-            "average_length": sum(lengths) / len(lengths) if lengths else 0,
-            "average_weight": sum(weights) / len(weights) if weights else 0
+            "total_dinosaurs": self.stats.total,
+            "periods": self.stats.counts("period"),
+            "diets": self.stats.counts("diet"),
+            "sizes": self.stats.counts("size"),
+            "average_length": self.stats.mean("length_meters"),
+            "average_weight": self.stats.mean("weight_kg")
         }
 
+    @cached_query
+    def get_numeric_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Count, mean, min, max, percentiles and histogram of every numeric field"""
+        return {field: self.columns.describe(field) for field in NUMERIC_FIELDS}
+
 # Global database instance
 db = DinosaurDatabase()
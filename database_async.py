@@ -0,0 +1,219 @@
+import asyncio
+import time
+from contextlib import AsyncExitStack
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Dict, Any, Tuple, TypeVar
+from sqlalchemy import insert, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from models import Dinosaur, DinosaurSortField
+from pagination import Page
+from db_config import DinosaurModel, DATASET_VERSION_TTL, DB_INIT_MODES, POOL_SETTINGS, get_async_engine, get_read_router
+from migrations import migrate
+from seed_data import INITIAL_DINOSAURS
+from query_cache import QueryCache, cached_async_query
+import postgres_queries as queries
+
+T = TypeVar("T")
+
+async def _open_connections(engine: AsyncEngine, count: int) -> int:
+    # Held together, so the pool has to open `count` distinct connections; they stay pooled on release
+    async with AsyncExitStack() as stack:
+        connections = await asyncio.gather(*(stack.enter_async_context(engine.connect()) for _ in range(count)))
+        await asyncio.gather(*(connection.execute(text("SELECT 1")) for connection in connections))
+    return count
+
+class AsyncPostgreSQLDinosaurDatabase:
+    """PostgreSQL backend on SQLAlchemy asyncio + asyncpg, mirroring PostgreSQLDinosaurDatabase"""
+    
+    def __init__(self):
+        self._version: Optional[Tuple[int, datetime]] = None
+        self._version_checked_at = 0.0
+        # Query results, dropped whenever the dataset version changes
+        self.cache = QueryCache()
+    
+    async def _read(self, work: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        """Run read-only queries on a read replica when one is healthy (see ReplicaRouter.run)"""
+        return await get_read_router().run(work)
+    
+    async def initialize(self, mode: str = "full") -> Dict[str, float]:
+        """Prepare the database for serving (see db_config.DB_INIT_MODE): apply pending schema
+        migrations, and with "full" seed an empty database too. "skip" touches nothing.
+        
+        Returns the seconds each step took.
+        """
+        if mode not in DB_INIT_MODES:
+            raise ValueError(f"Unknown init mode {mode!r}, expected one of {', '.join(DB_INIT_MODES)}")
+        timings: Dict[str, float] = {}
+        if mode == "skip":
+            return timings
+        async with get_async_engine().begin() as conn:
+            started = time.perf_counter()
+            await conn.run_sync(migrate)
+            timings["migrate"] = time.perf_counter() - started
+            if mode == "full":
+                started = time.perf_counter()
+                count = (await conn.execute(queries.count_query())).scalar_one()
+                if count == 0:
+                    await conn.execute(insert(DinosaurModel), INITIAL_DINOSAURS)
+                timings["seed"] = time.perf_counter() - started
+        return timings
+    
+    async def warm_up(self, connections: int) -> int:
+        """Open up to `connections` pooled connections (at most pool_size) on the primary and on
+        every healthy replica, so that the first requests don't wait for connects.
+        
+        Best effort: returns how many connections were opened.
+        """
+        connections = min(connections, POOL_SETTINGS["pool_size"])
+        if connections <= 0:
+            return 0
+        engines = [get_async_engine()] + [replica.engine for replica in get_read_router().healthy()]
+        opened = await asyncio.gather(*(_open_connections(engine, connections) for engine in engines), return_exceptions=True)
+        return sum(count for count in opened if isinstance(count, int))
+    
+    async def ping(self, timeout: float) -> bool:
+        """Run SELECT 1 on a pooled connection; False if that fails or takes longer than `timeout` seconds"""
+        async def select_one():
+            async with get_async_engine().connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        try:
+            await asyncio.wait_for(select_one(), timeout)
+            return True
+        except Exception:
+            return False
+    
+    @cached_async_query
+    async def get_all(self, skip: int = 0, limit: int = 100, **filters) -> List[Dinosaur]:
+        """Get all dinosaurs with filtering and pagination (see postgres_queries.apply_filters)"""
+        async def read(db: AsyncSession) -> List[Dinosaur]:
+            dino_models = (await db.execute(queries.all_query(skip, limit, **filters))).scalars().all()
+            return [queries.model_to_pydantic(dino) for dino in dino_models]
+        return await self._read(read)
+    
+    @cached_async_query
+    async def get_page(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        sort: DinosaurSortField = DinosaurSortField.ID,
+        cursor: Optional[str] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+        **filters
+    ) -> Page:
+        """Get one page of dinosaurs, the exact number of matches and the next page cursor.
+        
+        Accepts the same filters as get_all. With `fields` (see projection.parse_fields) only
+        those columns are read and the page holds dicts. Raises ValueError for an invalid cursor.
+        """
+        async def read(db: AsyncSession) -> Page:
+            rows = (await db.execute(queries.page_query(skip, limit, sort, cursor, fields, **filters))).all()
+            total = None
+            if queries.needs_total_query(rows, skip, cursor):
+                total = (await db.execute(queries.count_query(**filters))).scalar_one()
+            return queries.rows_to_page(rows, limit, sort, total, fields)
+        return await self._read(read)
+    
+    async def export(self, **filters) -> AsyncIterator[Dinosaur]:
+        """Stream every matching dinosaur in ID order through a server-side cursor.
+        
+        Like the other reads, it moves to the primary when its replica is lost, but only
+        before the first row: a partly sent export can't be resumed.
+        """
+        stmt = queries.export_query(**filters).execution_options(yield_per=queries.EXPORT_BATCH_SIZE)
+        router = get_read_router()
+        session = router.read_session()
+        started = False
+        try:
+            async with session:
+                async for dino_model in await session.stream_scalars(stmt):
+                    started = True
+                    yield queries.model_to_pydantic(dino_model)
+            return
+        except (DBAPIError, OSError) as exc:
+            if started or not router.lost_replica(session, exc):
+                raise
+        async with router.primary_session() as session:
+            async for dino_model in await session.stream_scalars(stmt):
+                yield queries.model_to_pydantic(dino_model)
+    
+    @cached_async_query
+    async def get_by_id(self, dinosaur_id: int) -> Optional[Dinosaur]:
+        """Get a dinosaur by ID"""
+        async def read(db: AsyncSession) -> Optional[Dinosaur]:
+            dino_model = (await db.execute(queries.by_id_query(dinosaur_id))).scalars().first()
+            if dino_model:
+                return queries.model_to_pydantic(dino_model)
+            return None
+        return await self._read(read)
+    
+    @cached_async_query
+    async def get_many(self, dinosaur_ids: List[int]) -> List[Optional[Dinosaur]]:
+        """Get dinosaurs by ID in one query, in the given order, None for the missing ones"""
+        async def read(db: AsyncSession) -> List[Optional[Dinosaur]]:
+            dino_models = (await db.execute(queries.by_ids_query(dinosaur_ids))).scalars().all()
+            return queries.in_request_order(dinosaur_ids, [queries.model_to_pydantic(dino) for dino in dino_models])
+        return await self._read(read)
+    
+    @cached_async_query
+    async def get_alive_at(self, mya: float) -> List[Dinosaur]:
+        """Get dinosaurs alive at the given age in millions of years ago"""
+        async def read(db: AsyncSession) -> List[Dinosaur]:
+            dino_models = (await db.execute(queries.alive_at_query(mya))).scalars().all()
+            return [queries.model_to_pydantic(dino) for dino in dino_models]
+        return await self._read(read)
+    
+    @cached_async_query
+    async def get_contemporaries(self, dinosaur_id: int, skip: int = 0, limit: int = 100) -> Optional[List[Dinosaur]]:
+        """Get a page of the dinosaurs whose age range overlaps the given dinosaur's, in ID order,
+        or None if it doesn't exist"""
+        async def read(db: AsyncSession) -> Optional[List[Dinosaur]]:
+            bounds = (await db.execute(queries.age_bounds_query(dinosaur_id))).first()
+            if bounds is None:
+                return None
+            stmt = queries.contemporaries_query(dinosaur_id, bounds, skip, limit)
+            if stmt is None:
+                return []
+            return [queries.model_to_pydantic(dino) for dino in (await db.execute(stmt)).scalars()]
+        return await self._read(read)
+    
+    @cached_async_query
+    async def search(self, query: str, fields: Optional[Tuple[str, ...]] = None, limit: int = 100) -> List[Any]:
+        """Search dinosaurs by name, species, genus, synonyms, description or facts, the `limit`
+        best matches first.
+        
+        With `fields` only those columns are read and the results are dicts.
+        """
+        async def read(db: AsyncSession) -> List[Any]:
+            rows = (await db.execute(queries.search_query(query, fields, limit))).all()
+            if not rows:
+                # Fall back to trigram-indexed substring matching on the short name columns
+                rows = (await db.execute(queries.substring_search_query(query, fields, limit))).all()
+            return queries.to_dinosaurs(rows, fields)
+        return await self._read(read)
+    
+    async def _cache_version(self) -> int:
+        return (await self.get_version())[0]
+    
+    async def get_version(self) -> Tuple[int, datetime]:
+        """Get the (version, last modified) of the dinosaurs data.
+        
+        The value is cached for DATASET_VERSION_TTL seconds, so most calls don't touch the database.
+        """
+        now = time.monotonic()
+        if self._version is None or now - self._version_checked_at >= DATASET_VERSION_TTL:
+            # From the primary: a lagging replica would hand out validators of data already replaced
+            async with get_async_engine().connect() as conn:
+                self._version = tuple((await conn.execute(queries.version_query())).one())
+            self._version_checked_at = now
+        return self._version
+    
+    @cached_async_query
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get database statistics from the dinosaur_stats summary table"""
+        async def read(db: AsyncSession) -> Dict[str, Any]:
+            return queries.build_stats((await db.execute(queries.stats_query())).scalars().all())
+        return await self._read(read)
+
+# Global database instance; call initialize() once before serving
+db = AsyncPostgreSQLDinosaurDatabase()
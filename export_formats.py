@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Union
+
+from fast_json import DINOSAUR
+from models import Dinosaur, ExportFormat
+
+# Column order of CSV exports; list columns hold JSON arrays, as bulk_import expects
+CSV_COLUMNS = tuple(Dinosaur.model_fields)
+LIST_COLUMNS = ("special_features", "interesting_facts", "synonyms")
+
+# Rows encoded per chunk handed to the response
+CHUNK_ROWS = 500
+
+# Backend export streams: async from the PostgreSQL API backend, sync from the in-memory
+# and sync PostgreSQL backends
+Dinosaurs = Union[AsyncIterable[Dinosaur], Iterable[Dinosaur]]
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+
+async def _rows(dinosaurs: Dinosaurs) -> AsyncIterator[Dinosaur]:
+    if isinstance(dinosaurs, AsyncIterable):
+        async for dinosaur in dinosaurs:
+            yield dinosaur
+    else:
+        for dinosaur in dinosaurs:
+            yield dinosaur
+
+
+def _csv_cells(dinosaur: Dinosaur) -> List[str]:
+    row = dinosaur.model_dump(mode="json")
+    for column in LIST_COLUMNS:
+        if row[column] is not None:
+            row[column] = json.dumps(row[column], ensure_ascii=False)
+    return ["" if row[column] is None else row[column] for column in CSV_COLUMNS]
+
+
+async def encode_ndjson(dinosaurs: Dinosaurs) -> AsyncIterator[bytes]:
+    """One JSON document per line, in the same shape as the API responses"""
+    chunk = []
+    async for dinosaur in _rows(dinosaurs):
+        chunk.append(DINOSAUR.dump_json(dinosaur))
+        if len(chunk) >= CHUNK_ROWS:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
+
+
+async def encode_csv(dinosaurs: Dinosaurs) -> AsyncIterator[bytes]:
+    """CSV with a header row; None is an empty cell"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    rows = 0
+    async for dinosaur in _rows(dinosaurs):
+        writer.writerow(_csv_cells(dinosaur))
+        rows += 1
+        if rows % CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+ENCODERS = {
+    ExportFormat.NDJSON: encode_ndjson,
+    ExportFormat.CSV: encode_csv,
+}
@@ -0,0 +1,65 @@
+import math
+import os
+from functools import lru_cache
+from typing import Any, List, Tuple, get_args
+
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import Response
+
+from models import Dinosaur, DinosaurResponse
+
+# Opt-in: serialize validated models straight to JSON bytes instead of going through
+# FastAPI's response_model validation and the stdlib json encoder
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+
+DINOSAUR = TypeAdapter(Dinosaur)
+DINOSAUR_LIST = TypeAdapter(List[Dinosaur])
+DINOSAUR_RESPONSE = TypeAdapter(DinosaurResponse)
+
+
+class PydanticJSONResponse(Response):
+    """JSON response whose body was already encoded by pydantic-core"""
+    media_type = "application/json"
+
+
+def _may_hold_floats(annotation: Any) -> bool:
+    if annotation is float:
+        return True
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return True
+    return any(_may_hold_floats(arg) for arg in get_args(annotation))
+
+
+@lru_cache(maxsize=None)
+def _float_fields(model: type) -> Tuple[str, ...]:
+    """Fields of a model that can hold floats, directly or in nested models"""
+    return tuple(name for name, field in model.model_fields.items() if _may_hold_floats(field.annotation))
+
+
+def _same_float_spelling(value: float) -> bool:
+    # Inside [1e-4, 1e16) both encoders print the shortest round-trip digits in positional
+    # notation; outside it the exponents differ (1e16 vs 1e+16, 1e-5 vs 1e-05)
+    return value == 0.0 or (math.isfinite(value) and 1e-4 <= abs(value) < 1e16)
+
+
+def encodes_identically(value: Any) -> bool:
+    """Whether pydantic-core encodes `value` byte for byte like FastAPI's default encoder"""
+    if isinstance(value, float):
+        return _same_float_spelling(value)
+    if isinstance(value, BaseModel):
+        return all(encodes_identically(getattr(value, name)) for name in _float_fields(type(value)))
+    if isinstance(value, (list, tuple)):
+        return all(encodes_identically(item) for item in value)
+    return True
+
+
+def respond(adapter: TypeAdapter, value: Any) -> Any:
+    """Return `value` for FastAPI to serialize, or with FAST_JSON its encoded JSON directly.
+
+    The encoded form matches FastAPI's (same field names, order and compact separators).
+    Values holding a float the two encoders would spell differently (outside [1e-4, 1e16),
+    or not finite) go through FastAPI's encoder, so the output is always identical.
+    """
+    if not FAST_JSON or not encodes_identically(value):
+        return value
+    return PydanticJSONResponse(adapter.dump_json(value, by_alias=True))
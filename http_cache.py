@@ -0,0 +1,89 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+VersionGetter = Callable[[], Awaitable[Tuple[int, datetime]]]
+
+
+def make_etag(version: int, request: Request) -> str:
+    """Strong ETag from the dataset version and the normalized path + query"""
+    query = urlencode(sorted(request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{request.url.path}?{query}".encode()).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag ("*" is handled by the middleware)"""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: datetime) -> bool:
+    """Whether the data hasn't changed since an If-Modified-Since date"""
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have one second resolution
+    return last_modified.replace(microsecond=0) <= since
+
+
+class ConditionalCacheMiddleware(BaseHTTPMiddleware):
+    """Adds ETag/Last-Modified/Cache-Control to GET responses and answers revalidations with 304.
+
+    The validators only depend on the dataset version and the request URL, so a matching
+    If-None-Match is answered before the route (and the database) is reached. The exception
+    is "If-None-Match: *", which only matches when there is a current representation: the
+    route runs, and the 304 replaces its response only if that is a 2xx.
+    """
+
+    def __init__(self, app, get_version: VersionGetter, paths: Sequence[str], max_age: int = 60):
+        super().__init__(app)
+        self.get_version = get_version
+        self.paths = tuple(paths)
+        self.cache_control = f"public, max-age={max_age}"
+
+    def _cacheable(self, request: Request) -> bool:
+        path = request.url.path
+        return request.method in ("GET", "HEAD") and any(
+            path == prefix or path.startswith(prefix.rstrip("/") + "/") for prefix in self.paths
+        )
+
+    async def dispatch(self, request: Request, call_next):
+        if not self._cacheable(request):
+            return await call_next(request)
+
+        version, last_modified = await self.get_version()
+        headers = {
+            "ETag": make_etag(version, request),
+            "Last-Modified": format_datetime(last_modified.astimezone(timezone.utc), usegmt=True),
+            "Cache-Control": self.cache_control,
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None and if_none_match.strip() == "*":
+            response = await call_next(request)
+            if not 200 <= response.status_code < 300:
+                return response
+            async for _ in response.body_iterator:
+                pass
+            return Response(status_code=304, headers=headers)
+        if etag_matches(if_none_match, headers["ETag"]) or (
+            if_none_match is None and not_modified_since(request.headers.get("if-modified-since"), last_modified)
+        ):
+            return Response(status_code=304, headers=headers)
+
+        response = await call_next(request)
+        if response.status_code == 200:
+            response.headers.update(headers)
+        return response
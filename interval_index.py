@@ -0,0 +1,153 @@
+import math
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+
+Interval = Tuple[float, float, int]
+
+_LAST = float("inf")
+
+
+class _Node:
+    """Centered interval tree node holding every interval that contains its center"""
+
+    __slots__ = ("center", "by_low", "by_high", "left", "right")
+
+    def __init__(self, intervals: List[Interval]):
+        endpoints = sorted(point for low, high, _ in intervals for point in (low, high))
+        self.center = endpoints[len(endpoints) // 2]
+
+        here, left, right = [], [], []
+        for interval in intervals:
+            low, high, _ = interval
+            if high < self.center:
+                left.append(interval)
+            elif low > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+
+        # (low, id) ascending and (-high, id) ascending, so both can be bisected and updated in place
+        self.by_low = sorted((low, doc_id) for low, _, doc_id in here)
+        self.by_high = sorted((-high, doc_id) for _, high, doc_id in here)
+        self.left = _Node(left) if left else None
+        self.right = _Node(right) if right else None
+
+    def insert(self, low: float, high: float, doc_id: int):
+        insort(self.by_low, (low, doc_id))
+        insort(self.by_high, (-high, doc_id))
+
+    def delete(self, low: float, high: float, doc_id: int):
+        del self.by_low[bisect_left(self.by_low, (low, doc_id))]
+        del self.by_high[bisect_left(self.by_high, (-high, doc_id))]
+
+
+class IntervalIndex:
+    """Interval tree over [low, high] ranges answering overlap queries in O(log N + k).
+
+    The tree is built on the first query and then updated in place: a range goes to the node
+    whose center it contains, or to a new leaf. It is only rebuilt when inserts have made it
+    much deeper than a balanced tree, and then at most once per N/8 writes.
+    """
+
+    def __init__(self):
+        self._intervals: Dict[int, Tuple[float, float]] = {}
+        self._root: Optional[_Node] = None
+        # Ranges loaded before the first query are built into a balanced tree in one go
+        self._dirty = True
+        self._writes = 0
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def add(self, doc_id: int, low: float, high: float):
+        """Index a closed range"""
+        if low > high:
+            low, high = high, low
+        self.remove(doc_id)
+        self._intervals[doc_id] = (low, high)
+        if self._dirty:
+            return
+        if self._root is None:
+            self._root = _Node([(low, high, doc_id)])
+            return
+
+        node, depth = self._root, 1
+        while True:
+            if high < node.center:
+                child = node.left
+                if child is None:
+                    node.left = _Node([(low, high, doc_id)])
+                    break
+            elif low > node.center:
+                child = node.right
+                if child is None:
+                    node.right = _Node([(low, high, doc_id)])
+                    break
+            else:
+                node.insert(low, high, doc_id)
+                break
+            node, depth = child, depth + 1
+
+        self._writes += 1
+        if depth > 2 * math.log2(len(self._intervals)) + 8 and self._writes * 8 >= len(self._intervals):
+            self._dirty = True
+
+    def remove(self, doc_id: int):
+        """Drop a range from the index"""
+        interval = self._intervals.pop(doc_id, None)
+        if interval is None or self._dirty:
+            return
+        low, high = interval
+        node = self._root
+        while not low <= node.center <= high:
+            node = node.left if high < node.center else node.right
+        node.delete(low, high, doc_id)
+        self._writes += 1
+
+    def get(self, doc_id: int) -> Optional[Tuple[float, float]]:
+        """Return the indexed range of a document"""
+        return self._intervals.get(doc_id)
+
+    def _tree(self) -> Optional[_Node]:
+        if self._dirty:
+            intervals = [(low, high, doc_id) for doc_id, (low, high) in self._intervals.items()]
+            self._root = _Node(intervals) if intervals else None
+            self._dirty = False
+            self._writes = 0
+        return self._root
+
+    def overlapping(self, low: Optional[float] = None, high: Optional[float] = None) -> List[int]:
+        """Ids of every range overlapping [low, high]; a None bound is unbounded"""
+        low = float("-inf") if low is None else low
+        high = float("inf") if high is None else high
+        if low > high:
+            low, high = high, low
+        results: List[int] = []
+        node = self._tree()
+        stack = [node] if node else []
+        while stack:
+            node = stack.pop()
+            if high < node.center:
+                # Ranges here reach the center, so they overlap iff they start before `high`
+                count = bisect_right(node.by_low, (high, _LAST))
+                results.extend(doc_id for _, doc_id in node.by_low[:count])
+                if node.left:
+                    stack.append(node.left)
+            elif low > node.center:
+                # Ranges here start before the center, so they overlap iff they end after `low`
+                count = bisect_right(node.by_high, (-low, _LAST))
+                results.extend(doc_id for _, doc_id in node.by_high[:count])
+                if node.right:
+                    stack.append(node.right)
+            else:
+                results.extend(doc_id for _, doc_id in node.by_low)
+                if node.left:
+                    stack.append(node.left)
+                if node.right:
+                    stack.append(node.right)
+        results.sort()
+        return results
+
+    def alive_at(self, point: float) -> List[int]:
+        """Ids of every range containing the point"""
+        return self.overlapping(point, point)
@@ -1,12 +1,71 @@
-from fastapi import FastAPI, HTTPException, Query, Path
+from startup_clock import IMPORT_STARTED
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Query, Path, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, List
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Any, Dict, Optional, List
 from models import (
     Dinosaur, DinosaurResponse, DinosaurPeriod, DinosaurDiet, DinosaurSize,
     DinosaurClade, DinosaurGroup, DinosaurLocomotion, DinosaurHabitat,
-    FossilQuality, ErrorResponse
+    FossilQuality, DinosaurSortField, ExportFormat, ErrorResponse,
+    DinosaurBatchRequest, DinosaurBatchResponse, BATCH_MAX_IDS
+)
+from database_async import db
+from db_config import (
+    DB_INIT_MODE, DB_POOL_WARMUP, REPLICA_CHECK_INTERVAL, async_pool_saturation, get_read_router, pool_status
 )
-from database_postgres import db
+from http_cache import ConditionalCacheMiddleware
+from content_encoding import CompressedCache, CompressionMiddleware
+from reference_data import REFERENCE, reference_response
+from fast_json import DINOSAUR, DINOSAUR_LIST, DINOSAUR_RESPONSE, respond
+from export_formats import ENCODERS, MEDIA_TYPES
+from projection import FIELDS, parse_fields
+
+# Readiness probe settings: how long SELECT 1 may take, and the pool usage above which
+# the instance stops taking traffic
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "1"))
+HEALTH_MAX_POOL_SATURATION = float(os.getenv("HEALTH_MAX_POOL_SATURATION", "1"))
+
+FIELDS_DESCRIPTION = (
+    "Comma separated fields to return, e.g. name,period,size (id is always included). "
+    f"One of: {', '.join(FIELDS)}"
+)
+
+# Seconds each startup phase took in this worker, reported at /metrics/startup
+STARTUP: Dict[str, Any] = {}
+
+# uvicorn's error logger is the one its default config prints at INFO
+logger = logging.getLogger("uvicorn.error")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare the database (per DB_INIT_MODE), check the read replicas and warm up the pools
+    before serving requests; health check the replicas while serving"""
+    started = time.perf_counter()
+    seconds = {"import": started - IMPORT_STARTED}
+    seconds.update(await db.initialize(DB_INIT_MODE))
+    phase = time.perf_counter()
+    read_router = get_read_router()
+    await read_router.check()
+    seconds["replica_check"] = time.perf_counter() - phase
+    phase = time.perf_counter()
+    warmed = await db.warm_up(DB_POOL_WARMUP)
+    seconds["warm_up"] = time.perf_counter() - phase
+    seconds["startup"] = time.perf_counter() - started
+    STARTUP.update(mode=DB_INIT_MODE, connections_warmed=warmed, seconds=seconds)
+    logger.info(
+        "Startup (%s): %s", DB_INIT_MODE, ", ".join(f"{name} {value * 1000:.0f} ms" for name, value in seconds.items())
+    )
+    monitor = asyncio.create_task(read_router.monitor(REPLICA_CHECK_INTERVAL))
+    try:
+        yield
+    finally:
+        monitor.cancel()
 
 # Create FastAPI app with metadata
 app = FastAPI(
@@ -20,10 +79,24 @@ app = FastAPI(
     license_info={
         "name": "MIT",
         "url": "https://opensource.org/licenses/MIT",
-    }
+    },
+    lifespan=lifespan
 )
 
-# Add CORS middleware to allow frontend connections
+# Data endpoints are versioned by the dataset, so clients and CDNs may cache them.
+# Reference endpoints carry their own content ETags (see reference_data).
+app.add_middleware(
+    ConditionalCacheMiddleware,
+    get_version=db.get_version,
+    paths=["/dinosaurs", "/stats"],
+    max_age=int(os.getenv("CACHE_MAX_AGE", "60"))
+)
+
+# Negotiated gzip/br/zstd; bodies with an ETag are compressed once and kept compressed
+compressed_cache = CompressedCache()
+app.add_middleware(CompressionMiddleware, cache=compressed_cache)
+
+# Add CORS middleware to allow frontend connections (outermost, so 304s carry CORS headers too)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # In production, replace with specific domains
@@ -49,7 +122,10 @@ async def root():
         ],
         "endpoints": {
             "get_all_dinosaurs": "/dinosaurs",
+            "get_dinosaurs_batch": "/dinosaurs/batch?ids=1,2,3",
+            "export_dinosaurs": "/dinosaurs/export",
             "get_dinosaur_by_id": "/dinosaurs/{id}",
+            "get_contemporaries": "/dinosaurs/{id}/contemporaries",
             "search_dinosaurs": "/dinosaurs/search",
             "get_statistics": "/stats",
             "get_periods": "/periods",
@@ -58,14 +134,12 @@ async def root():
             "get_diets": "/diets",
             "get_sizes": "/sizes",
             "get_locomotion_types": "/locomotion",
-            "get_habitats": "/habitats"
+            "get_habitats": "/habitats",
+            "get_reference_data": "/reference"
         }
     }
 
-@app.get("/dinosaurs", response_model=DinosaurResponse, tags=["Dinosaurs"])
-async def get_dinosaurs(
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+def dinosaur_filters(
     period: Optional[DinosaurPeriod] = Query(None, description="Filter by geological period"),
     diet: Optional[DinosaurDiet] = Query(None, description="Filter by diet type"),
     size: Optional[DinosaurSize] = Query(None, description="Filter by size category"),
@@ -76,46 +150,96 @@ async def get_dinosaurs(
     fossil_quality: Optional[FossilQuality] = Query(None, description="Filter by fossil quality"),
     min_length: Optional[float] = Query(None, ge=0, description="Minimum length in meters"),
     max_length: Optional[float] = Query(None, ge=0, description="Maximum length in meters"),
-    min_age: Optional[float] = Query(None, ge=0, description="Minimum age in millions of years ago"),
-    max_age: Optional[float] = Query(None, ge=0, description="Maximum age in millions of years ago")
+    min_age: Optional[float] = Query(None, ge=0, description="Lower bound of an age window in millions of years ago; matches dinosaurs whose age range overlaps it"),
+    max_age: Optional[float] = Query(None, ge=0, description="Upper bound of an age window in millions of years ago; matches dinosaurs whose age range overlaps it")
+) -> Dict[str, Any]:
+    """Filter query parameters shared by the listing and export endpoints"""
+    return {
+        "period": period,
+        "diet": diet,
+        "size": size,
+        "clade": clade,
+        "group": group,
+        "locomotion": locomotion,
+        "habitat": habitat,
+        "fossil_quality": fossil_quality,
+        "min_length": min_length,
+        "max_length": max_length,
+        "min_age": min_age,
+        "max_age": max_age
+    }
+
+@app.get("/dinosaurs", response_model=DinosaurResponse, tags=["Dinosaurs"])
+async def get_dinosaurs(
+    skip: int = Query(0, ge=0, description="Number of records to skip (ignored when a cursor is given)"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+    sort: DinosaurSortField = Query(DinosaurSortField.ID, description="Sort order of the results"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    filters: Dict[str, Any] = Depends(dinosaur_filters)
 ):
     """Get all dinosaurs with comprehensive filtering and pagination options"""
-    dinosaurs = db.get_all(
-        skip=skip, 
-        limit=limit, 
-        period=period, 
-        diet=diet, 
-        size=size,
-        clade=clade,
-        group=group,
-        locomotion=locomotion,
-        habitat=habitat,
-        fossil_quality=fossil_quality,
-        min_length=min_length,
-        max_length=max_length,
-        min_age=min_age,
-        max_age=max_age
-    )
-    total = len(db.get_all(
-        period=period, 
-        diet=diet, 
-        size=size,
-        clade=clade,
-        group=group,
-        locomotion=locomotion,
-        habitat=habitat,
-        fossil_quality=fossil_quality,
-        min_length=min_length,
-        max_length=max_length,
-        min_age=min_age,
-        max_age=max_age
-    ))
+    try:
+        projection = parse_fields(fields)
+        page = await db.get_page(skip=skip, limit=limit, sort=sort, cursor=cursor, fields=projection, **filters)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     
-    return DinosaurResponse(
-        dinosaurs=dinosaurs,
-        total=total,
-        page=skip // limit + 1,
-        per_page=limit
+    response = {
+        "dinosaurs": page.dinosaurs,
+        "total": page.total,
+        "page": 1 if cursor else skip // limit + 1,
+        "per_page": limit,
+        "next_cursor": page.next_cursor
+    }
+    if projection:
+        # Partial dinosaurs are already JSON-ready and wouldn't validate as Dinosaur
+        return JSONResponse(response)
+    return respond(DINOSAUR_RESPONSE, DinosaurResponse(**response))
+
+async def batch_response(dinosaur_ids: List[int]) -> DinosaurBatchResponse:
+    """Look up a list of IDs with a single storage call"""
+    dinosaurs = await db.get_many(dinosaur_ids)
+    not_found = list(dict.fromkeys(
+        dinosaur_id for dinosaur_id, dinosaur in zip(dinosaur_ids, dinosaurs) if dinosaur is None
+    ))
+    return DinosaurBatchResponse(dinosaurs=dinosaurs, not_found=not_found)
+
+# Declared before /dinosaurs/{dinosaur_id} so "batch" isn't taken for an ID
+@app.get("/dinosaurs/batch", response_model=DinosaurBatchResponse, tags=["Dinosaurs"])
+async def get_dinosaurs_batch(
+    ids: List[str] = Query(..., description="Dinosaur IDs, comma separated and/or repeated (ids=1,2&ids=3)")
+):
+    """Get several dinosaurs by ID in one request, in request order, with null for unknown IDs"""
+    try:
+        dinosaur_ids = [int(part) for value in ids for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be integers")
+    if not dinosaur_ids or len(dinosaur_ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {BATCH_MAX_IDS} ids are required")
+    return await batch_response(dinosaur_ids)
+
+@app.post("/dinosaurs/batch", response_model=DinosaurBatchResponse, tags=["Dinosaurs"])
+async def post_dinosaurs_batch(request: DinosaurBatchRequest):
+    """Get several dinosaurs by ID, for lists too long for a query string"""
+    return await batch_response(request.ids)
+
+# Declared before /dinosaurs/{dinosaur_id} so "export" isn't taken for an ID
+@app.get(
+    "/dinosaurs/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}}},
+    tags=["Dinosaurs"]
+)
+async def export_dinosaurs(
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="Output format"),
+    filters: Dict[str, Any] = Depends(dinosaur_filters)
+):
+    """Stream every dinosaur matching the filters, in ID order, as NDJSON or CSV"""
+    return StreamingResponse(
+        ENCODERS[format](db.export(**filters)),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="dinosaurs.{format.value}"'}
     )
 
 @app.get("/dinosaurs/{dinosaur_id}", response_model=Dinosaur, tags=["Dinosaurs"])
@@ -123,26 +247,49 @@ async def get_dinosaur(
     dinosaur_id: int = Path(..., description="The ID of the dinosaur to retrieve", gt=0)
 ):
     """Get a specific dinosaur by ID"""
-    dinosaur = db.get_by_id(dinosaur_id)
+    dinosaur = await db.get_by_id(dinosaur_id)
     if not dinosaur:
         raise HTTPException(
             status_code=404, 
             detail=f"Dinosaur with ID {dinosaur_id} not found"
         )
-    return dinosaur
+    return respond(DINOSAUR, dinosaur)
+
+@app.get("/dinosaurs/{dinosaur_id}/contemporaries", response_model=List[Dinosaur], tags=["Dinosaurs"])
+async def get_contemporaries(
+    dinosaur_id: int = Path(..., description="The ID of the dinosaur whose contemporaries to retrieve", gt=0),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return")
+):
+    """Get dinosaurs whose geological age range overlaps the given dinosaur's, in ID order"""
+    contemporaries = await db.get_contemporaries(dinosaur_id, skip=skip, limit=limit)
+    if contemporaries is None:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Dinosaur with ID {dinosaur_id} not found"
+        )
+    return respond(DINOSAUR_LIST, contemporaries)
 
 @app.get("/dinosaurs/search/", response_model=List[Dinosaur], tags=["Search"])
 async def search_dinosaurs(
-    q: str = Query(..., description="Search query for dinosaur names, species, or descriptions", min_length=1)
+    q: str = Query(..., description="Search query for dinosaur names, species, or descriptions", min_length=1),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of results to return"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """Search dinosaurs by name, species, or description"""
-    results = db.search(q)
-    return results
+    try:
+        projection = parse_fields(fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    results = await db.search(q, fields=projection, limit=limit)
+    if projection:
+        return JSONResponse(results)
+    return respond(DINOSAUR_LIST, results)
 
 @app.get("/stats", tags=["Statistics"])
 async def get_statistics():
     """Get database statistics and insights"""
-    stats = db.get_stats()
+    stats = await db.get_stats()
     return {
         "database_stats": stats,
         "api_info": {
@@ -154,46 +301,101 @@ async def get_statistics():
     }
 
 @app.get("/periods", response_model=List[str], tags=["Reference Data"])
-async def get_periods():
+async def get_periods(request: Request):
     """Get all available geological periods"""
-    return [period.value for period in DinosaurPeriod]
+    return reference_response(request, REFERENCE["periods"])
 
 @app.get("/clades", response_model=List[str], tags=["Reference Data"])
-async def get_clades():
+async def get_clades(request: Request):
     """Get all available dinosaur clades"""
-    return [clade.value for clade in DinosaurClade]
+    return reference_response(request, REFERENCE["clades"])
 
 @app.get("/groups", response_model=List[str], tags=["Reference Data"])
-async def get_groups():
+async def get_groups(request: Request):
     """Get all available taxonomic groups"""
-    return [group.value for group in DinosaurGroup]
+    return reference_response(request, REFERENCE["groups"])
 
 @app.get("/diets", response_model=List[str], tags=["Reference Data"])
-async def get_diets():
+async def get_diets(request: Request):
     """Get all available diet types"""
-    return [diet.value for diet in DinosaurDiet]
+    return reference_response(request, REFERENCE["diets"])
 
 @app.get("/sizes", response_model=List[str], tags=["Reference Data"])
-async def get_sizes():
+async def get_sizes(request: Request):
     """Get all available size categories"""
-    return [size.value for size in DinosaurSize]
+    return reference_response(request, REFERENCE["sizes"])
 
 @app.get("/locomotion", response_model=List[str], tags=["Reference Data"])
-async def get_locomotion_types():
+async def get_locomotion_types(request: Request):
     """Get all available locomotion types"""
-    return [locomotion.value for locomotion in DinosaurLocomotion]
+    return reference_response(request, REFERENCE["locomotion"])
 
 @app.get("/habitats", response_model=List[str], tags=["Reference Data"])
-async def get_habitats():
+async def get_habitats(request: Request):
     """Get all available habitat types"""
-    return [habitat.value for habitat in DinosaurHabitat]
+    return reference_response(request, REFERENCE["habitats"])
+
+@app.get("/reference", response_model=Dict[str, List[str]], tags=["Reference Data"])
+async def get_reference_data(request: Request):
+    """Get every reference list in one response"""
+    return reference_response(request, REFERENCE["reference"])
+
+@app.get("/metrics/pool", tags=["Health"])
+async def get_pool_metrics():
+    """Connection pool settings, live usage and cumulative checkout/churn counters"""
+    return pool_status()
+
+@app.get("/metrics/startup", tags=["Health"])
+async def get_startup_metrics():
+    """Init mode, warmed up connections and the seconds each startup phase took in this worker"""
+    return STARTUP
+
+@app.get("/metrics/cache", tags=["Health"])
+async def get_cache_metrics():
+    """Query result cache hit/miss counters and occupancy"""
+    return db.cache.stats()
+
+@app.get("/metrics/compression", tags=["Health"])
+async def get_compression_metrics():
+    """Compressed response cache hit/miss counters and occupancy"""
+    return compressed_cache.stats()
+
+async def readiness():
+    """(ready, details) from a bounded SELECT 1 and the pool saturation"""
+    database_ok = await db.ping(HEALTH_CHECK_TIMEOUT)
+    saturation = async_pool_saturation()
+    ready = database_ok and (saturation is None or saturation < HEALTH_MAX_POOL_SATURATION)
+    return ready, {
+        "status": "ready" if ready else "unavailable",
+        "database_status": "connected" if database_ok else "unreachable",
+        "pool_saturation": saturation,
+        "replicas_healthy": len(get_read_router().healthy()),
+        "replicas_total": len(get_read_router().replicas)
+    }
+
+@app.get("/health/live", tags=["Health"])
+async def liveness_check():
+    """Liveness probe: the process is serving requests, no database access"""
+    return {"status": "alive"}
+
+@app.get("/health/ready", tags=["Health"])
+async def readiness_check():
+    """Readiness probe: 503 when the database doesn't answer in time or the pool is saturated"""
+    ready, details = await readiness()
+    return JSONResponse(details, status_code=200 if ready else 503)
 
 @app.get("/health", tags=["Health"])
 async def health_check():
-    """Health check endpoint for monitoring"""
-    return {
-        "status": "healthy",
+    """Health check endpoint for monitoring; 503 when unhealthy, like /health/ready"""
+    ready, details = await readiness()
+    total_dinosaurs = None
+    if details["database_status"] == "connected":
+        # One row per stats group (see the dinosaur_stats table), and usually cached
+        total_dinosaurs = (await db.get_stats())["total_dinosaurs"]
+    return JSONResponse({
+        "status": "healthy" if ready else "unhealthy",
         "timestamp": "2025-07-24",
-        "database_status": "connected",
-        "total_dinosaurs": db.get_stats()["total_dinosaurs"]
-    }
\ No newline at end of file
+        "database_status": details["database_status"],
+        "total_dinosaurs": total_dinosaurs,
+        "pool_saturation": details["pool_saturation"]
+    }, status_code=200 if ready else 503)
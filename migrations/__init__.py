@@ -0,0 +1,97 @@
+# Versioned schema migrations for the PostgreSQL backends.
+#
+# Each vNNNN_<name>.py module in this package defines VERSION, DESCRIPTION and
+# upgrade(conn). Applied versions are recorded in schema_migrations; `migrate` runs the
+# pending ones in version order inside the caller's transaction, under an advisory
+# lock so that several workers starting at once apply each migration exactly once.
+#
+# Migrations are frozen once released: change the schema with a new module rather
+# than by editing an old one.
+
+import importlib
+import pkgutil
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+# Arbitrary key of the advisory lock serializing migration runs
+MIGRATION_LOCK_ID = 7_340_251
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def discover() -> List[Migration]:
+    """Every migration module of this package, in version order"""
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        if not module_info.name.startswith("v"):
+            continue
+        module = importlib.import_module(f"{__name__}.{module_info.name}")
+        migrations.append(Migration(module.VERSION, module_info.name, module.DESCRIPTION, module.upgrade))
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return migrations
+
+
+def _ensure_table(conn: Connection):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            version integer PRIMARY KEY,
+            name varchar NOT NULL,
+            description text NOT NULL,
+            applied_at timestamp with time zone NOT NULL DEFAULT now()
+        )
+    """))
+
+
+def applied(conn: Connection) -> Dict[int, datetime]:
+    """Applied migration versions and when they were applied"""
+    _ensure_table(conn)
+    rows = conn.execute(text(f"SELECT version, applied_at FROM {MIGRATIONS_TABLE}"))
+    return {version: applied_at for version, applied_at in rows}
+
+
+def pending(conn: Connection) -> List[Migration]:
+    """Migrations not applied yet, in the order they would run"""
+    done = applied(conn)
+    return [migration for migration in discover() if migration.version not in done]
+
+
+def migrate(conn: Connection, target: Optional[int] = None) -> List[Migration]:
+    """Apply pending migrations up to `target` (default: all) on a connection in a transaction.
+
+    Returns the migrations that were applied. Any failure leaves the schema untouched,
+    since PostgreSQL DDL is transactional.
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+    ran = []
+    for migration in pending(conn):
+        if target is not None and migration.version > target:
+            break
+        migration.upgrade(conn)
+        conn.execute(
+            text(f"INSERT INTO {MIGRATIONS_TABLE} (version, name, description) VALUES (:version, :name, :description)"),
+            {"version": migration.version, "name": migration.name, "description": migration.description}
+        )
+        ran.append(migration)
+    return ran
+
+
+def upgrade(engine=None, target: Optional[int] = None) -> List[Migration]:
+    """Apply pending migrations in a single transaction on `engine` (default: db_config.get_engine())"""
+    if engine is None:
+        from db_config import get_engine
+        engine = get_engine()
+    with engine.begin() as conn:
+        return migrate(conn, target)
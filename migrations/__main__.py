@@ -0,0 +1,55 @@
+"""
+Schema migrations for the Dinosaur API database
+
+Usage:
+    python -m migrations [upgrade] [--to VERSION]   apply pending migrations
+    python -m migrations status                     list migrations and whether they are applied
+    python -m migrations check [--min-rows N]       EXPLAIN every filter shape, fail on full table scans
+"""
+
+import argparse
+import sys
+
+from db_config import get_engine
+from migrations import applied, discover, upgrade
+from migrations.check import CHECK_MAX_SHARE, CHECK_MIN_ROWS, run_check
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m migrations", description="Dinosaur API schema migrations")
+    commands = parser.add_subparsers(dest="command")
+    upgrade_parser = commands.add_parser("upgrade", help="apply pending migrations (default)")
+    upgrade_parser.add_argument("--to", type=int, help="stop after this version")
+    commands.add_parser("status", help="list migrations and whether they are applied")
+    check_parser = commands.add_parser("check", help="EXPLAIN every filter shape and fail on full table scans")
+    check_parser.add_argument(
+        "--min-rows", type=int, default=CHECK_MIN_ROWS,
+        help=f"table size from which full scans fail (default {CHECK_MIN_ROWS:,})"
+    )
+    check_parser.add_argument(
+        "--max-share", type=float, default=CHECK_MAX_SHARE,
+        help=f"share of rows from which a filter may full scan (default {CHECK_MAX_SHARE})"
+    )
+    args = parser.parse_args()
+
+    if args.command == "status":
+        with get_engine().begin() as conn:
+            done = applied(conn)
+        for migration in discover():
+            when = done.get(migration.version)
+            state = f"applied {when:%Y-%m-%d %H:%M:%S}" if when else "pending"
+            print(f"{migration.version:4d}  {migration.name:<28} {state}")
+    elif args.command == "check":
+        with get_engine().connect() as conn:
+            if not run_check(conn, args.min_rows, args.max_share):
+                sys.exit(1)
+    else:
+        ran = upgrade(target=getattr(args, "to", None))
+        for migration in ran:
+            print(f"✅ {migration.version}: {migration.description}")
+        if not ran:
+            print("✅ Database schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
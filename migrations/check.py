@@ -0,0 +1,136 @@
+# Plan check for the filter indexes: EXPLAIN the filters of every filter shape and flag
+# plans that read the whole dinosaurs table once it is big enough to matter, whether by
+# a sequential scan or by walking an index without a condition on it.
+#
+# The statement explained is the count behind every page's total (postgres_queries.count_query):
+# it has to visit each match, so its plan is the access path of the filters. The page
+# itself may legitimately walk the primary key, since it stops after `limit` rows.
+
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+
+from db_config import CATEGORICAL_TYPES
+import postgres_queries as queries
+
+# Below this many rows a sequential scan is a fine plan, so it isn't reported as a failure
+CHECK_MIN_ROWS = 10_000
+
+# Nor is it for filters matching at least this share of the table (e.g. clade, which has
+# only a couple of values)
+CHECK_MAX_SHARE = 0.2
+
+CATEGORICAL_FILTERS = {column: enum_class for column, (_, enum_class) in CATEGORICAL_TYPES.items()}
+
+# Filter combinations the API is queried with, as get_all keyword arguments
+FILTER_SHAPES = [
+    *((name,) for name in CATEGORICAL_FILTERS),
+    ("period", "diet"),
+    ("diet", "size"),
+    ("period", "size"),
+    ("period", "diet", "size"),
+    ("min_length",),
+    ("min_length", "max_length"),
+    ("period", "min_length"),
+    ("min_age", "max_age"),
+]
+
+
+class PlanCheck(NamedTuple):
+    shape: Sequence[str]
+    filters: Dict[str, Any]
+    nodes: List[str]
+    full_scan: bool
+    matches: int
+
+
+def sample_filters(conn: Connection) -> Dict[str, Any]:
+    """A selective value for every filter: the rarest value of each category, the top 1% of lengths and ages.
+
+    The point is to check that an index can serve the filter; for values matching a large share
+    of the table a sequential scan is the right plan.
+    """
+    values: Dict[str, Any] = {}
+    for name, enum in CATEGORICAL_FILTERS.items():
+        rarest = conn.execute(text(
+            f'SELECT "{name}" FROM dinosaurs WHERE "{name}" IS NOT NULL '
+            f'GROUP BY "{name}" ORDER BY count(*), "{name}" LIMIT 1'
+        )).scalar()
+        if rarest is not None:
+            values[name] = enum(rarest)
+    length, oldest = conn.execute(text(
+        "SELECT percentile_disc(0.99) WITHIN GROUP (ORDER BY length_meters), "
+        "percentile_disc(0.99) WITHIN GROUP (ORDER BY greatest(age_start_mya, age_end_mya)) "
+        "FROM dinosaurs"
+    )).one()
+    if length is not None:
+        values["min_length"], values["max_length"] = length, length * 2
+    if oldest is not None:
+        values["min_age"], values["max_age"] = oldest, oldest
+    return values
+
+
+def _nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def explain(conn: Connection, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Plan nodes of the /dinosaurs total for the given filters, outermost first"""
+    stmt = queries.count_query(**filters)
+    sql = stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    (document,) = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar_one()
+    return list(_nodes(document["Plan"]))
+
+
+def _describe(node: Dict[str, Any]) -> str:
+    target = node.get("Index Name") or node.get("Relation Name")
+    return f"{node['Node Type']} on {target}" if target else node["Node Type"]
+
+
+def _reads_whole_table(node: Dict[str, Any]) -> bool:
+    # An index scan without an Index Cond filters every row, as much work as a sequential scan
+    if node.get("Relation Name") != "dinosaurs":
+        return False
+    if node["Node Type"] == "Seq Scan":
+        return True
+    return node["Node Type"] in ("Index Scan", "Index Only Scan") and "Index Cond" not in node
+
+
+def check_plans(conn: Connection, shapes: Sequence[Sequence[str]] = FILTER_SHAPES) -> List[PlanCheck]:
+    """EXPLAIN every filter shape that has sample values"""
+    values = sample_filters(conn)
+    results = []
+    for shape in shapes:
+        if not all(name in values for name in shape):
+            continue
+        filters = {name: values[name] for name in shape}
+        nodes = explain(conn, filters)
+        full_scan = any(_reads_whole_table(node) for node in nodes)
+        matches = conn.execute(queries.count_query(**filters)).scalar_one()
+        results.append(PlanCheck(shape, filters, [_describe(node) for node in nodes], full_scan, matches))
+    return results
+
+
+def table_rows(conn: Connection) -> int:
+    return conn.execute(text("SELECT count(*) FROM dinosaurs")).scalar_one()
+
+
+def run_check(conn: Connection, min_rows: Optional[int] = None, max_share: float = CHECK_MAX_SHARE) -> bool:
+    """Print the plan of every filter shape; False if any selective filter reads all of a table
+    of at least `min_rows` rows"""
+    min_rows = CHECK_MIN_ROWS if min_rows is None else min_rows
+    rows = table_rows(conn)
+    enforced = rows >= min_rows
+    print(f"dinosaurs: {rows:,} rows, full scans {'fail' if enforced else f'allowed below {min_rows:,} rows'}")
+    ok = True
+    for result in check_plans(conn):
+        share = result.matches / rows if rows else 0.0
+        failed = result.full_scan and enforced and share < max_share
+        ok = ok and not failed
+        mark = "❌" if failed else ("⚠️ " if result.full_scan else "✅")
+        print(f"{mark} {' + '.join(result.shape)} ({share:.1%} of rows): {' -> '.join(result.nodes)}")
+    return ok
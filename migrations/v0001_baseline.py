@@ -0,0 +1,238 @@
+# Baseline: the schema as created before versioned migrations. Every statement is
+# idempotent, so databases set up by the old create_all startup are adopted as they are.
+# Like every migration, it spells out its SQL rather than importing it from db_config:
+# what it runs must not change when the models do.
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+VERSION = 1
+DESCRIPTION = "Baseline dinosaurs, dataset_version and dinosaur_stats schema"
+
+# Columns summarized in dinosaur_stats: one row per value, plus the ('total', '') row
+STATS_GROUP_COLUMNS = ("period", "diet", "size")
+
+
+def _stats_delta_sql(changes: str) -> str:
+    """Upsert the per-statement change of dinosaur_stats; `changes` selects (sign, row) pairs"""
+    groups = "".join(
+        f"""
+            UNION ALL
+            SELECT '{column}', {column}, sum(sign), 0, 0, 0, 0
+            FROM changes WHERE {column} IS NOT NULL GROUP BY {column}"""
+        for column in STATS_GROUP_COLUMNS
+    )
+    return f"""
+        WITH changes AS ({changes}),
+        deltas AS (
+            SELECT 'total' AS dimension, '' AS value, coalesce(sum(sign), 0) AS dinosaurs,
+                   coalesce(sum(sign * length_meters::numeric), 0) AS length_sum,
+                   count(length_meters) FILTER (WHERE sign > 0) - count(length_meters) FILTER (WHERE sign < 0) AS length_count,
+                   coalesce(sum(sign * weight_kg::numeric), 0) AS weight_sum,
+                   count(weight_kg) FILTER (WHERE sign > 0) - count(weight_kg) FILTER (WHERE sign < 0) AS weight_count
+            FROM changes{groups}
+        )
+        INSERT INTO dinosaur_stats AS s
+        SELECT * FROM deltas
+        WHERE dinosaurs <> 0 OR length_sum <> 0 OR length_count <> 0 OR weight_sum <> 0 OR weight_count <> 0
+        ON CONFLICT (dimension, value) DO UPDATE SET
+            dinosaurs = s.dinosaurs + excluded.dinosaurs,
+            length_sum = s.length_sum + excluded.length_sum,
+            length_count = s.length_count + excluded.length_count,
+            weight_sum = s.weight_sum + excluded.weight_sum,
+            weight_count = s.weight_count + excluded.weight_count;
+        DELETE FROM dinosaur_stats WHERE dimension <> 'total' AND dinosaurs = 0;"""
+
+
+def _stats_refresh_sql() -> str:
+    """Recompute every dinosaur_stats row from the dinosaurs table"""
+    columns = "INSERT INTO dinosaur_stats (dimension, value, dinosaurs, length_sum, length_count, weight_sum, weight_count)"
+    groups = "".join(
+        f"""
+        {columns}
+        SELECT '{column}', {column}, count(*), 0, 0, 0, 0 FROM dinosaurs WHERE {column} IS NOT NULL GROUP BY {column};"""
+        for column in STATS_GROUP_COLUMNS
+    )
+    return f"""
+        DELETE FROM dinosaur_stats;
+        {columns}
+        SELECT 'total', '', count(*), coalesce(sum(length_meters::numeric), 0), count(length_meters),
+               coalesce(sum(weight_kg::numeric), 0), count(weight_kg)
+        FROM dinosaurs;{groups}"""
+
+
+# Statements that must run before the tables are created
+PRE_CREATE_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # array_to_string is only STABLE, generated columns need an IMMUTABLE wrapper
+    """
+    CREATE OR REPLACE FUNCTION dinosaur_array_text(text[]) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$ SELECT coalesce(array_to_string($1, ' '), '') $$
+    """,
+]
+
+# The tables as Base.metadata.create_all created them before migrations existed
+CREATE_TABLES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS dinosaurs (
+        id SERIAL NOT NULL,
+        name VARCHAR,
+        species VARCHAR,
+        genus VARCHAR,
+        period VARCHAR,
+        age_start_mya FLOAT,
+        age_end_mya FLOAT,
+        clade VARCHAR,
+        "group" VARCHAR,
+        diet VARCHAR,
+        size VARCHAR,
+        length_meters FLOAT,
+        height_meters FLOAT,
+        weight_kg FLOAT,
+        skull_length_cm FLOAT,
+        locomotion VARCHAR,
+        habitat VARCHAR,
+        special_features VARCHAR[],
+        discovered_year INTEGER,
+        discoverer VARCHAR,
+        location_found VARCHAR,
+        formation VARCHAR,
+        fossil_quality VARCHAR,
+        description TEXT,
+        interesting_facts VARCHAR[],
+        is_valid_species BOOLEAN,
+        synonyms VARCHAR[],
+        PRIMARY KEY (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_dinosaurs_id ON dinosaurs (id)",
+    "CREATE INDEX IF NOT EXISTS ix_dinosaurs_name ON dinosaurs (name)",
+    """
+    CREATE TABLE IF NOT EXISTS dataset_version (
+        id SERIAL NOT NULL,
+        version BIGINT NOT NULL,
+        updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dinosaur_stats (
+        dimension VARCHAR NOT NULL,
+        value VARCHAR NOT NULL,
+        dinosaurs BIGINT NOT NULL,
+        length_sum NUMERIC NOT NULL,
+        length_count BIGINT NOT NULL,
+        weight_sum NUMERIC NOT NULL,
+        weight_count BIGINT NOT NULL,
+        PRIMARY KEY (dimension, value)
+    )
+    """,
+]
+
+# Generated columns, indexes and triggers, in the order they used to run after create_all
+POST_CREATE_DDL = [
+    """
+    ALTER TABLE dinosaurs ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(species, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(genus, '')), 'A') ||
+        setweight(to_tsvector('english', dinosaur_array_text(synonyms)), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C') ||
+        setweight(to_tsvector('english', dinosaur_array_text(interesting_facts)), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_dinosaurs_name_id ON dinosaurs (name, id)",
+    "CREATE INDEX IF NOT EXISTS ix_dinosaurs_search_vector ON dinosaurs USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_dinosaurs_name_trgm ON dinosaurs USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_dinosaurs_species_trgm ON dinosaurs USING gin (species gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_dinosaurs_genus_trgm ON dinosaurs USING gin (genus gin_trgm_ops)",
+    """
+    CREATE INDEX IF NOT EXISTS ix_dinosaurs_age_range ON dinosaurs USING gist ((
+        numrange(least(age_start_mya, age_end_mya)::numeric, greatest(age_start_mya, age_end_mya)::numeric, '[]')
+    ))
+    WHERE age_start_mya IS NOT NULL OR age_end_mya IS NOT NULL
+    """,
+    # Dataset version, bumped once per statement that changes dinosaurs (see DatasetVersionModel)
+    "INSERT INTO dataset_version (id, version, updated_at) VALUES (1, 1, now()) ON CONFLICT (id) DO NOTHING",
+    """
+    CREATE OR REPLACE FUNCTION bump_dataset_version() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    BEGIN
+        UPDATE dataset_version SET version = version + 1, updated_at = now() WHERE id = 1;
+        RETURN NULL;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS dinosaurs_bump_dataset_version ON dinosaurs",
+    """
+    CREATE TRIGGER dinosaurs_bump_dataset_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON dinosaurs
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_dataset_version()
+    """,
+    # Running totals behind /stats (see DinosaurStatsModel), recomputed from scratch only
+    # when the summary table is new and on TRUNCATE
+    f"""
+    CREATE OR REPLACE FUNCTION refresh_dinosaur_stats() RETURNS void
+    LANGUAGE sql
+    AS $$ {_stats_refresh_sql()} $$
+    """,
+    "SELECT refresh_dinosaur_stats() WHERE NOT EXISTS (SELECT 1 FROM dinosaur_stats)",
+    # Transition tables are only declared on the triggers that have them, so each branch
+    # references just the ones its event provides
+    f"""
+    CREATE OR REPLACE FUNCTION apply_dinosaur_stats_delta() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            {_stats_delta_sql("SELECT 1 AS sign, * FROM new_rows")}
+        ELSIF TG_OP = 'UPDATE' THEN
+            {_stats_delta_sql("SELECT 1 AS sign, * FROM new_rows UNION ALL SELECT -1, * FROM old_rows")}
+        ELSE
+            {_stats_delta_sql("SELECT -1 AS sign, * FROM old_rows")}
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION reset_dinosaur_stats() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    BEGIN
+        PERFORM refresh_dinosaur_stats();
+        RETURN NULL;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS dinosaurs_stats_insert ON dinosaurs",
+    "DROP TRIGGER IF EXISTS dinosaurs_stats_update ON dinosaurs",
+    "DROP TRIGGER IF EXISTS dinosaurs_stats_delete ON dinosaurs",
+    "DROP TRIGGER IF EXISTS dinosaurs_stats_truncate ON dinosaurs",
+    """
+    CREATE TRIGGER dinosaurs_stats_insert AFTER INSERT ON dinosaurs
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_dinosaur_stats_delta()
+    """,
+    """
+    CREATE TRIGGER dinosaurs_stats_update AFTER UPDATE ON dinosaurs
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_dinosaur_stats_delta()
+    """,
+    """
+    CREATE TRIGGER dinosaurs_stats_delete AFTER DELETE ON dinosaurs
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_dinosaur_stats_delta()
+    """,
+    """
+    CREATE TRIGGER dinosaurs_stats_truncate AFTER TRUNCATE ON dinosaurs
+    FOR EACH STATEMENT EXECUTE FUNCTION reset_dinosaur_stats()
+    """,
+]
+
+
+def upgrade(conn: Connection):
+    for statement in PRE_CREATE_DDL + CREATE_TABLES_DDL + POST_CREATE_DDL:
+        conn.execute(text(statement))
@@ -0,0 +1,118 @@
+# Categorical columns as native ENUM types instead of free strings: 4 bytes a value
+# instead of a varlena string, cheaper comparisons and smaller indexes, and values
+# outside the models.py enums are rejected by the database.
+#
+# The labels are the enum values as they were when this migration was written; a value
+# added to an enum later needs its own migration (ALTER TYPE ... ADD VALUE).
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+VERSION = 3
+DESCRIPTION = "Native ENUM types for the categorical dinosaur columns"
+
+# Column: (ENUM type, labels in declaration order)
+ENUM_COLUMNS = {
+    "period": ("dinosaur_period", (
+        "Early Triassic", "Middle Triassic", "Late Triassic",
+        "Early Jurassic", "Middle Jurassic", "Late Jurassic",
+        "Early Cretaceous", "Late Cretaceous",
+    )),
+    "clade": ("dinosaur_clade", ("Ornithischia", "Saurischia")),
+    "group": ("dinosaur_group", (
+        "Theropoda", "Tyrannosauria", "Dromaeosauridae", "Spinosauridae", "Allosauridae",
+        "Compsognathidae", "Ornithomimosauria", "Therizinosauridae", "Oviraptorosauria",
+        "Troodontidae", "Sauropodomorpha", "Diplodocidae", "Brachiosauridae", "Titanosauria",
+        "Camarasauridae", "Stegosauria", "Ankylosauria", "Ceratopsia", "Hadrosauridae",
+        "Pachycephalosauria", "Ornithopoda",
+    )),
+    "diet": ("dinosaur_diet", ("Herbivore", "Carnivore", "Omnivore", "Piscivore", "Insectivore")),
+    "size": ("dinosaur_size", ("Tiny", "Small", "Medium", "Large", "Massive")),
+    "locomotion": ("dinosaur_locomotion", ("Bipedal", "Quadrupedal", "Facultative")),
+    "habitat": ("dinosaur_habitat", ("Terrestrial", "Semi-aquatic", "Arboreal", "Coastal")),
+    "fossil_quality": ("dinosaur_fossil_quality", ("Excellent", "Good", "Partial", "Fragmentary")),
+}
+
+
+# The baseline's dinosaur_stats delta as it was when this migration was written, copied
+# rather than imported so that later edits to v0001_baseline can't change what this installs
+STATS_DELTA_SQL = """
+        WITH changes AS ({changes}),
+        deltas AS (
+            SELECT 'total' AS dimension, '' AS value, coalesce(sum(sign), 0) AS dinosaurs,
+                   coalesce(sum(sign * length_meters::numeric), 0) AS length_sum,
+                   count(length_meters) FILTER (WHERE sign > 0) - count(length_meters) FILTER (WHERE sign < 0) AS length_count,
+                   coalesce(sum(sign * weight_kg::numeric), 0) AS weight_sum,
+                   count(weight_kg) FILTER (WHERE sign > 0) - count(weight_kg) FILTER (WHERE sign < 0) AS weight_count
+            FROM changes
+            UNION ALL
+            SELECT 'period', period, sum(sign), 0, 0, 0, 0
+            FROM changes WHERE period IS NOT NULL GROUP BY period
+            UNION ALL
+            SELECT 'diet', diet, sum(sign), 0, 0, 0, 0
+            FROM changes WHERE diet IS NOT NULL GROUP BY diet
+            UNION ALL
+            SELECT 'size', size, sum(sign), 0, 0, 0, 0
+            FROM changes WHERE size IS NOT NULL GROUP BY size
+        )
+        INSERT INTO dinosaur_stats AS s
+        SELECT * FROM deltas
+        WHERE dinosaurs <> 0 OR length_sum <> 0 OR length_count <> 0 OR weight_sum <> 0 OR weight_count <> 0
+        ON CONFLICT (dimension, value) DO UPDATE SET
+            dinosaurs = s.dinosaurs + excluded.dinosaurs,
+            length_sum = s.length_sum + excluded.length_sum,
+            length_count = s.length_count + excluded.length_count,
+            weight_sum = s.weight_sum + excluded.weight_sum,
+            weight_count = s.weight_count + excluded.weight_count;
+        DELETE FROM dinosaur_stats WHERE dimension <> 'total' AND dinosaurs = 0;"""
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _changes(sign: int, rows: str) -> str:
+    # Stats values are text; UNION ALL can't mix the ENUM types of different columns
+    return (
+        f"SELECT {sign} AS sign, period::text AS period, diet::text AS diet, size::text AS size, "
+        f"length_meters, weight_kg FROM {rows}"
+    )
+
+
+def _stats_delta_sql(changes: str) -> str:
+    return STATS_DELTA_SQL.format(changes=changes)
+
+
+def upgrade_ddl():
+    statements = [
+        f"CREATE TYPE {type_name} AS ENUM ({', '.join(_literal(label) for label in labels)})"
+        for type_name, labels in ENUM_COLUMNS.values()
+    ]
+    # One ALTER, so the table and its indexes are rewritten once
+    statements.append("ALTER TABLE dinosaurs " + ", ".join(
+        f'ALTER COLUMN "{column}" TYPE {type_name} USING "{column}"::{type_name}'
+        for column, (type_name, _) in ENUM_COLUMNS.items()
+    ))
+    statements.append(f"""
+    CREATE OR REPLACE FUNCTION apply_dinosaur_stats_delta() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            {_stats_delta_sql(_changes(1, "new_rows"))}
+        ELSIF TG_OP = 'UPDATE' THEN
+            {_stats_delta_sql(_changes(1, "new_rows") + " UNION ALL " + _changes(-1, "old_rows"))}
+        ELSE
+            {_stats_delta_sql(_changes(-1, "old_rows"))}
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """)
+    statements.append("ANALYZE dinosaurs")
+    return statements
+
+
+def upgrade(conn: Connection):
+    for statement in upgrade_ddl():
+        conn.execute(text(statement))
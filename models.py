@@ -80,6 +80,14 @@ class FossilQuality(str, Enum):
     PARTIAL = "Partial"  # Incomplete remains
     FRAGMENTARY = "Fragmentary"  # Only fragments
 
+class DinosaurSortField(str, Enum):
+    ID = "id"
+    NAME = "name"
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
 class DinosaurBase(BaseModel):
     # Basic identification
     name: str = Field(..., description="Common name of the dinosaur")
@@ -165,6 +173,17 @@ class DinosaurResponse(BaseModel):
     total: int
     page: int
     per_page: int
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, absent on the last page")
+
+# Most IDs a single batch lookup accepts
+BATCH_MAX_IDS = 1000
+
+class DinosaurBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BATCH_MAX_IDS, description="Dinosaur IDs to look up")
+
+class DinosaurBatchResponse(BaseModel):
+    dinosaurs: List[Optional[Dinosaur]] = Field(..., description="One entry per requested ID, in request order; null when not found")
+    not_found: List[int] = Field(..., description="Requested IDs that don't exist")
 
 class ErrorResponse(BaseModel):
     detail: str
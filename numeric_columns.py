@@ -0,0 +1,92 @@
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+
+def bits_from_mask(mask: np.ndarray) -> int:
+    """Bitset (bit N = position N) from a boolean array, as used by BitmapIndex"""
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+class NumericColumns:
+    """float64 column per numeric field indexed by record ID, NaN where a value is unknown"""
+
+    def __init__(self, fields: Iterable[str], capacity: int = 1024):
+        self._columns: Dict[str, np.ndarray] = {field: np.full(capacity, np.nan) for field in fields}
+        self._capacity = capacity
+        # One past the highest ID ever set, so scans skip the unused tail
+        self._size = 0
+
+    def _reserve(self, doc_id: int):
+        if doc_id < self._capacity:
+            return
+        capacity = max(doc_id + 1, self._capacity * 2)
+        for field, column in self._columns.items():
+            grown = np.full(capacity, np.nan)
+            grown[:self._capacity] = column
+            self._columns[field] = grown
+        self._capacity = capacity
+
+    def set(self, doc_id: int, values: Dict[str, Optional[float]]):
+        """Store a record's values; missing or None values become NaN"""
+        self._reserve(doc_id)
+        self._size = max(self._size, doc_id + 1)
+        for field, column in self._columns.items():
+            value = values.get(field)
+            column[doc_id] = np.nan if value is None else value
+
+    def clear(self, doc_id: int):
+        """Forget a record's values"""
+        if doc_id < self._capacity:
+            for column in self._columns.values():
+                column[doc_id] = np.nan
+
+    def column(self, field: str) -> np.ndarray:
+        """Read-only view of a column up to the highest ID"""
+        view = self._columns[field][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def range_bits(self, field: str, low: Optional[float] = None, high: Optional[float] = None) -> int:
+        """Bitset of records whose value lies in [low, high]; None is unbounded, NaN never matches"""
+        column = self.column(field)
+        mask = ~np.isnan(column)
+        if low is not None:
+            mask &= column >= low
+        if high is not None:
+            mask &= column <= high
+        return bits_from_mask(mask)
+
+    def overlap_bits(self, low_field: str, high_field: str, low: Optional[float], high: Optional[float]) -> int:
+        """Bitset of records whose [low_field, high_field] range overlaps [low, high]"""
+        lows, highs = self.column(low_field), self.column(high_field)
+        mask = ~np.isnan(lows) & ~np.isnan(highs)
+        if low is not None:
+            mask &= highs >= low
+        if high is not None:
+            mask &= lows <= high
+        return bits_from_mask(mask)
+
+    def describe(
+        self,
+        field: str,
+        percentiles: Sequence[float] = (25, 50, 75, 90),
+        bins: int = 10
+    ) -> Dict[str, Any]:
+        """Count, mean, min, max, percentiles and an equal-width histogram of the known values"""
+        column = self.column(field)
+        values = column[~np.isnan(column)]
+        if not values.size:
+            return {"count": 0, "mean": None, "min": None, "max": None, "percentiles": {}, "histogram": None}
+        counts, edges = np.histogram(values, bins=bins)
+        return {
+            "count": int(values.size),
+            "mean": float(values.mean()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "percentiles": {
+                f"p{percentile:g}": float(value)
+                for percentile, value in zip(percentiles, np.percentile(values, percentiles))
+            },
+            "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+        }
@@ -0,0 +1,59 @@
+import base64
+import json
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from models import Dinosaur, DinosaurSortField
+
+
+# Type of the key a cursor holds for each sort order (bool is excluded separately, being an int)
+CURSOR_KEY_TYPES = {
+    DinosaurSortField.ID: int,
+    DinosaurSortField.NAME: str,
+}
+
+# IDs are positive and fit the INTEGER id column; 0 is the position before the first row
+MAX_CURSOR_ID = 2 ** 31 - 1
+
+
+class Page(NamedTuple):
+    """One page of results with the exact match count and the cursor of the next page"""
+    dinosaurs: List[Any]
+    total: int
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(sort: DinosaurSortField, key: Any, last_id: int) -> str:
+    """Build an opaque cursor pointing just past (key, last_id) in the given sort order"""
+    payload = json.dumps([sort.value, key, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: DinosaurSortField) -> Tuple[Any, int]:
+    """Return the (key, last_id) position stored in a cursor, raising ValueError if it is invalid"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, key, last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid pagination cursor") from exc
+    if sort_value != sort.value:
+        raise ValueError(f"Cursor was issued for sort '{sort_value}', not '{sort.value}'")
+    for value, expected in ((key, CURSOR_KEY_TYPES[sort]), (last_id, int)):
+        if not isinstance(value, expected) or isinstance(value, bool):
+            raise ValueError("Invalid pagination cursor")
+    ids = (key, last_id) if sort == DinosaurSortField.ID else (last_id,)
+    if not all(0 <= value <= MAX_CURSOR_ID for value in ids):
+        raise ValueError("Invalid pagination cursor")
+    return key, last_id
+
+
+def sort_key(dinosaur: Dinosaur, sort: DinosaurSortField) -> Any:
+    """Value of the sort column of a dinosaur"""
+    return getattr(dinosaur, sort.value)
+
+
+def next_cursor(rows: List[Dinosaur], limit: int, sort: DinosaurSortField) -> Optional[str]:
+    """Cursor after the last of `limit` rows, or None when the extra look-ahead row is absent"""
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(sort, sort_key(last, sort), last.id)
@@ -0,0 +1,340 @@
+# SQL statements shared by the sync and async PostgreSQL backends. Every builder returns
+# a `Select`, so the same query runs under `Session.execute` and `AsyncSession.execute`.
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import ARRAY, Float, Integer, Numeric, Select, and_, any_, bindparam, or_, func, cast, literal, literal_column, select, tuple_
+
+from db_config import CATEGORICAL_TYPES, DatasetVersionModel, DinosaurModel, DinosaurStatsModel
+from models import (
+    Dinosaur, DinosaurPeriod, DinosaurDiet, DinosaurSize,
+    DinosaurClade, DinosaurGroup, DinosaurLocomotion,
+    DinosaurHabitat, FossilQuality, DinosaurSortField
+)
+from pagination import Page, decode_cursor, next_cursor
+from projection import load_fields
+
+# Rows fetched per round trip when streaming through a server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+# Array columns, returned as [] rather than NULL like model_to_pydantic does
+LIST_COLUMNS = ("special_features", "interesting_facts", "synonyms")
+
+
+def age_range():
+    """SQL expression matching the ix_dinosaurs_age_range GiST index (see AGE_RANGE_SQL)"""
+    start, end = DinosaurModel.age_start_mya, DinosaurModel.age_end_mya
+    return func.numrange(
+        cast(func.least(start, end), Numeric),
+        cast(func.greatest(start, end), Numeric),
+        # Inlined so the expression still matches the index under server-side binds
+        literal_column("'[]'")
+    )
+
+
+def age_overlaps(min_age: Optional[float], max_age: Optional[float]):
+    """Filter for dinosaurs whose age range overlaps [min_age, max_age]; None is unbounded"""
+    if min_age is not None and max_age is not None and min_age > max_age:
+        min_age, max_age = max_age, min_age
+    return and_(
+        or_(DinosaurModel.age_start_mya.isnot(None), DinosaurModel.age_end_mya.isnot(None)),
+        age_range().op("&&")(func.numrange(
+            # Bound as float8 and cast server-side, so every driver sends the same type
+            cast(literal(min_age, Float), Numeric),
+            cast(literal(max_age, Float), Numeric),
+            literal_column("'[]'")
+        ))
+    )
+
+
+def apply_filters(
+    stmt: Select,
+    period: Optional[DinosaurPeriod] = None,
+    diet: Optional[DinosaurDiet] = None,
+    size: Optional[DinosaurSize] = None,
+    clade: Optional[DinosaurClade] = None,
+    group: Optional[DinosaurGroup] = None,
+    locomotion: Optional[DinosaurLocomotion] = None,
+    habitat: Optional[DinosaurHabitat] = None,
+    fossil_quality: Optional[FossilQuality] = None,
+    min_length: Optional[float] = None,
+    max_length: Optional[float] = None,
+    min_age: Optional[float] = None,
+    max_age: Optional[float] = None
+) -> Select:
+    """Add the get_all filters to a statement"""
+    if period:
+        stmt = stmt.filter(DinosaurModel.period == period)
+    if diet:
+        stmt = stmt.filter(DinosaurModel.diet == diet)
+    if size:
+        stmt = stmt.filter(DinosaurModel.size == size)
+    if clade:
+        stmt = stmt.filter(DinosaurModel.clade == clade)
+    if group:
+        stmt = stmt.filter(DinosaurModel.group == group)
+    if locomotion:
+        stmt = stmt.filter(DinosaurModel.locomotion == locomotion)
+    if habitat:
+        stmt = stmt.filter(DinosaurModel.habitat == habitat)
+    if fossil_quality:
+        stmt = stmt.filter(DinosaurModel.fossil_quality == fossil_quality)
+    if min_length is not None:
+        stmt = stmt.filter(DinosaurModel.length_meters >= min_length)
+    if max_length is not None:
+        stmt = stmt.filter(DinosaurModel.length_meters <= max_length)
+    if min_age is not None or max_age is not None:
+        stmt = stmt.filter(age_overlaps(min_age, max_age))
+    return stmt
+
+
+def model_to_pydantic(dino_model: DinosaurModel) -> Dinosaur:
+    """Convert SQLAlchemy model to Pydantic model; categorical columns already load as enum members"""
+    return Dinosaur(
+        id=dino_model.id,
+        name=dino_model.name,
+        species=dino_model.species,
+        genus=dino_model.genus,
+        period=dino_model.period,
+        age_start_mya=dino_model.age_start_mya,
+        age_end_mya=dino_model.age_end_mya,
+        clade=dino_model.clade,
+        group=dino_model.group,
+        diet=dino_model.diet,
+        size=dino_model.size,
+        length_meters=dino_model.length_meters,
+        height_meters=dino_model.height_meters,
+        weight_kg=dino_model.weight_kg,
+        skull_length_cm=dino_model.skull_length_cm,
+        locomotion=dino_model.locomotion,
+        habitat=dino_model.habitat,
+        special_features=dino_model.special_features or [],
+        discovered_year=dino_model.discovered_year,
+        discoverer=dino_model.discoverer,
+        location_found=dino_model.location_found,
+        formation=dino_model.formation,
+        fossil_quality=dino_model.fossil_quality,
+        description=dino_model.description,
+        interesting_facts=dino_model.interesting_facts or [],
+        is_valid_species=dino_model.is_valid_species,
+        synonyms=dino_model.synonyms or []
+    )
+
+
+def selection(fields: Optional[Sequence[str]], sort: DinosaurSortField = DinosaurSortField.ID) -> List[Any]:
+    """What to SELECT: the whole DinosaurModel, or only the columns a projection needs"""
+    if fields is None:
+        return [DinosaurModel]
+    return [getattr(DinosaurModel, field) for field in load_fields(fields, sort)]
+
+
+def row_to_fields(row: Any, fields: Sequence[str]) -> Dict[str, Any]:
+    """JSON-ready dict of the requested fields of a column row"""
+    values = {field: getattr(row, field) for field in fields}
+    for field in LIST_COLUMNS:
+        if field in values and values[field] is None:
+            values[field] = []
+    for field in CATEGORICAL_TYPES:
+        if values.get(field) is not None:
+            values[field] = values[field].value
+    return values
+
+
+def to_dinosaurs(rows: Sequence[Any], fields: Optional[Sequence[str]] = None) -> List[Any]:
+    """Dinosaur models from whole-entity rows, or dicts of `fields` from column rows"""
+    if fields is None:
+        return [model_to_pydantic(row[0]) for row in rows]
+    return [row_to_fields(row, fields) for row in rows]
+
+
+def count_query(**filters) -> Select:
+    """Number of dinosaurs matching the get_all filters"""
+    return apply_filters(select(func.count(DinosaurModel.id)), **filters)
+
+
+def all_query(skip: int = 0, limit: int = 100, **filters) -> Select:
+    """One OFFSET page of dinosaurs in ID order"""
+    return apply_filters(select(DinosaurModel), **filters).order_by(DinosaurModel.id).offset(skip).limit(limit)
+
+
+def page_query(
+    skip: int = 0,
+    limit: int = 100,
+    sort: DinosaurSortField = DinosaurSortField.ID,
+    cursor: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+    **filters
+) -> Select:
+    """Page of (DinosaurModel, total) rows plus one look-ahead row.
+
+    The total is a COUNT(*) subquery over the filters alone, which the filter indexes
+    answer, while the page scan stops after `limit` + 1 rows. (A COUNT(*) OVER() window
+    would have to see every match first, yet gets planned as if the LIMIT cut it short.)
+    With a cursor, `skip` is ignored and the page is an index seek on (sort key, id)
+    instead of an OFFSET. With `fields` the rows hold only the columns of the projection
+    instead of DinosaurModel. Raises ValueError for an invalid cursor.
+    """
+    columns = selection(fields, sort)
+    sort_column = getattr(DinosaurModel, sort.value)
+    order = [sort_column, DinosaurModel.id] if sort != DinosaurSortField.ID else [DinosaurModel.id]
+
+    # Counted apart from the keyset predicate, which must not narrow the total
+    total = count_query(**filters).scalar_subquery()
+    stmt = apply_filters(select(*columns, total.label("total")), **filters)
+    if cursor:
+        key, last_id = decode_cursor(cursor, sort)
+        if sort == DinosaurSortField.ID:
+            stmt = stmt.filter(DinosaurModel.id > last_id)
+        else:
+            stmt = stmt.filter(tuple_(sort_column, DinosaurModel.id) > tuple_(key, last_id))
+        skip = 0
+
+    # Fetch one row more than asked to find out whether another page follows
+    return stmt.order_by(*order).offset(skip).limit(limit + 1)
+
+
+def export_query(**filters) -> Select:
+    """Every dinosaur matching the get_all filters, in ID order"""
+    return apply_filters(select(DinosaurModel), **filters).order_by(DinosaurModel.id)
+
+
+def needs_total_query(rows: Sequence[Any], skip: int, cursor: Optional[str]) -> bool:
+    """Whether a page query came back empty past the last page, leaving no row to carry the total"""
+    return not rows and bool(skip or cursor)
+
+
+def rows_to_page(
+    rows: Sequence[Any],
+    limit: int,
+    sort: DinosaurSortField,
+    total: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None
+) -> Page:
+    """Build a Page from the rows of page_query"""
+    if total is None:
+        total = rows[0].total if rows else 0
+    if fields is None:
+        dinosaurs = to_dinosaurs(rows)
+        return Page(dinosaurs[:limit], total, next_cursor(dinosaurs, limit, sort))
+    # Column rows carry the sort column and id, so the cursor comes straight from them
+    return Page(to_dinosaurs(rows[:limit], fields), total, next_cursor(rows, limit, sort))
+
+
+def by_id_query(dinosaur_id: int) -> Select:
+    """A single dinosaur by ID"""
+    return select(DinosaurModel).filter(DinosaurModel.id == dinosaur_id)
+
+
+def by_ids_query(dinosaur_ids: Sequence[int]) -> Select:
+    """Dinosaurs with any of the given IDs, bound as one array so the statement shape doesn't vary"""
+    return select(DinosaurModel).filter(
+        DinosaurModel.id == any_(bindparam("ids", list(dinosaur_ids), type_=ARRAY(Integer)))
+    )
+
+
+def in_request_order(dinosaur_ids: Sequence[int], dinosaurs: Sequence[Dinosaur]) -> List[Optional[Dinosaur]]:
+    """Line query results up with the requested IDs, None for the missing ones"""
+    by_id = {dinosaur.id: dinosaur for dinosaur in dinosaurs}
+    return [by_id.get(dinosaur_id) for dinosaur_id in dinosaur_ids]
+
+
+def alive_at_query(mya: float) -> Select:
+    """Dinosaurs alive at the given age in millions of years ago"""
+    return select(DinosaurModel).filter(age_overlaps(mya, mya)).order_by(DinosaurModel.id)
+
+
+def age_bounds_query(dinosaur_id: int) -> Select:
+    """Age range columns of a single dinosaur"""
+    return select(DinosaurModel.age_start_mya, DinosaurModel.age_end_mya).filter(DinosaurModel.id == dinosaur_id)
+
+
+def contemporaries_query(
+    dinosaur_id: int, bounds: Sequence[Optional[float]], skip: int = 0, limit: int = 100
+) -> Optional[Select]:
+    """A page of the dinosaurs overlapping the given (start, end) bounds, or None when no bound is known"""
+    known = [age for age in bounds if age is not None]
+    if not known:
+        return None
+    return (
+        select(DinosaurModel)
+        .filter(age_overlaps(min(known), max(known)), DinosaurModel.id != dinosaur_id)
+        .order_by(DinosaurModel.id)
+        .offset(skip)
+        .limit(limit)
+    )
+
+
+def search_query(query: str, fields: Optional[Sequence[str]] = None, limit: int = 100) -> Select:
+    """Weighted full-text search ranked by ts_rank, the `limit` best rows, selecting only `fields` if given"""
+    ts_query = func.websearch_to_tsquery(literal_column("'english'"), query)
+    rank = func.ts_rank(DinosaurModel.search_vector, ts_query)
+    return (
+        select(*selection(fields))
+        .filter(DinosaurModel.search_vector.op("@@")(ts_query))
+        .order_by(rank.desc(), DinosaurModel.id)
+        .limit(limit)
+    )
+
+
+LIKE_ESCAPE = "\\"
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE/ILIKE wildcards (%, _) and the escape character itself"""
+    return value.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2).replace("%", LIKE_ESCAPE + "%").replace("_", LIKE_ESCAPE + "_")
+
+
+def substring_search_query(query: str, fields: Optional[Sequence[str]] = None, limit: int = 100) -> Select:
+    """Trigram-indexed substring match on the short name columns, the `limit` most similar first.
+    
+    The query is matched literally: LIKE wildcards and the escape character in it are escaped.
+    """
+    search_term = f"%{escape_like(query)}%"
+    similarity = func.greatest(
+        func.similarity(DinosaurModel.name, query),
+        func.similarity(DinosaurModel.species, query),
+        func.similarity(DinosaurModel.genus, query)
+    )
+    return (
+        select(*selection(fields))
+        .filter(or_(
+            DinosaurModel.name.ilike(search_term, escape=LIKE_ESCAPE),
+            DinosaurModel.species.ilike(search_term, escape=LIKE_ESCAPE),
+            DinosaurModel.genus.ilike(search_term, escape=LIKE_ESCAPE)
+        ))
+        .order_by(similarity.desc(), DinosaurModel.id)
+        .limit(limit)
+    )
+
+
+def version_query() -> Select:
+    """Current (version, updated_at) of the dinosaurs data"""
+    return select(DatasetVersionModel.version, DatasetVersionModel.updated_at).filter(DatasetVersionModel.id == 1)
+
+
+def stats_query() -> Select:
+    """Every row of the dinosaur_stats summary table"""
+    return select(DinosaurStatsModel).order_by(DinosaurStatsModel.dimension, DinosaurStatsModel.value)
+
+
+def build_stats(rows: Sequence[DinosaurStatsModel]) -> Dict[str, Any]:
+    """Assemble the get_stats payload from the dinosaur_stats rows"""
+    stats = {
+        "total_dinosaurs": 0,
+        "periods": {},
+        "diets": {},
+        "sizes": {},
+        "average_length": 0,
+        "average_weight": 0
+    }
+    groups = {"period": stats["periods"], "diet": stats["diets"], "size": stats["sizes"]}
+    for row in rows:
+        if row.dimension == "total":
+            stats["total_dinosaurs"] = row.dinosaurs
+            if row.length_count:
+                stats["average_length"] = float(row.length_sum / row.length_count)
+            if row.weight_count:
+                stats["average_weight"] = float(row.weight_sum / row.weight_count)
+        elif row.dimension in groups:
+            groups[row.dimension][row.value] = row.dinosaurs
+    return stats
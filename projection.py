@@ -0,0 +1,26 @@
+from typing import Optional, Sequence, Tuple
+
+from models import Dinosaur, DinosaurSortField
+
+# Fields a ?fields= list may name, in the order responses emit them
+FIELDS = tuple(Dinosaur.model_fields)
+
+
+def parse_fields(value: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Field names of a comma-separated ?fields= list in response order, always including id.
+
+    Returns None (every field) for an empty list. Raises ValueError for an unknown field.
+    """
+    requested = {part.strip() for part in (value or "").split(",") if part.strip()}
+    if not requested:
+        return None
+    unknown = requested.difference(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}; valid fields are {', '.join(FIELDS)}")
+    requested.add("id")
+    return tuple(field for field in FIELDS if field in requested)
+
+
+def load_fields(fields: Sequence[str], sort: DinosaurSortField = DinosaurSortField.ID) -> Tuple[str, ...]:
+    """Fields to read for a projection: the requested ones plus the sort column cursors are built from"""
+    return tuple(dict.fromkeys((*fields, sort.value)))
@@ -0,0 +1,188 @@
+import functools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from pydantic import BaseModel
+
+# Default bounds, overridable per process
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_BYTES = int(os.getenv("QUERY_CACHE_BYTES", str(64 * 1024 * 1024)))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "60"))
+
+# Items of a long list whose sizes are measured to estimate the whole list
+SIZE_SAMPLE = 8
+
+
+def _normalize(value: Any) -> Hashable:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(item) for item in value)
+    return value
+
+
+def make_key(name: str, args: Tuple, kwargs: Dict[str, Any]) -> Hashable:
+    """Cache key for a call; None keyword arguments are dropped so omitted and default filters match"""
+    return (
+        name,
+        tuple(_normalize(arg) for arg in args),
+        tuple(sorted((key, _normalize(value)) for key, value in kwargs.items() if value is not None)),
+    )
+
+
+def approximate_size(value: Any) -> int:
+    """Rough memory footprint of a query result in bytes; long lists are estimated from a sample"""
+    if isinstance(value, BaseModel):
+        return sys.getsizeof(value) + approximate_size(value.__dict__)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            approximate_size(key) + approximate_size(item) for key, item in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        sample = value[:SIZE_SAMPLE]
+        items = sum(approximate_size(item) for item in sample)
+        return sys.getsizeof(value) + (items * len(value) // len(sample) if sample else 0)
+    return sys.getsizeof(value)
+
+
+def copy_result(value: Any) -> Any:
+    """A copy of a query result sharing no list, dict or model with it, so callers can't alter
+    a cached value; strings, numbers, enums and datetimes are immutable and shared"""
+    if isinstance(value, list):
+        return [copy_result(item) for item in value]
+    if isinstance(value, dict):
+        return {key: copy_result(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        items = [copy_result(item) for item in value]
+        # Named tuples such as pagination.Page keep their type
+        return value._make(items) if hasattr(value, "_make") else tuple(items)
+    if isinstance(value, BaseModel):
+        return value.model_copy(update={
+            name: copy_result(item) for name, item in value if isinstance(item, (list, dict, tuple, BaseModel))
+        })
+    return value
+
+
+class QueryCache:
+    """LRU cache with a TTL for query results, bounded by entries and approximate bytes and
+    invalidated when the dataset version changes.
+    
+    Values are copied in and out (see copy_result), so no caller shares a result with another.
+    """
+
+    def __init__(self, max_size: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL, max_bytes: int = QUERY_CACHE_BYTES):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (expiry, approximate size, value)
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (hit, a copy of the value) for a key"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                value = entry[2]
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                    self._size -= entry[1]
+                self.misses += 1
+                return False, None
+        return True, copy_result(value)
+
+    def set(self, key: Hashable, value: Any):
+        """Store a copy of a value, evicting the least recently used entries beyond max_size
+        entries or max_bytes; a value larger than max_bytes on its own is not stored"""
+        if self.max_size <= 0:
+            return
+        size = approximate_size(value)
+        if size > self.max_bytes:
+            return
+        value = copy_result(value)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._size += size
+            while len(self._entries) > self.max_size or self._size > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._size -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._size = 0
+
+    def validate(self, version: int):
+        """Drop every entry when the dataset version moved since the last call"""
+        if version != self._version:
+            self.clear()
+            self._version = version
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+            }
+
+
+def cached_query(method):
+    """Serve a database method from `self.cache`, keyed on its normalized arguments.
+
+    The owner provides `_cache_version()`, returning the current dataset version.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.cache.validate(self._cache_version())
+        key = make_key(method.__name__, args, kwargs)
+        hit, value = self.cache.get(key)
+        if not hit:
+            value = method(self, *args, **kwargs)
+            self.cache.set(key, value)
+        return value
+    return wrapper
+
+
+def cached_async_query(method):
+    """Async variant of cached_query; `_cache_version()` is awaited"""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        self.cache.validate(await self._cache_version())
+        key = make_key(method.__name__, args, kwargs)
+        hit, value = self.cache.get(key)
+        if not hit:
+            value = await method(self, *args, **kwargs)
+            self.cache.set(key, value)
+        return value
+    return wrapper
@@ -0,0 +1,123 @@
+import sys
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Type
+
+from models import (
+    Dinosaur, DinosaurPeriod, DinosaurClade, DinosaurGroup, DinosaurDiet,
+    DinosaurSize, DinosaurLocomotion, DinosaurHabitat, FossilQuality
+)
+
+# Enum fields, stored as the member's position in its enum
+ENUM_FIELDS: Dict[str, Type[Enum]] = {
+    "period": DinosaurPeriod,
+    "clade": DinosaurClade,
+    "group": DinosaurGroup,
+    "diet": DinosaurDiet,
+    "size": DinosaurSize,
+    "locomotion": DinosaurLocomotion,
+    "habitat": DinosaurHabitat,
+    "fossil_quality": FossilQuality,
+}
+
+# Strings shared by many records, kept once per process
+INTERNED_FIELDS = ("species", "genus", "discoverer", "location_found", "formation")
+
+# List fields, stored as tuples of interned strings
+LIST_FIELDS = ("special_features", "interesting_facts", "synonyms")
+
+_MEMBERS = {field: list(enum) for field, enum in ENUM_FIELDS.items()}
+_CODES = {field: {member: code for code, member in enumerate(members)} for field, members in _MEMBERS.items()}
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+class DinosaurRecord:
+    """Compact stored form of a Dinosaur: no per-instance dict, enum codes, interned strings and tuples"""
+
+    __slots__ = tuple(Dinosaur.model_fields)
+
+    @classmethod
+    def from_model(cls, dinosaur: Dinosaur) -> "DinosaurRecord":
+        record = cls()
+        for field in cls.__slots__:
+            value = getattr(dinosaur, field)
+            if field in ENUM_FIELDS:
+                value = _CODES[field][value] if value is not None else None
+            elif field in INTERNED_FIELDS:
+                value = _intern(value)
+            elif field in LIST_FIELDS:
+                value = tuple(sys.intern(item) for item in value) if value is not None else None
+            setattr(record, field, value)
+        return record
+
+    def to_model(self) -> Dinosaur:
+        """Materialize the record; the values were validated when it was stored"""
+        values: Dict[str, Any] = {}
+        for field in self.__slots__:
+            value = getattr(self, field)
+            if field in ENUM_FIELDS:
+                value = _MEMBERS[field][value] if value is not None else None
+            elif field in LIST_FIELDS:
+                value = list(value) if value is not None else None
+            values[field] = value
+        return Dinosaur.model_construct(**values)
+
+    def project(self, fields: Sequence[str]) -> Dict[str, Any]:
+        """JSON-ready values of the given fields only, without building a model"""
+        values: Dict[str, Any] = {}
+        for field in fields:
+            value = getattr(self, field)
+            if field in ENUM_FIELDS:
+                value = _MEMBERS[field][value].value if value is not None else None
+            elif field in LIST_FIELDS:
+                value = list(value) if value is not None else None
+            values[field] = value
+        return values
+
+
+class RecordStore:
+    """Dinosaur records by ID, held as DinosaurRecord and handed out as Dinosaur models"""
+
+    def __init__(self):
+        self._records: Dict[int, DinosaurRecord] = {}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, dinosaur_id: int) -> bool:
+        return dinosaur_id in self._records
+
+    def __iter__(self) -> Iterator[DinosaurRecord]:
+        """Every stored record"""
+        return iter(self._records.values())
+
+    def put(self, dinosaur: Dinosaur):
+        """Store or replace a dinosaur"""
+        self._records[dinosaur.id] = DinosaurRecord.from_model(dinosaur)
+
+    def get(self, dinosaur_id: int) -> Optional[Dinosaur]:
+        """Materialize a dinosaur by ID"""
+        record = self._records.get(dinosaur_id)
+        return record.to_model() if record is not None else None
+
+    def pop(self, dinosaur_id: int) -> Optional[Dinosaur]:
+        """Remove a dinosaur and return it"""
+        record = self._records.pop(dinosaur_id, None)
+        return record.to_model() if record is not None else None
+
+    def records(self, ids: Iterable[int]) -> Iterator[DinosaurRecord]:
+        """Stored records for a sequence of existing IDs"""
+        records = self._records
+        return (records[dinosaur_id] for dinosaur_id in ids)
+
+    def materialize(self, records: Iterable[DinosaurRecord]) -> List[Dinosaur]:
+        """Dinosaur models for stored records"""
+        return [record.to_model() for record in records]
+
+    def project(self, records: Iterable[DinosaurRecord], fields: Optional[Sequence[str]]) -> List[Any]:
+        """Dicts of the given fields for stored records, or Dinosaur models when fields is None"""
+        if fields is None:
+            return self.materialize(records)
+        return [record.project(fields) for record in records]
@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, NamedTuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from http_cache import etag_matches
+from models import (
+    DinosaurPeriod, DinosaurClade, DinosaurGroup, DinosaurDiet,
+    DinosaurSize, DinosaurLocomotion, DinosaurHabitat, FossilQuality
+)
+
+# The reference lists only change with a deploy, so they may be cached for a long time
+REFERENCE_MAX_AGE = int(os.getenv("REFERENCE_MAX_AGE", "86400"))
+
+REFERENCE_ENUMS = {
+    "periods": DinosaurPeriod,
+    "clades": DinosaurClade,
+    "groups": DinosaurGroup,
+    "diets": DinosaurDiet,
+    "sizes": DinosaurSize,
+    "locomotion": DinosaurLocomotion,
+    "habitats": DinosaurHabitat,
+    "fossil_qualities": FossilQuality,
+}
+
+
+class EncodedPayload(NamedTuple):
+    """A JSON body encoded once, with its strong ETag.
+
+    Compressed variants are made and kept by content_encoding.CompressionMiddleware.
+    """
+    body: bytes
+    etag: str
+
+
+def encode(payload: Any) -> EncodedPayload:
+    """Encode a payload the way FastAPI's JSONResponse would"""
+    body = json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return EncodedPayload(body, f'"{digest}"')
+
+
+def reference_response(request: Request, payload: EncodedPayload) -> Response:
+    """Serve a pre-encoded payload, or a 304 on a matching ETag"""
+    headers = {
+        "ETag": payload.etag,
+        "Cache-Control": f"public, max-age={REFERENCE_MAX_AGE}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), payload.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(payload.body, media_type="application/json", headers=headers)
+
+
+def _build() -> Dict[str, EncodedPayload]:
+    lists = {name: [member.value for member in enum] for name, enum in REFERENCE_ENUMS.items()}
+    encoded = {name: encode(values) for name, values in lists.items()}
+    encoded["reference"] = encode(lists)
+    return encoded
+
+
+# Every reference payload, rendered once at import
+REFERENCE = _build()
@@ -0,0 +1,192 @@
+# Read replicas for the API engine. Read sessions are spread over the healthy replicas,
+# round robin or to the one with the fewest connections in use; with no healthy replica
+# they go to the primary. Migrations, seeding and writes always use the primary engine.
+#
+# A replica is healthy once a health check has reached it (and, with a max lag, found it
+# close enough to the primary). It is taken out of rotation by a failed check or as soon
+# as one of its connections fails, and put back by the next successful check. A read that
+# loses its replica connection that way is retried once on the primary.
+
+import asyncio
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar, Union
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from pool_metrics import PoolMetrics
+
+STRATEGIES = ("round_robin", "least_connections")
+
+T = TypeVar("T")
+
+# Seconds since the last transaction replayed from the primary; 0 on a primary, or on a
+# replica that has replayed everything it received (an idle primary sends nothing new)
+REPLICATION_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class Replica:
+    """One read replica: its engine, session factory and the outcome of its last health check"""
+
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        self.metrics = PoolMetrics()
+        self.metrics.attach(engine.sync_engine.pool)
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self.sessions = 0
+        event.listen(engine.sync_engine, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        # Lost connections and failed connects take the replica out until the next check
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(repr(context.original_exception))
+
+    def mark_down(self, error: str):
+        self.healthy = False
+        self.error = error
+
+    def in_use(self) -> int:
+        """Connections currently checked out of the replica's pool"""
+        return self.engine.sync_engine.pool.checkedout()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "error": self.error,
+            "checked_seconds_ago": time.monotonic() - self.checked_at if self.checked_at is not None else None,
+            "sessions": self.sessions,
+            "pool": self.metrics.snapshot(self.engine.sync_engine.pool),
+        }
+
+
+class ReplicaRouter:
+    """Hands out read sessions on a healthy replica, or on the primary when there is none"""
+
+    def __init__(
+        self,
+        primary: async_sessionmaker,
+        replicas: List[Replica],
+        strategy: str = "round_robin",
+        max_lag: Optional[float] = None,
+        check_timeout: float = 2.0
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown replica strategy {strategy!r}, expected one of {', '.join(STRATEGIES)}")
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.check_timeout = check_timeout
+        self.primary_sessions = 0
+        self._turn = itertools.count()
+
+    def healthy(self) -> List[Replica]:
+        return [replica for replica in self.replicas if replica.healthy]
+
+    def choose(self) -> Optional[Replica]:
+        """The replica for the next read, None for the primary"""
+        candidates = self.healthy()
+        if not candidates:
+            return None
+        start = next(self._turn) % len(candidates)
+        if self.strategy == "round_robin":
+            return candidates[start]
+        # Rotating first spreads ties, e.g. every replica idle, instead of always taking the first
+        rotated = candidates[start:] + candidates[:start]
+        return min(rotated, key=lambda replica: replica.in_use())
+
+    def primary_session(self) -> AsyncSession:
+        self.primary_sessions += 1
+        return self.primary()
+
+    def read_session(self) -> AsyncSession:
+        """A session for read-only queries; info["replica"] names the replica it is on, if any"""
+        replica = self.choose()
+        if replica is None:
+            return self.primary_session()
+        replica.sessions += 1
+        session = replica.session_factory()
+        session.info["replica"] = replica
+        return session
+
+    def lost_replica(self, session: AsyncSession, exc: Union[DBAPIError, OSError]) -> bool:
+        """Whether `exc` raised on `session` means its replica is gone, taking the replica out if so.
+
+        True for a dropped connection or a failed connect on a replica session, the failures
+        worth retrying elsewhere; False for everything else, including any failure on the primary.
+        """
+        replica = session.info.get("replica")
+        if replica is None:
+            return False
+        if isinstance(exc, OSError):
+            # A refused or unreachable connect, raised by the driver before SQLAlchemy wraps anything
+            replica.mark_down(repr(exc))
+        elif exc.connection_invalidated:
+            replica.mark_down(repr(exc.orig))
+        # Otherwise Replica._on_error has already taken it out if the failure was a lost connection
+        return not replica.healthy
+
+    async def run(self, work: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        """Run the read-only `work` on a read session. If the replica's connection is lost,
+        the replica is taken out and `work` runs once more on the primary."""
+        session = self.read_session()
+        try:
+            async with session:
+                return await work(session)
+        except (DBAPIError, OSError) as exc:
+            if not self.lost_replica(session, exc):
+                raise
+        async with self.primary_session() as session:
+            return await work(session)
+
+    async def _check(self, replica: Replica):
+        async def replication_lag() -> float:
+            async with replica.engine.connect() as conn:
+                return float((await conn.execute(text(REPLICATION_LAG_SQL))).scalar_one())
+        try:
+            lag = await asyncio.wait_for(replication_lag(), self.check_timeout)
+        except Exception as exc:
+            replica.lag = None
+            replica.mark_down(repr(exc))
+        else:
+            replica.lag = lag
+            if self.max_lag is not None and lag > self.max_lag:
+                replica.mark_down(f"lag {lag:.1f}s exceeds {self.max_lag:g}s")
+            else:
+                replica.healthy = True
+                replica.error = None
+        replica.checked_at = time.monotonic()
+
+    async def check(self):
+        """Health check every replica concurrently"""
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    async def monitor(self, interval: float):
+        """Health check the replicas every `interval` seconds, until cancelled"""
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "max_lag_seconds": self.max_lag,
+            "healthy": len(self.healthy()),
+            "primary_sessions": self.primary_sessions,
+            "replicas": [replica.status() for replica in self.replicas],
+        }
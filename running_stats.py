@@ -0,0 +1,55 @@
+from collections import Counter
+from fractions import Fraction
+from typing import Any, Dict, Iterable, Optional
+
+
+class _RunningMean:
+    """Sum and count of the known values of a field; the sum is exact so removals don't drift"""
+
+    def __init__(self):
+        self.total = Fraction(0)
+        self.count = 0
+
+    def add(self, value: Optional[float], sign: int = 1):
+        if value is not None:
+            self.total += sign * Fraction(value)
+            self.count += sign
+
+    def mean(self) -> float:
+        return float(self.total / self.count) if self.count else 0
+
+
+class RunningStats:
+    """Aggregates for get_stats, kept up to date record by record"""
+
+    def __init__(self, group_fields: Iterable[str], mean_fields: Iterable[str]):
+        self.total = 0
+        self._groups: Dict[str, Counter] = {field: Counter() for field in group_fields}
+        self._means: Dict[str, _RunningMean] = {field: _RunningMean() for field in mean_fields}
+
+    def _apply(self, record: Any, sign: int):
+        self.total += sign
+        for field, counts in self._groups.items():
+            value = getattr(record, field)
+            key = value.value if hasattr(value, "value") else value
+            counts[key] += sign
+            if counts[key] <= 0:
+                del counts[key]
+        for field, running in self._means.items():
+            running.add(getattr(record, field), sign)
+
+    def add(self, record: Any):
+        """Count a record in"""
+        self._apply(record, 1)
+
+    def remove(self, record: Any):
+        """Count a record out; it must have been added with the same values"""
+        self._apply(record, -1)
+
+    def counts(self, field: str) -> Dict[Any, int]:
+        """Number of records per value of a grouped field"""
+        return dict(self._groups[field])
+
+    def mean(self, field: str) -> float:
+        """Average of the known values of a field, 0 when there are none"""
+        return self._means[field].mean()
@@ -0,0 +1,253 @@
+import heapq
+import math
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Relative weight of a term occurrence in each searchable field (BM25F style)
+FIELD_WEIGHTS: Dict[str, float] = {
+    "name": 3.0,
+    "species": 2.0,
+    "genus": 2.0,
+    "synonyms": 2.0,
+    "description": 1.0,
+    "interesting_facts": 1.0,
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Number of scored tokens and rankings kept between writes
+TOKEN_CACHE_SIZE = 1024
+
+
+# Columns searched by substring when the token search finds nothing, as in the Postgres
+# backend (postgres_queries.substring_search_query)
+SUBSTRING_FIELDS = ("name", "species", "genus")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric tokens"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of every word, padded the way pg_trgm does it"""
+    grams = set()
+    for word in tokenize(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: str, b: str) -> float:
+    """Shared trigrams over all trigrams of both strings, like pg_trgm's similarity()"""
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    union = len(grams_a | grams_b)
+    return len(grams_a & grams_b) / union if union else 0.0
+
+
+class InvertedIndex:
+    """In-memory inverted index with prefix matching and BM25 ranking"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> {doc_id: weighted term frequency}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        # Sorted vocabulary used for prefix lookups
+        self._terms: List[str] = []
+        self._doc_terms: Dict[int, Set[str]] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._total_length = 0.0
+        # Scored postings per query token; only valid until the next write
+        self._token_cache: Dict[str, Dict[int, float]] = {}
+        self._ranking_cache: Dict[Tuple[str, ...], Dict[int, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, doc_id: int, fields: Dict[str, Iterable[str]]):
+        """Index a document given as a mapping of field name to its text values"""
+        if doc_id in self._doc_lengths:
+            self.remove(doc_id)
+        self._invalidate()
+
+        frequencies: Dict[str, float] = {}
+        length = 0.0
+        for field, values in fields.items():
+            weight = FIELD_WEIGHTS.get(field, 1.0)
+            for value in values:
+                for token in tokenize(value):
+                    frequencies[token] = frequencies.get(token, 0.0) + weight
+                    length += weight
+
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._terms.insert(bisect_left(self._terms, term), term)
+            postings[doc_id] = frequency
+
+        self._doc_terms[doc_id] = set(frequencies)
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+
+    def remove(self, doc_id: int):
+        """Drop a document from the index"""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._invalidate()
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+
+    def _invalidate(self):
+        """Forget cached scores after the corpus changed"""
+        self._token_cache.clear()
+        self._ranking_cache.clear()
+
+    def _expand(self, prefix: str) -> List[str]:
+        """Return every indexed term starting with the given prefix"""
+        start = bisect_left(self._terms, prefix)
+        end = bisect_left(self._terms, prefix + "\uffff", start)
+        return self._terms[start:end]
+
+    def _score_token(self, token: str) -> Dict[int, float]:
+        """BM25 scores of every document matching a (prefix) query token"""
+        cached = self._token_cache.get(token)
+        if cached is not None:
+            return cached
+
+        doc_count = len(self._doc_lengths)
+        avg_length = self._total_length / doc_count or 1.0
+        token_scores: Dict[int, float] = {}
+        for term in self._expand(token):
+            postings = self._postings[term]
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                score = idf * frequency * (self.k1 + 1) / (frequency + norm)
+                # A token expanding to several terms counts its best match only
+                if score > token_scores.get(doc_id, 0.0):
+                    token_scores[doc_id] = score
+
+        if len(self._token_cache) >= TOKEN_CACHE_SIZE:
+            self._token_cache.clear()
+        self._token_cache[token] = token_scores
+        return token_scores
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Return (doc_id, score) pairs matching every query token, best first"""
+        tokens = tokenize(query)
+        if not tokens or not self._doc_lengths:
+            return []
+
+        key = tuple(sorted(set(tokens)))
+        scores = self._ranking_cache.get(key)
+        if scores is None:
+            # Intersect the most selective tokens first
+            token_scores = sorted((self._score_token(token) for token in key), key=len)
+            scores = token_scores[0]
+            for other in token_scores[1:]:
+                # Every query token has to match (AND semantics)
+                scores = {doc_id: score + other[doc_id] for doc_id, score in scores.items() if doc_id in other}
+            if len(self._ranking_cache) >= TOKEN_CACHE_SIZE:
+                self._ranking_cache.clear()
+            self._ranking_cache[key] = scores
+        rank = lambda item: (-item[1], item[0])
+        if limit is not None:
+            # Partial sort: O(n log limit) rather than ranking every match
+            return heapq.nsmallest(limit, scores.items(), key=rank)
+        return sorted(scores.items(), key=rank)
+
+
+class TrigramIndex:
+    """Trigram postings of a few short text fields, the in-memory counterpart of a pg_trgm GIN index.
+    
+    `candidates()` narrows a substring query down to the documents that can contain it, and
+    `similarities()` scores documents against a query without recomputing their trigrams.
+    """
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = tuple(fields)
+        # field -> trigram -> ids of the documents whose value has it
+        self._postings: Dict[str, Dict[str, Set[int]]] = {field: {} for field in self.fields}
+        # doc_id -> number of trigrams of each field's value
+        self._sizes: Dict[int, Tuple[int, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def add(self, doc_id: int, values: Dict[str, Optional[str]]):
+        """Index a document given as a mapping of field name to its value"""
+        sizes = []
+        for field in self.fields:
+            grams = trigrams(values.get(field) or "")
+            postings = self._postings[field]
+            for gram in grams:
+                postings.setdefault(gram, set()).add(doc_id)
+            sizes.append(len(grams))
+        self._sizes[doc_id] = tuple(sizes)
+
+    def remove(self, doc_id: int, values: Dict[str, Optional[str]]):
+        """Drop a document, given the values it was indexed with"""
+        if self._sizes.pop(doc_id, None) is None:
+            return
+        for field in self.fields:
+            postings = self._postings[field]
+            for gram in trigrams(values.get(field) or ""):
+                docs = postings[gram]
+                docs.discard(doc_id)
+                if not docs:
+                    del postings[gram]
+
+    def candidates(self, needle: str) -> Optional[Set[int]]:
+        """Documents that may contain `needle` in one of the fields, or None if the needle has
+        no letters or digits to look up and every document has to be checked.
+        
+        Every trigram of a word in the needle is a trigram of the word containing it in a
+        matching value, so this is a superset of the matches; check them with `in`.
+        """
+        runs = _TOKEN_RE.findall(needle.lower())
+        if not runs:
+            return None
+        found: Set[int] = set()
+        for postings in self._postings.values():
+            docs: Optional[Set[int]] = None
+            for run in runs:
+                if len(run) >= 3:
+                    lists = [postings.get(run[i:i + 3], set()) for i in range(len(run) - 2)]
+                    run_docs = set.intersection(*sorted(lists, key=len))
+                else:
+                    # Too short for a whole trigram: every trigram containing it
+                    run_docs = set().union(*(ids for gram, ids in postings.items() if run in gram))
+                docs = run_docs if docs is None else docs & run_docs
+                if not docs:
+                    break
+            found |= docs
+        return found
+
+    def similarities(self, doc_ids: Iterable[int], query: str) -> Dict[int, float]:
+        """Best `similarity()` of the query to any of the fields of each document"""
+        query_grams = trigrams(query)
+        shared = [Counter() for _ in self.fields]
+        for counts, field in zip(shared, self.fields):
+            postings = self._postings[field]
+            for gram in query_grams:
+                counts.update(postings.get(gram, ()))
+        scores = {}
+        for doc_id in doc_ids:
+            best = 0.0
+            for counts, size in zip(shared, self._sizes[doc_id]):
+                common = counts[doc_id]
+                union = size + len(query_grams) - common
+                if union and common / union > best:
+                    best = common / union
+            scores[doc_id] = best
+        return scores
@@ -0,0 +1,107 @@
+from models import (
+    DinosaurPeriod, DinosaurDiet, DinosaurSize, DinosaurClade,
+    DinosaurGroup, DinosaurLocomotion, DinosaurHabitat, FossilQuality
+)
+
+# Scientifically accurate seed data for an empty PostgreSQL database
+INITIAL_DINOSAURS = [
+    {
+        "name": "Tyrannosaurus Rex",
+        "species": "Tyrannosaurus rex",
+        "genus": "Tyrannosaurus",
+        "period": DinosaurPeriod.LATE_CRETACEOUS.value,
+        "age_start_mya": 68.0,
+        "age_end_mya": 66.0,
+        "clade": DinosaurClade.SAURISCHIA.value,
+        "group": DinosaurGroup.TYRANNOSAURIA.value,
+        "diet": DinosaurDiet.CARNIVORE.value,
+        "size": DinosaurSize.MASSIVE.value,
+        "length_meters": 12.3,
+        "height_meters": 4.0,
+        "weight_kg": 8400,
+        "skull_length_cm": 150,
+        "locomotion": DinosaurLocomotion.BIPEDAL.value,
+        "habitat": DinosaurHabitat.TERRESTRIAL.value,
+        "special_features": ["Massive skull", "Powerful bite force", "Tiny arms", "Binocular vision"],
+        "discovered_year": 1905,
+        "discoverer": "Henry Fairfield Osborn",
+        "location_found": "Montana, USA",
+        "formation": "Hell Creek Formation",
+        "fossil_quality": FossilQuality.EXCELLENT.value,
+        "description": "One of the largest land predators ever known, T-Rex was a formidable apex predator with powerful jaws capable of crushing bone.",
+        "interesting_facts": [
+            "Had a bite force of over 12,800 pounds",
+            "Possessed excellent vision and smell",
+            "Could grow up to 40 feet long",
+            "Lived in family groups"
+        ],
+        "is_valid_species": True,
+        "synonyms": ["T-Rex", "King of the tyrant lizards"]
+    },
+    {
+        "name": "Triceratops",
+        "species": "Triceratops horridus",
+        "genus": "Triceratops",
+        "period": DinosaurPeriod.LATE_CRETACEOUS.value,
+        "age_start_mya": 68.0,
+        "age_end_mya": 66.0,
+        "clade": DinosaurClade.ORNITHISCHIA.value,
+        "group": DinosaurGroup.CERATOPSIA.value,
+        "diet": DinosaurDiet.HERBIVORE.value,
+        "size": DinosaurSize.LARGE.value,
+        "length_meters": 9.0,
+        "height_meters": 3.0,
+        "weight_kg": 6000,
+        "skull_length_cm": 250,
+        "locomotion": DinosaurLocomotion.QUADRUPEDAL.value,
+        "habitat": DinosaurHabitat.TERRESTRIAL.value,
+        "special_features": ["Three facial horns", "Large bony frill", "Parrot-like beak"],
+        "discovered_year": 1889,
+        "discoverer": "Othniel Charles Marsh",
+        "location_found": "Colorado, USA",
+        "formation": "Lance Formation",
+        "fossil_quality": FossilQuality.EXCELLENT.value,
+        "description": "A large herbivorous dinosaur known for its distinctive three horns and large bony frill.",
+        "interesting_facts": [
+            "Used its horns for defense and display",
+            "Had a powerful beak for cutting vegetation",
+            "One of the last dinosaur species before extinction",
+            "Lived in herds for protection"
+        ],
+        "is_valid_species": True,
+        "synonyms": ["Three-horned face"]
+    },
+    {
+        "name": "Velociraptor",
+        "species": "Velociraptor mongoliensis",
+        "genus": "Velociraptor",
+        "period": DinosaurPeriod.LATE_CRETACEOUS.value,
+        "age_start_mya": 75.0,
+        "age_end_mya": 71.0,
+        "clade": DinosaurClade.SAURISCHIA.value,
+        "group": DinosaurGroup.DROMAEOSAURIDAE.value,
+        "diet": DinosaurDiet.CARNIVORE.value,
+        "size": DinosaurSize.SMALL.value,
+        "length_meters": 2.0,
+        "height_meters": 0.5,
+        "weight_kg": 15,
+        "skull_length_cm": 25,
+        "locomotion": DinosaurLocomotion.BIPEDAL.value,
+        "habitat": DinosaurHabitat.TERRESTRIAL.value,
+        "special_features": ["Sickle-shaped claw", "Feathers", "High intelligence", "Pack hunting behavior"],
+        "discovered_year": 1924,
+        "discoverer": "Henry Fairfield Osborn",
+        "location_found": "Mongolia",
+        "formation": "Djadochta Formation",
+        "fossil_quality": FossilQuality.GOOD.value,
+        "description": "A small but intelligent raptor dinosaur known for its sickle-shaped killing claw and pack hunting behavior.",
+        "interesting_facts": [
+            "Had feathers for display and temperature regulation",
+            "Hunted in coordinated packs",
+            "Could reach speeds of 40 mph",
+            "Much smaller than portrayed in movies"
+        ],
+        "is_valid_species": True,
+        "synonyms": ["Swift thief", "Raptor"]
+    }
+]
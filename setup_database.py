@@ -2,6 +2,9 @@
 """
 Database setup script for the Dinosaur API
 This script will create the PostgreSQL database and tables
+
+Usage: python setup_database.py [catalog.ndjson|catalog.csv]
+An optional catalog file is bulk imported after the initial data (see bulk_import.py).
 """
 
 import os
@@ -61,10 +64,12 @@ def create_database():
     return True
 
 def create_tables():
-    """Create tables using SQLAlchemy"""
+    """Create or upgrade the tables with the schema migrations"""
     try:
-        from db_config import create_tables as create_db_tables
-        create_db_tables()
+        from migrations import upgrade
+        ran = upgrade()
+        for migration in ran:
+            print(f"  applied {migration.version}: {migration.description}")
         print("✅ Database tables created successfully!")
         return True
     except Exception as e:
@@ -75,12 +80,28 @@ def populate_data():
     """Populate initial data"""
     try:
         from database_postgres import db
+        db.initialize()
         print("✅ Initial data populated successfully!")
         return True
     except Exception as e:
         print(f"❌ Error populating data: {e}")
         return False
 
+def import_catalog(path):
+    """Bulk import a catalog file"""
+    try:
+        from bulk_import import import_file, print_progress
+        print(f"Importing catalog '{path}'...")
+        result = import_file(path, progress=print_progress)
+        print()
+        for _, message in result.errors:
+            print(f"⚠️  {message}")
+        print(f"✅ {result.rows_written:,} rows imported in {result.seconds:.1f}s ({result.rows_rejected:,} rejected)")
+        return True
+    except Exception as e:
+        print(f"❌ Error importing catalog: {e}")
+        return False
+
 def main():
     """Main setup function"""
     print("🦕 Setting up Dinosaur API Database...")
@@ -98,6 +119,10 @@ def main():
     if not populate_data():
         sys.exit(1)
     
+    # Step 4: Import a full catalog, if given
+    if len(sys.argv) > 1 and not import_catalog(sys.argv[1]):
+        sys.exit(1)
+    
     print("="*50)
     print("🎉 Database setup completed successfully!")
     print("\nNext steps:")
@@ -0,0 +1,26 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Iterator, List, Optional, Tuple
+
+
+class SortedIndex:
+    """(key, id) pairs kept in order, so keyset pages on the key are a bisect and a walk"""
+
+    def __init__(self):
+        self._entries: List[Tuple[Any, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: Any, doc_id: int):
+        insort(self._entries, (key, doc_id))
+
+    def remove(self, key: Any, doc_id: int):
+        position = bisect_left(self._entries, (key, doc_id))
+        if position < len(self._entries) and self._entries[position] == (key, doc_id):
+            del self._entries[position]
+
+    def after(self, position: Optional[Tuple[Any, int]] = None) -> Iterator[int]:
+        """IDs in (key, id) order, starting just past `position` (from the start when None)"""
+        start = bisect_right(self._entries, position) if position is not None else 0
+        for index in range(start, len(self._entries)):
+            yield self._entries[index][1]
@@ -0,0 +1,5 @@
+import time
+
+# When the API started importing. main imports this module first, so the difference to the
+# start of the lifespan is the time its imports took.
+IMPORT_STARTED = time.perf_counter()
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from database import DinosaurDatabase
+from models import (
+    DinosaurCreate, DinosaurPeriod, DinosaurClade, DinosaurGroup, DinosaurDiet,
+    DinosaurSize, DinosaurLocomotion, DinosaurHabitat, FossilQuality
+)
+
+
+@pytest.fixture
+def memory_db():
+    """A fresh in-memory database holding the seed dinosaurs"""
+    return DinosaurDatabase()
+
+
+@pytest.fixture
+def make_dinosaur():
+    """Factory of valid DinosaurCreate payloads: random enum values and sizes, overridable by keyword"""
+    rng = random.Random(20251017)
+    counter = iter(range(1, 10**6))
+
+    def make(**overrides) -> DinosaurCreate:
+        number = next(counter)
+        start = round(rng.uniform(66, 250), 1)
+        values = {
+            "name": f"Testosaurus {number}",
+            "species": f"Testosaurus species{number}",
+            "genus": "Testosaurus",
+            "period": rng.choice(list(DinosaurPeriod)),
+            "age_start_mya": start,
+            "age_end_mya": round(start - rng.uniform(0, 20), 1),
+            "clade": rng.choice(list(DinosaurClade)),
+            "group": rng.choice(list(DinosaurGroup)),
+            "diet": rng.choice(list(DinosaurDiet)),
+            "size": rng.choice(list(DinosaurSize)),
+            "length_meters": round(rng.uniform(0.5, 35), 1),
+            "weight_kg": round(rng.uniform(1, 60000)),
+            "locomotion": rng.choice(list(DinosaurLocomotion)),
+            "habitat": rng.choice(list(DinosaurHabitat)),
+            "fossil_quality": rng.choice(list(FossilQuality) + [None]),
+            "description": f"Test dinosaur number {number}",
+        }
+        values.update(overrides)
+        return DinosaurCreate(**values)
+
+    return make
+
+
+@pytest.fixture
+def api(monkeypatch, memory_db):
+    """A client of main.app whose routes read from `memory_db` instead of PostgreSQL; no lifespan"""
+    import main
+    from fastapi.testclient import TestClient
+
+    def adapt(method):
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+    async def export(**filters):
+        for dinosaur in memory_db.export(**filters):
+            yield dinosaur
+
+    for name in ("get_page", "get_by_id", "get_many", "get_contemporaries", "search", "get_stats"):
+        monkeypatch.setattr(main.db, name, adapt(getattr(memory_db, name)))
+    monkeypatch.setattr(main.db, "export", export)
+    # The cache middleware holds the bound get_version, so pin the version it reads instead
+    monkeypatch.setattr(main.db, "_version", memory_db.get_version())
+    monkeypatch.setattr(main.db, "_version_checked_at", float("inf"))
+    return TestClient(main.app)
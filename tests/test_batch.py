@@ -0,0 +1,41 @@
+import pytest
+
+from models import BATCH_MAX_IDS
+from postgres_queries import in_request_order
+
+
+def test_get_many_keeps_request_order(memory_db):
+    dinosaurs = memory_db.get_many([3, 999, 1, 3])
+    assert [d.id if d else None for d in dinosaurs] == [3, None, 1, 3]
+    assert memory_db.get_many([]) == []
+
+
+def test_in_request_order(memory_db):
+    found = memory_db.get_many([1, 2])
+    assert in_request_order([2, 5, 1, 2], found) == [found[1], None, found[0], found[1]]
+
+
+@pytest.mark.parametrize("query", ["ids=3,999,1,3", "ids=3&ids=999,1&ids=3", "ids=3,,999, 1,3"])
+def test_get_batch(api, query):
+    response = api.get(f"/dinosaurs/batch?{query}")
+    assert response.status_code == 200
+    body = response.json()
+    assert [d["id"] if d else None for d in body["dinosaurs"]] == [3, None, 1, 3]
+    assert body["not_found"] == [999]
+
+
+def test_post_batch(api):
+    response = api.post("/dinosaurs/batch", json={"ids": [2, 1000, 1000]})
+    assert response.status_code == 200
+    assert response.json()["not_found"] == [1000]
+    assert response.json()["dinosaurs"][0]["name"] == "Triceratops"
+
+
+@pytest.mark.parametrize("query", ["ids=1,x", "ids=", "ids=,", "ids=" + ",".join(["1"] * (BATCH_MAX_IDS + 1))])
+def test_invalid_batches_are_rejected(api, query):
+    assert api.get(f"/dinosaurs/batch?{query}").status_code == 400
+
+
+@pytest.mark.parametrize("body", [{"ids": []}, {"ids": ["a"]}, {"ids": list(range(BATCH_MAX_IDS + 1))}, {}])
+def test_invalid_post_batches_are_rejected(api, body):
+    assert api.post("/dinosaurs/batch", json=body).status_code == 422
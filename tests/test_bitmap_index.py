@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from bitmap_index import BitmapIndex, bits_from_ids, iter_bits
+from database import CATEGORICAL_FIELDS
+from models import DinosaurDiet, DinosaurPeriod, DinosaurSize, DinosaurUpdate
+
+
+def brute_force(db, **filters):
+    """IDs of every stored dinosaur matching the categorical filters, checked one by one"""
+    return [
+        dinosaur.id for dinosaur in sorted((record.to_model() for record in db.records), key=lambda d: d.id)
+        if all(getattr(dinosaur, field) == value for field, value in filters.items() if value is not None)
+    ]
+
+
+@pytest.fixture
+def populated_db(memory_db, make_dinosaur):
+    for _ in range(80):
+        memory_db.create(make_dinosaur())
+    return memory_db
+
+
+def test_bits_round_trip():
+    rng = random.Random(3)
+    for size in (0, 1, 7, 8, 9, 100):
+        ids = sorted(rng.sample(range(5000), size))
+        assert list(iter_bits(bits_from_ids(ids))) == ids
+    assert list(iter_bits(0)) == []
+
+
+def test_index_add_remove_match():
+    index = BitmapIndex(("diet", "size"))
+    index.add(1, {"diet": "a", "size": "x"})
+    index.add(2, {"diet": "a", "size": "y"})
+    index.add(3, {"diet": "b", "size": None})
+    assert list(iter_bits(index.match({"diet": "a"}))) == [1, 2]
+    assert list(iter_bits(index.match({"diet": "a", "size": "y"}))) == [2]
+    assert list(iter_bits(index.match({"diet": None, "size": None}))) == [1, 2, 3]
+    assert index.match({"diet": "unknown"}) == 0
+    index.remove(2, {"diet": "a", "size": "y"})
+    assert list(iter_bits(index.match({"diet": "a"}))) == [1]
+    assert index.match({"size": "y"}) == 0
+    assert list(iter_bits(index.all)) == [1, 3]
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"period": DinosaurPeriod.LATE_CRETACEOUS},
+    {"diet": DinosaurDiet.HERBIVORE, "size": DinosaurSize.LARGE},
+    {"period": DinosaurPeriod.LATE_JURASSIC, "diet": DinosaurDiet.CARNIVORE, "size": DinosaurSize.SMALL},
+    {"diet": DinosaurDiet.INSECTIVORE, "size": None},
+])
+def test_filters_match_brute_force(populated_db, filters):
+    expected = brute_force(populated_db, **filters)
+    assert [d.id for d in populated_db.get_all(limit=1000, **filters)] == expected
+    assert populated_db.get_page(limit=1000, **filters).total == len(expected)
+
+
+def test_every_single_value_filter(populated_db):
+    for field in CATEGORICAL_FIELDS:
+        for value in {getattr(record.to_model(), field) for record in populated_db.records} - {None}:
+            filters = {field: value}
+            assert [d.id for d in populated_db.get_all(limit=1000, **filters)] == brute_force(populated_db, **filters)
+
+
+def test_index_follows_updates_and_deletes(populated_db):
+    herbivores = brute_force(populated_db, diet=DinosaurDiet.HERBIVORE)
+    changed, deleted = herbivores[0], herbivores[1]
+    populated_db.update(changed, DinosaurUpdate(diet=DinosaurDiet.OMNIVORE))
+    populated_db.delete(deleted)
+    assert changed not in [d.id for d in populated_db.get_all(limit=1000, diet=DinosaurDiet.HERBIVORE)]
+    assert changed in [d.id for d in populated_db.get_all(limit=1000, diet=DinosaurDiet.OMNIVORE)]
+    assert deleted not in [d.id for d in populated_db.get_all(limit=1000)]
+    assert [d.id for d in populated_db.get_all(limit=1000, diet=DinosaurDiet.HERBIVORE)] == brute_force(
+        populated_db, diet=DinosaurDiet.HERBIVORE
+    )
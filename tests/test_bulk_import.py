@@ -0,0 +1,96 @@
+import gzip
+import io
+import re
+
+import pytest
+
+from bulk_import import COLUMNS, LIST_COLUMNS, detect_format, encode_batch, open_source, read_csv, read_ndjson, validate
+
+TEXT_ESCAPES = {"t": "\t", "n": "\n", "r": "\r", "\\": "\\"}
+
+
+def decode_copy_field(field):
+    """Invert COPY text-format escaping of one field"""
+    if field == "\\N":
+        return None
+    return re.sub(r"\\(.)", lambda match: TEXT_ESCAPES[match.group(1)], field)
+
+
+def decode_array(literal):
+    return [re.sub(r"\\(.)", r"\1", item) for item in re.findall(r'"((?:[^"\\]|\\.)*)"', literal)]
+
+
+def decode_line(line):
+    fields = [decode_copy_field(field) for field in line.split("\t")]
+    values = dict(zip(("source_line", "id") + COLUMNS, fields))
+    for column in LIST_COLUMNS:
+        if values[column] is not None:
+            values[column] = decode_array(values[column])
+    return values
+
+
+@pytest.fixture
+def tricky_row(make_dinosaur):
+    row, error = validate(1, make_dinosaur(
+        name="Tab\tNew\nline\rBack\\slash",
+        synonyms=['quote " inside', "back\\slash", "comma, brace {}", "tab\there"],
+        special_features=[],
+        interesting_facts=None,
+        discoverer=None,
+        is_valid_species=False,
+    ).model_dump())
+    assert error is None
+    return row
+
+
+def test_encode_batch_round_trips(tricky_row):
+    lines = encode_batch([(7, tricky_row)]).getvalue().split("\n")
+    assert lines[1:] == [""]
+    values = decode_line(lines[0])
+    assert values["source_line"] == "7"
+    assert values["id"] is None
+    assert values["name"] == tricky_row.name
+    assert values["synonyms"] == tricky_row.synonyms
+    assert values["special_features"] == []
+    assert values["interesting_facts"] is None
+    assert values["discoverer"] is None
+    assert values["is_valid_species"] == "f"
+    assert values["period"] == tricky_row.period.value
+    assert float(values["length_meters"]) == tricky_row.length_meters
+
+
+def test_encode_batch_writes_one_line_per_row(make_dinosaur):
+    rows = [(line, validate(line, {**make_dinosaur().model_dump(), "id": line * 10})[0]) for line in (1, 2, 3)]
+    decoded = [decode_line(line) for line in encode_batch(rows).getvalue().splitlines()]
+    assert [(values["source_line"], values["id"]) for values in decoded] == [("1", "10"), ("2", "20"), ("3", "30")]
+
+
+def test_validate_reports_every_problem():
+    row, error = validate(3, '{"name": "X", "period": "Holocene", "length_meters": -1}')
+    assert row is None
+    assert error.startswith("line 3: ")
+    assert "period" in error and "length_meters" in error and "species" in error
+    assert validate(4, ValueError("bad list"))[1] == "line 4: bad list"
+    assert validate(5, "not json")[0] is None
+
+
+def test_read_ndjson_skips_blank_lines():
+    assert list(read_ndjson(io.StringIO('{"a": 1}\n\n  \n{"b": 2}\n'))) == [(1, '{"a": 1}\n'), (4, '{"b": 2}\n')]
+
+
+def test_read_csv_decodes_lists_and_empty_cells():
+    stream = io.StringIO('name,synonyms,discoverer\nRex,"[""T-Rex""]",\nBad,[oops,Someone\n', newline="")
+    rows = list(read_csv(stream))
+    assert rows[0] == (2, {"name": "Rex", "synonyms": ["T-Rex"], "discoverer": None})
+    assert rows[1][0] == 3 and isinstance(rows[1][1], ValueError)
+
+
+def test_formats_and_gzip(tmp_path):
+    assert detect_format("catalog.CSV") == "csv"
+    assert detect_format("catalog.csv.gz") == "csv"
+    assert detect_format("catalog.ndjson.gz") == "ndjson"
+    path = tmp_path / "catalog.ndjson.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as stream:
+        stream.write('{"name": "Rex"}\n')
+    with open_source(str(path)) as stream:
+        assert list(read_ndjson(stream)) == [(1, '{"name": "Rex"}\n')]
@@ -0,0 +1,161 @@
+import gzip
+from datetime import datetime, timezone
+
+import brotli
+import pytest
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from content_encoding import CompressedCache, CompressionMiddleware, StreamCompressor, negotiate
+from http_cache import ConditionalCacheMiddleware
+
+LARGE = [{"id": i, "name": f"Dinosaur {i}"} for i in range(200)]
+
+DECODE = {
+    "gzip": gzip.decompress,
+    "br": brotli.decompress,
+    "zstd": lambda body: zstandard.ZstdDecompressor().decompressobj().decompress(body),
+}
+
+
+class Dataset:
+    async def get_version(self):
+        return 7, datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def cache():
+    return CompressedCache()
+
+
+@pytest.fixture
+def client(cache):
+    app = FastAPI()
+    app.add_middleware(ConditionalCacheMiddleware, get_version=Dataset().get_version, paths=["/dinosaurs"], max_age=30)
+    app.add_middleware(CompressionMiddleware, cache=cache)
+
+    @app.get("/dinosaurs")
+    async def dinosaurs():
+        return LARGE
+
+    @app.get("/dinosaurs/{dinosaur_id}")
+    async def dinosaur(dinosaur_id: int):
+        return {"id": dinosaur_id}
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for row in LARGE:
+                yield f'{{"id": {row["id"]}}}\n'.encode()
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.get("/image")
+    async def image():
+        return StreamingResponse(iter([b"\x89PNG" * 500]), media_type="image/png")
+
+    return TestClient(app)
+
+
+def raw_get(client, url, accept_encoding, **headers):
+    # Read the body as sent, without httpx decoding it
+    with client.stream("GET", url, headers={"Accept-Encoding": accept_encoding, **headers}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, br, zstd", "zstd"),
+    ("gzip;q=1, br;q=0.5", "gzip"),
+    ("br;q=0.8, gzip;q=0.8", "br"),
+    ("*", "zstd"),
+    ("*, zstd;q=0", "br"),
+    ("GZIP", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=bogus", None),
+])
+def test_negotiate(header, expected):
+    assert negotiate(header) == expected
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_whole_body_is_compressed(client, encoding):
+    response, body = raw_get(client, "/dinosaurs", encoding)
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["content-length"] == str(len(body))
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert DECODE[encoding](body) == client.get("/dinosaurs", headers={"Accept-Encoding": "identity"}).content
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_streamed_body_is_compressed(client, encoding):
+    response, body = raw_get(client, "/stream", encoding)
+    assert response.headers["content-encoding"] == encoding
+    assert "content-length" not in response.headers
+    assert DECODE[encoding](body) == b"".join(f'{{"id": {row["id"]}}}\n'.encode() for row in LARGE)
+
+
+def test_small_and_identity_responses_still_vary(client):
+    small = client.get("/dinosaurs/1", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+
+    identity = client.get("/dinosaurs", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["vary"] == "Accept-Encoding"
+
+
+def test_incompressible_types_are_left_alone(client):
+    response, _ = raw_get(client, "/image", "gzip")
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+
+
+def test_etag_weak_only_when_a_coding_was_negotiated(client):
+    assert client.get("/dinosaurs", headers={"Accept-Encoding": "identity"}).headers["etag"].startswith('"7-')
+    assert client.get("/dinosaurs", headers={"Accept-Encoding": "gzip"}).headers["etag"].startswith('W/"7-')
+    # Too small to compress, but a compressed response to the same request would be weak
+    assert client.get("/dinosaurs/1", headers={"Accept-Encoding": "gzip"}).headers["etag"].startswith('W/"7-')
+
+
+@pytest.mark.parametrize("url", ["/dinosaurs", "/dinosaurs/1"])
+@pytest.mark.parametrize("accept_encoding", ["gzip", "identity"])
+def test_304_carries_the_200_validator(client, url, accept_encoding):
+    first = client.get(url, headers={"Accept-Encoding": accept_encoding})
+    revalidated = client.get(url, headers={"Accept-Encoding": accept_encoding, "If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == first.headers["etag"]
+    assert revalidated.headers["vary"] == "Accept-Encoding"
+
+
+def test_compressed_once_per_etag_and_coding(client, cache):
+    raw_get(client, "/dinosaurs", "gzip")
+    raw_get(client, "/dinosaurs", "gzip")
+    raw_get(client, "/dinosaurs", "br")
+    assert (cache.hits, cache.misses, cache.stats()["entries"]) == (1, 2, 2)
+
+
+def test_compressed_cache_evicts_least_recently_used():
+    cache = CompressedCache(max_bytes=10)
+    cache.set('"a"', "gzip", b"aaaa")
+    cache.set('"b"', "gzip", b"bbbb")
+    assert cache.get('"a"', "gzip") == b"aaaa"
+    cache.set('"c"', "gzip", b"cccc")
+    assert cache.get('"b"', "gzip") is None
+    assert cache.get('"a"', "gzip") == b"aaaa"
+    assert cache.stats()["bytes"] == 8
+    assert cache.evictions == 1
+    cache.set('"big"', "gzip", b"x" * 11)
+    assert cache.get('"big"', "gzip") is None
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_stream_compressor_round_trip(encoding):
+    compressor = StreamCompressor(encoding)
+    chunks = [b"first chunk ", b"", b"second chunk"]
+    body = b"".join(compressor.compress(chunk) for chunk in chunks) + compressor.finish()
+    assert DECODE[encoding](body) == b"first chunk second chunk"
@@ -0,0 +1,292 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+import database_async
+from database_async import AsyncPostgreSQLDinosaurDatabase
+from db_config import DinosaurModel, POOL_SETTINGS
+from replicas import ReplicaRouter
+
+VERSION = (3, datetime(2025, 1, 1, tzinfo=timezone.utc))
+
+
+def disconnect():
+    return DBAPIError("SELECT 1", {}, ConnectionResetError("connection lost"), connection_invalidated=True)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def all(self):
+        return self.rows
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def one(self):
+        (row,) = self.rows
+        return row
+
+    def scalar_one(self):
+        return self.one()[0]
+
+    def scalars(self):
+        return FakeResult(row[0] for row in self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeSession:
+    """An AsyncSession answering statements with the queued `results`, then with `rows`; a stream
+    raises `error` once it has sent `fail_after` rows"""
+
+    def __init__(self, name, rows=(), error=None, fail_after=0, results=()):
+        self.name = name
+        self.rows = rows
+        self.results = list(results)
+        self.error = error
+        self.fail_after = fail_after
+        self.info = {}
+        self.statements = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        if self.error is not None:
+            raise self.error
+        return FakeResult(self.results.pop(0) if self.results else self.rows)
+
+    async def stream_scalars(self, statement):
+        self.statements.append(statement)
+
+        async def rows():
+            for sent, row in enumerate(self.rows):
+                if self.error is not None and sent == self.fail_after:
+                    raise self.error
+                yield row[0]
+            if self.error is not None:
+                raise self.error
+        return rows()
+
+
+class FakeReplica:
+    def __init__(self, session, engine=None, healthy=True):
+        self.session = session
+        self.engine = engine
+        self.healthy = healthy
+        self.error = None
+        self.sessions = 0
+
+    def session_factory(self):
+        return self.session
+
+    def in_use(self):
+        return 0
+
+    def mark_down(self, error):
+        self.healthy = False
+        self.error = error
+
+
+class FakeConnection:
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def __aenter__(self):
+        self.engine.opened += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement, params=None):
+        self.engine.statements.append((str(statement), params))
+        if self.engine.error is not None:
+            raise self.engine.error
+        return FakeResult(self.engine.rows.pop(0) if self.engine.rows else [])
+
+    async def run_sync(self, fn):
+        self.engine.synced.append(fn)
+
+
+class FakeEngine:
+    """An AsyncEngine whose connections record statements and answer with the queued `rows`"""
+
+    def __init__(self, rows=(), error=None):
+        self.rows = list(rows)
+        self.error = error
+        self.opened = 0
+        self.statements = []
+        self.synced = []
+
+    def connect(self):
+        return FakeConnection(self)
+
+    def begin(self):
+        return FakeConnection(self)
+
+
+@pytest.fixture
+def rows(memory_db):
+    return [(DinosaurModel(**memory_db.get_by_id(dinosaur_id).model_dump()),) for dinosaur_id in (1, 2)]
+
+
+@pytest.fixture
+def backend():
+    backend = AsyncPostgreSQLDinosaurDatabase()
+    # Cached reads check the dataset version first; pin it so they don't query it
+    backend._version, backend._version_checked_at = VERSION, float("inf")
+    return backend
+
+
+def use(monkeypatch, router=None, engine=None):
+    if router is not None:
+        monkeypatch.setattr(database_async, "get_read_router", lambda: router)
+    if engine is not None:
+        monkeypatch.setattr(database_async, "get_async_engine", lambda: engine)
+
+
+def test_reads_go_to_a_replica(monkeypatch, backend, rows):
+    primary, replica = FakeSession("primary"), FakeReplica(FakeSession("replica", rows[:1]))
+    router = ReplicaRouter(lambda: primary, [replica])
+    use(monkeypatch, router)
+    dinosaur = asyncio.run(backend.get_by_id(1))
+    assert dinosaur.name == "Tyrannosaurus Rex"
+    assert len(replica.session.statements) == 1 and primary.statements == []
+    assert replica.sessions == 1
+
+
+def test_read_is_retried_on_the_primary_when_its_replica_is_lost(monkeypatch, backend, rows):
+    primary = FakeSession("primary", rows)
+    replica = FakeReplica(FakeSession("replica", error=disconnect()))
+    use(monkeypatch, ReplicaRouter(lambda: primary, [replica]))
+    results = asyncio.run(backend.get_many([2, 5, 1]))
+    assert [dinosaur and dinosaur.id for dinosaur in results] == [2, None, 1]
+    assert not replica.healthy
+
+
+def test_search_falls_back_to_substring_matching(monkeypatch, backend, rows):
+    session = FakeSession("primary")
+    use(monkeypatch, ReplicaRouter(lambda: session, []))
+    assert asyncio.run(backend.search("aurus", limit=5)) == []
+    ranked, substring = (str(statement) for statement in session.statements)
+    assert "ts_rank" in ranked and "similarity" not in ranked
+    assert "similarity(dinosaurs.name" in substring
+
+
+def test_get_page_reads_the_total_only_past_the_last_page(monkeypatch, backend):
+    session = FakeSession("primary", results=[[], [(42,)]])
+    use(monkeypatch, ReplicaRouter(lambda: session, []))
+    assert asyncio.run(backend.get_page(skip=50, limit=10)) == ([], 42, None)
+    assert len(session.statements) == 2
+    assert "count(dinosaurs.id)" in str(session.statements[1])
+
+
+def collect(iterator):
+    async def run():
+        return [dinosaur.id async for dinosaur in iterator]
+    return asyncio.run(run())
+
+
+def test_export_streams_from_a_replica(monkeypatch, backend, rows):
+    primary, replica = FakeSession("primary"), FakeReplica(FakeSession("replica", rows))
+    use(monkeypatch, ReplicaRouter(lambda: primary, [replica]))
+    assert collect(backend.export()) == [1, 2]
+    assert primary.statements == []
+
+
+def test_export_moves_to_the_primary_before_the_first_row(monkeypatch, backend, rows):
+    primary = FakeSession("primary", rows)
+    replica = FakeReplica(FakeSession("replica", rows, error=disconnect(), fail_after=0))
+    router = ReplicaRouter(lambda: primary, [replica])
+    use(monkeypatch, router)
+    assert collect(backend.export()) == [1, 2]
+    assert not replica.healthy
+    assert router.primary_sessions == 1
+
+
+def test_export_fails_once_rows_were_sent(monkeypatch, backend, rows):
+    primary = FakeSession("primary", rows)
+    replica = FakeReplica(FakeSession("replica", rows, error=disconnect(), fail_after=1))
+    use(monkeypatch, ReplicaRouter(lambda: primary, [replica]))
+    sent = []
+
+    async def run():
+        async for dinosaur in backend.export():
+            sent.append(dinosaur.id)
+
+    with pytest.raises(DBAPIError):
+        asyncio.run(run())
+    assert sent == [1]
+    assert primary.statements == []
+
+
+def test_get_version_is_cached_for_the_ttl(monkeypatch):
+    backend = AsyncPostgreSQLDinosaurDatabase()
+    engine = FakeEngine(rows=[[VERSION], [(4, VERSION[1])]])
+    use(monkeypatch, engine=engine)
+    clock = [100.0]
+    monkeypatch.setattr(database_async.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(database_async, "DATASET_VERSION_TTL", 5.0)
+    assert asyncio.run(backend.get_version()) == VERSION
+    clock[0] += 4.9
+    assert asyncio.run(backend.get_version()) == VERSION
+    assert engine.opened == 1
+    clock[0] += 0.1
+    assert asyncio.run(backend.get_version())[0] == 4
+    assert engine.opened == 2
+
+
+def test_cached_reads_follow_the_version(monkeypatch, backend, rows):
+    session = FakeSession("primary", rows[:1])
+    use(monkeypatch, ReplicaRouter(lambda: session, []))
+    asyncio.run(backend.get_by_id(1))
+    asyncio.run(backend.get_by_id(1))
+    assert len(session.statements) == 1
+    backend._version = (VERSION[0] + 1, VERSION[1])
+    asyncio.run(backend.get_by_id(1))
+    assert len(session.statements) == 2
+
+
+def test_initialize_skip_touches_nothing(monkeypatch, backend):
+    def no_engine():
+        raise AssertionError("skip must not connect")
+    monkeypatch.setattr(database_async, "get_async_engine", no_engine)
+    assert asyncio.run(backend.initialize("skip")) == {}
+
+
+def test_initialize_rejects_unknown_modes(backend):
+    with pytest.raises(ValueError, match="Unknown init mode 'fast'"):
+        asyncio.run(backend.initialize("fast"))
+
+
+@pytest.mark.parametrize("mode, count, seeded", [("full", 0, True), ("full", 3, False), ("migrate", 0, False)])
+def test_initialize_migrates_then_seeds_an_empty_database(monkeypatch, backend, mode, count, seeded):
+    engine = FakeEngine(rows=[[(count,)]])
+    use(monkeypatch, engine=engine)
+    timings = asyncio.run(backend.initialize(mode))
+    assert engine.synced == [database_async.migrate]
+    assert set(timings) == ({"migrate", "seed"} if mode == "full" else {"migrate"})
+    inserts = [params for sql, params in engine.statements if sql.startswith("INSERT INTO dinosaurs")]
+    assert inserts == ([database_async.INITIAL_DINOSAURS] if seeded else [])
+
+
+def test_warm_up_opens_connections_on_the_primary_and_healthy_replicas(monkeypatch, backend):
+    primary, replica, down, broken = FakeEngine(), FakeEngine(), FakeEngine(), FakeEngine(error=OSError("refused"))
+    router = ReplicaRouter(lambda: None, [
+        FakeReplica(None, replica), FakeReplica(None, down, healthy=False), FakeReplica(None, broken)
+    ])
+    use(monkeypatch, router, primary)
+    assert asyncio.run(backend.warm_up(2)) == 4
+    assert (primary.opened, replica.opened, down.opened) == (2, 2, 0)
+    assert asyncio.run(backend.warm_up(0)) == 0
+    assert asyncio.run(backend.warm_up(POOL_SETTINGS["pool_size"] + 5)) == 2 * POOL_SETTINGS["pool_size"]
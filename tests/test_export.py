@@ -0,0 +1,68 @@
+import asyncio
+import io
+
+import pytest
+
+from bulk_import import read_csv, read_ndjson, validate
+from export_formats import CHUNK_ROWS, ENCODERS
+from models import DinosaurPeriod, ExportFormat
+
+
+def collect(chunks) -> bytes:
+    async def run():
+        return b"".join([chunk async for chunk in chunks])
+    return asyncio.run(run())
+
+
+async def as_async(items):
+    for item in items:
+        yield item
+
+
+READERS = {ExportFormat.NDJSON: read_ndjson, ExportFormat.CSV: read_csv}
+
+
+def reimport(file_format, body: bytes):
+    rows = []
+    for line_number, raw in READERS[file_format](io.StringIO(body.decode("utf-8"), newline="")):
+        row, error = validate(line_number, raw)
+        assert error is None
+        rows.append(row)
+    return rows
+
+
+@pytest.mark.parametrize("file_format", list(ExportFormat))
+def test_export_round_trips_through_bulk_import(memory_db, file_format):
+    body = collect(ENCODERS[file_format](memory_db.export()))
+    rows = reimport(file_format, body)
+    expected = memory_db.get_all(limit=1000)
+    assert [row.id for row in rows] == [dinosaur.id for dinosaur in expected]
+    assert [row.model_dump() for row in rows] == [dinosaur.model_dump() for dinosaur in expected]
+
+
+@pytest.mark.parametrize("file_format", list(ExportFormat))
+def test_sync_and_async_sources_encode_the_same(memory_db, file_format):
+    dinosaurs = memory_db.get_all(limit=1000)
+    assert collect(ENCODERS[file_format](iter(dinosaurs))) == collect(ENCODERS[file_format](as_async(dinosaurs)))
+
+
+def test_export_applies_filters(memory_db):
+    exported = list(memory_db.export(period=DinosaurPeriod.LATE_CRETACEOUS))
+    assert exported == memory_db.get_all(limit=1000, period=DinosaurPeriod.LATE_CRETACEOUS)
+    assert exported and all(dinosaur.period == DinosaurPeriod.LATE_CRETACEOUS for dinosaur in exported)
+
+
+def test_csv_header_only_when_nothing_matches():
+    body = collect(ENCODERS[ExportFormat.CSV]([])).decode()
+    assert body.count("\n") == 1 and body.startswith("name,")
+    assert collect(ENCODERS[ExportFormat.NDJSON]([])) == b""
+
+
+def test_large_exports_are_chunked(memory_db):
+    dinosaurs = memory_db.get_all(limit=1000) * (CHUNK_ROWS // 10 + 1)
+
+    async def chunks():
+        return [chunk async for chunk in ENCODERS[ExportFormat.NDJSON](dinosaurs)]
+    parts = asyncio.run(chunks())
+    assert len(parts) > 1
+    assert b"".join(parts).count(b"\n") == len(dinosaurs)
@@ -0,0 +1,95 @@
+from typing import List
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import fast_json
+from fast_json import DINOSAUR, DINOSAUR_LIST, DINOSAUR_RESPONSE, PydanticJSONResponse, respond
+from models import Dinosaur, DinosaurResponse
+
+
+@pytest.fixture
+def dinosaurs(memory_db):
+    return memory_db.get_all(limit=1000)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """The same responses served through FastAPI's response_model path and through respond()"""
+    monkeypatch.setattr(fast_json, "FAST_JSON", True)
+    app = FastAPI()
+    app.state.value = None
+
+    @app.get("/default/one", response_model=Dinosaur)
+    async def default_one():
+        return app.state.value
+
+    @app.get("/fast/one", response_model=Dinosaur)
+    async def fast_one():
+        return respond(DINOSAUR, app.state.value)
+
+    @app.get("/default/list", response_model=List[Dinosaur])
+    async def default_list():
+        return app.state.value
+
+    @app.get("/fast/list", response_model=List[Dinosaur])
+    async def fast_list():
+        return respond(DINOSAUR_LIST, app.state.value)
+
+    @app.get("/default/page", response_model=DinosaurResponse)
+    async def default_page():
+        return app.state.value
+
+    @app.get("/fast/page", response_model=DinosaurResponse)
+    async def fast_page():
+        return respond(DINOSAUR_RESPONSE, app.state.value)
+
+    client = TestClient(app)
+    client.app_state = app.state
+    return client
+
+
+def bodies(client, kind, value):
+    client.app_state.value = value
+    return client.get(f"/default/{kind}").content, client.get(f"/fast/{kind}").content
+
+
+def test_seed_data_is_identical(client, dinosaurs):
+    assert len(set(bodies(client, "list", dinosaurs))) == 1
+    for dinosaur in dinosaurs:
+        assert len(set(bodies(client, "one", dinosaur))) == 1
+    page = DinosaurResponse(dinosaurs=dinosaurs[:3], total=len(dinosaurs), page=1, per_page=3, next_cursor="abc")
+    assert len(set(bodies(client, "page", page))) == 1
+
+
+def test_non_ascii_text_is_identical(client, dinosaurs):
+    dinosaur = dinosaurs[0].model_copy(update={
+        "name": "Ēoraptor «lunensis» 恐竜",
+        "description": 'Quotes " and \\ backslashes, a tab\\t and an emoji 🦖',
+        "interesting_facts": ["naïve", " line separator"],
+    })
+    default, fast = bodies(client, "one", dinosaur)
+    assert default == fast
+    assert "恐竜".encode() in fast
+
+
+@pytest.mark.parametrize("value", [1e16, 2.5e17, 1e-5, 9.999e-05, 1.7976931348623157e308, 5e-324, 0.0001, 123.456, 0.0, -0.0])
+def test_floats_are_identical(client, dinosaurs, value):
+    dinosaur = dinosaurs[0].model_copy(update={"weight_kg": value})
+    assert len(set(bodies(client, "one", dinosaur))) == 1
+    assert len(set(bodies(client, "list", [dinosaurs[1], dinosaur]))) == 1
+    page = DinosaurResponse(dinosaurs=[dinosaur], total=1, page=1, per_page=1)
+    assert len(set(bodies(client, "page", page))) == 1
+
+
+def test_fast_path_is_taken_for_plain_floats(dinosaurs, monkeypatch):
+    monkeypatch.setattr(fast_json, "FAST_JSON", True)
+    assert isinstance(respond(DINOSAUR_LIST, dinosaurs), PydanticJSONResponse)
+    odd = dinosaurs[0].model_copy(update={"weight_kg": 1e16})
+    assert respond(DINOSAUR_LIST, dinosaurs + [odd]) == dinosaurs + [odd]
+
+
+def test_disabled_by_default(dinosaurs, monkeypatch):
+    monkeypatch.setattr(fast_json, "FAST_JSON", False)
+    assert respond(DINOSAUR_LIST, dinosaurs) is dinosaurs
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+class Probe:
+    """Stands in for the database and pool behind the health routes"""
+
+    def __init__(self):
+        self.database_ok = True
+        self.saturation = 0.2
+        self.stats_calls = 0
+
+    async def ping(self, timeout):
+        return self.database_ok
+
+    async def get_stats(self):
+        self.stats_calls += 1
+        return {"total_dinosaurs": 42}
+
+
+@pytest.fixture
+def probe(monkeypatch):
+    probe = Probe()
+    monkeypatch.setattr(main.db, "ping", probe.ping)
+    monkeypatch.setattr(main.db, "get_stats", probe.get_stats)
+    monkeypatch.setattr(main, "async_pool_saturation", lambda: probe.saturation)
+    router = SimpleNamespace(replicas=[object(), object()], healthy=lambda: router.replicas[:1])
+    monkeypatch.setattr(main, "get_read_router", lambda: router)
+    return probe
+
+
+@pytest.fixture
+def client(probe):
+    # No lifespan: the routes must not need a database beyond the probe
+    return TestClient(main.app)
+
+
+def test_liveness_never_touches_the_database(client, probe):
+    probe.database_ok = False
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+
+
+def test_ready(client, probe):
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json() == {
+        "status": "ready", "database_status": "connected", "pool_saturation": 0.2,
+        "replicas_healthy": 1, "replicas_total": 2,
+    }
+    assert probe.stats_calls == 0
+
+
+@pytest.mark.parametrize("database_ok, saturation", [(False, 0.2), (True, 1.0)])
+def test_not_ready(client, probe, database_ok, saturation):
+    probe.database_ok, probe.saturation = database_ok, saturation
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "unavailable"
+
+
+def test_health_reports_the_count(client, probe):
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
+    assert response.json()["total_dinosaurs"] == 42
+
+
+def test_health_is_503_when_unhealthy(client, probe):
+    probe.database_ok = False
+    response = client.get("/health")
+    assert response.status_code == 503
+    assert response.json()["database_status"] == "unreachable"
+    assert response.json()["total_dinosaurs"] is None
+    assert probe.stats_calls == 0
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from http_cache import ConditionalCacheMiddleware, etag_matches
+
+
+class Dataset:
+    def __init__(self):
+        self.version = 1
+        self.last_modified = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.route_calls = 0
+
+    async def get_version(self):
+        return self.version, self.last_modified
+
+
+@pytest.fixture
+def dataset():
+    return Dataset()
+
+
+@pytest.fixture
+def client(dataset):
+    app = FastAPI()
+    app.add_middleware(ConditionalCacheMiddleware, get_version=dataset.get_version, paths=["/dinosaurs"], max_age=30)
+
+    @app.get("/dinosaurs")
+    async def dinosaurs():
+        dataset.route_calls += 1
+        return [{"id": 1}]
+
+    @app.get("/dinosaurs/{dinosaur_id}")
+    async def dinosaur(dinosaur_id: int):
+        dataset.route_calls += 1
+        if dinosaur_id != 1:
+            raise HTTPException(status_code=404, detail="not found")
+        return {"id": 1}
+
+    @app.get("/other")
+    async def other():
+        return {}
+
+    return TestClient(app)
+
+
+def test_validators_on_200(client):
+    response = client.get("/dinosaurs")
+    assert response.status_code == 200
+    assert response.headers["etag"].startswith('"1-')
+    assert response.headers["cache-control"] == "public, max-age=30"
+    assert response.headers["last-modified"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+def test_uncached_paths_and_errors_get_no_validators(client):
+    assert "etag" not in client.get("/other").headers
+    assert "etag" not in client.get("/dinosaurs/2").headers
+
+
+def test_etag_depends_on_query_not_parameter_order(client):
+    assert client.get("/dinosaurs?a=1&b=2").headers["etag"] == client.get("/dinosaurs?b=2&a=1").headers["etag"]
+    assert client.get("/dinosaurs?a=1").headers["etag"] != client.get("/dinosaurs?a=2").headers["etag"]
+
+
+def test_matching_if_none_match_skips_the_route(client, dataset):
+    etag = client.get("/dinosaurs").headers["etag"]
+    for header in (etag, f"W/{etag}", f'"other", {etag}'):
+        response = client.get("/dinosaurs", headers={"If-None-Match": header})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+    assert dataset.route_calls == 1
+
+
+def test_new_version_changes_the_etag(client, dataset):
+    etag = client.get("/dinosaurs").headers["etag"]
+    dataset.version = 2
+    response = client.get("/dinosaurs", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_if_modified_since(client, dataset):
+    since = format_datetime(dataset.last_modified, usegmt=True)
+    assert client.get("/dinosaurs", headers={"If-Modified-Since": since}).status_code == 304
+    earlier = format_datetime(dataset.last_modified - timedelta(seconds=1), usegmt=True)
+    assert client.get("/dinosaurs", headers={"If-Modified-Since": earlier}).status_code == 200
+    assert client.get("/dinosaurs", headers={"If-Modified-Since": "garbage"}).status_code == 200
+    # If-None-Match takes precedence
+    assert client.get("/dinosaurs", headers={"If-Modified-Since": since, "If-None-Match": '"x"'}).status_code == 200
+
+
+def test_star_matches_only_an_existing_representation(client):
+    assert client.get("/dinosaurs/1", headers={"If-None-Match": "*"}).status_code == 304
+    response = client.get("/dinosaurs/999999", headers={"If-None-Match": "*"})
+    assert response.status_code == 404
+    assert "etag" not in response.headers
+
+
+def test_etag_matches():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches('"b"', 'W/"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+    assert not etag_matches("*", '"b"')
@@ -0,0 +1,138 @@
+import random
+
+import pytest
+
+from interval_index import IntervalIndex
+from models import DinosaurUpdate
+
+
+def overlaps(interval, low, high):
+    return interval[0] <= high and interval[1] >= low
+
+
+@pytest.fixture
+def intervals():
+    rng = random.Random(4)
+    ranges = {}
+    for doc_id in range(1, 300):
+        start = rng.choice([rng.uniform(60, 250), 100.0])
+        ranges[doc_id] = (start, start + rng.choice([0, rng.uniform(0, 30)]))
+    return ranges
+
+
+def test_overlapping_matches_brute_force(intervals):
+    index = IntervalIndex()
+    for doc_id, (low, high) in intervals.items():
+        index.add(doc_id, high, low)  # bounds in either order
+    rng = random.Random(5)
+    for _ in range(200):
+        low, high = sorted(rng.uniform(50, 260) for _ in range(2))
+        assert index.overlapping(low, high) == [i for i, r in intervals.items() if overlaps(r, low, high)]
+    assert index.alive_at(100.0) == [i for i, r in intervals.items() if overlaps(r, 100.0, 100.0)]
+    assert index.overlapping(None, 70) == [i for i, r in intervals.items() if r[0] <= 70]
+    assert index.overlapping(200, None) == [i for i, r in intervals.items() if r[1] >= 200]
+    assert index.overlapping(120, 110) == index.overlapping(110, 120)
+
+
+def test_index_follows_adds_and_removes(intervals):
+    index = IntervalIndex()
+    for doc_id, (low, high) in intervals.items():
+        index.add(doc_id, low, high)
+    index.overlapping(0, 1000)
+    for doc_id in list(intervals)[::2]:
+        index.remove(doc_id)
+        del intervals[doc_id]
+    index.add(1000, 140.0, 150.0)
+    intervals[1000] = (140.0, 150.0)
+    assert len(index) == len(intervals)
+    assert index.overlapping(130, 145) == [i for i, r in intervals.items() if overlaps(r, 130, 145)]
+    assert index.get(1000) == (140.0, 150.0)
+    assert IntervalIndex().overlapping(0, 1) == []
+
+
+def test_alive_at(memory_db):
+    # The Late Cretaceous seed dinosaurs, 68-66 Mya
+    alive = {d.name for d in memory_db.get_alive_at(67)}
+    assert alive == {"Tyrannosaurus Rex", "Triceratops"}
+    assert memory_db.get_alive_at(10) == []
+
+
+def test_contemporaries(memory_db, make_dinosaur):
+    single = memory_db.create(make_dinosaur(age_start_mya=67.5, age_end_mya=None))
+    undated = memory_db.create(make_dinosaur(age_start_mya=None, age_end_mya=None))
+    contemporaries = {d.name for d in memory_db.get_contemporaries(1)}
+    assert contemporaries == {"Triceratops", single.name}
+    assert {d.id for d in memory_db.get_contemporaries(single.id)} == {1, 2}
+    assert memory_db.get_contemporaries(undated.id) == []
+    assert memory_db.get_contemporaries(999) is None
+
+
+def test_contemporaries_follow_updates(memory_db):
+    memory_db.update(2, DinosaurUpdate(age_start_mya=150.0, age_end_mya=140.0))
+    assert {d.name for d in memory_db.get_contemporaries(2)} >= {"Brachiosaurus", "Allosaurus"}
+    assert 2 not in {d.id for d in memory_db.get_contemporaries(1)}
+
+
+def test_age_filter_overlaps_the_range(memory_db):
+    def brute_force(low, high):
+        return [
+            d.id for d in memory_db.get_all(limit=1000)
+            if d.age_start_mya is not None and overlaps(sorted((d.age_start_mya, d.age_end_mya)), low, high)
+        ]
+
+    for low, high in [(60, 70), (94, 112), (146, 150), (0, 10), (150, 70)]:
+        expected = brute_force(min(low, high), max(low, high))
+        assert [d.id for d in memory_db.get_all(limit=1000, min_age=low, max_age=high)] == expected
+    assert [d.id for d in memory_db.get_all(limit=1000, min_age=150)] == brute_force(150, 1000)
+
+
+def test_writes_after_the_first_query_update_the_tree_in_place(intervals):
+    index = IntervalIndex()
+    for doc_id, (low, high) in intervals.items():
+        index.add(doc_id, low, high)
+    index.overlapping(0, 1000)
+    root = index._root
+    rng = random.Random(6)
+    for step in range(300):
+        doc_id = rng.randrange(1, 400)
+        if doc_id in intervals and rng.random() < 0.5:
+            index.remove(doc_id)
+            del intervals[doc_id]
+        else:
+            start = rng.uniform(40, 270)
+            intervals[doc_id] = (start, start + rng.uniform(0, 40))
+            index.add(doc_id, *intervals[doc_id])
+        low, high = sorted(rng.uniform(30, 300) for _ in range(2))
+        assert index.overlapping(low, high) == sorted(i for i, r in intervals.items() if overlaps(r, low, high))
+    assert index._root is root
+
+
+def test_deep_insert_runs_rebuild_the_tree():
+    index = IntervalIndex()
+    index.overlapping(0, 1)
+    # Disjoint ranges in increasing order each open a new leaf under the last one
+    for doc_id in range(200):
+        index.add(doc_id, doc_id, doc_id + 0.5)
+        assert index.alive_at(doc_id + 0.25) == [doc_id]
+    depth, stack = 0, [(index._tree(), 1)]
+    while stack:
+        node, level = stack.pop()
+        depth = max(depth, level)
+        stack.extend((child, level + 1) for child in (node.left, node.right) if child)
+    assert depth < 40
+    assert index.overlapping(10, 20) == list(range(10, 21))
+
+
+def test_contemporaries_are_paged(memory_db, make_dinosaur):
+    created = [memory_db.create(make_dinosaur(age_start_mya=67.0, age_end_mya=66.5)).id for _ in range(5)]
+    everything = [d.id for d in memory_db.get_contemporaries(1)]
+    assert everything == [2] + created
+    assert [d.id for d in memory_db.get_contemporaries(1, skip=2, limit=3)] == everything[2:5]
+    assert memory_db.get_contemporaries(1, skip=10) == []
+
+
+def test_contemporaries_route_pages(api):
+    assert [d["id"] for d in api.get("/dinosaurs/1/contemporaries?limit=1").json()] == [2]
+    assert api.get("/dinosaurs/1/contemporaries?skip=1").json() == []
+    assert api.get("/dinosaurs/1/contemporaries?limit=0").status_code == 422
+    assert api.get("/dinosaurs/999/contemporaries").status_code == 404
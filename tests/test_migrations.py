@@ -0,0 +1,83 @@
+import re
+
+import db_config
+from migrations import MIGRATION_LOCK_ID, discover, migrate, pending
+from migrations import v0001_baseline, v0003_enum_columns
+
+
+class RecordingConnection:
+    """Stands in for a Connection: records statements, finds `applied` versions already done"""
+
+    def __init__(self, applied=()):
+        self.applied = list(applied)
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append((sql, params))
+        if sql.startswith("SELECT version, applied_at"):
+            return [(version, None) for version in self.applied]
+        return None
+
+
+def normalized(sql):
+    return re.sub(r"\s+", " ", re.sub(r"\s*([(),|])\s*", r"\1", sql)).strip()
+
+
+def test_discover_returns_migrations_in_version_order():
+    migrations = discover()
+    versions = [migration.version for migration in migrations]
+    assert versions == sorted(versions) == list(range(1, len(versions) + 1))
+    assert [migration.name for migration in migrations][:3] == ["v0001_baseline", "v0002_filter_indexes", "v0003_enum_columns"]
+    assert all(migration.description for migration in migrations)
+
+
+def test_pending_skips_applied_versions():
+    conn = RecordingConnection(applied=[1, 2])
+    assert [migration.version for migration in pending(conn)] == [migration.version for migration in discover()][2:]
+
+
+def test_migrate_locks_then_records_each_migration():
+    conn = RecordingConnection()
+    ran = migrate(conn, target=2)
+    assert [migration.version for migration in ran] == [1, 2]
+    assert conn.statements[0] == ("SELECT pg_advisory_xact_lock(:lock_id)", {"lock_id": MIGRATION_LOCK_ID})
+    recorded = [params["version"] for sql, params in conn.statements if sql.startswith("INSERT INTO schema_migrations")]
+    assert recorded == [1, 2]
+
+
+def test_baseline_sql_matches_the_model_expressions():
+    # The baseline spells its SQL out; the model must still describe the same columns and index
+    conn = RecordingConnection()
+    v0001_baseline.upgrade(conn)
+    ddl = [normalized(sql) for sql, _ in conn.statements]
+    assert any(f"GENERATED ALWAYS AS({normalized(db_config.SEARCH_VECTOR_SQL)})" in sql for sql in ddl)
+    assert any(
+        f"gist(({normalized(db_config.AGE_RANGE_SQL)}))WHERE {normalized(db_config.AGE_KNOWN_SQL)}" in sql for sql in ddl
+    )
+
+
+def test_baseline_does_not_import_the_models():
+    source = open(v0001_baseline.__file__).read()
+    assert "db_config" not in re.sub(r"#.*", "", source)
+
+
+def test_enum_migration_labels_match_the_models():
+    # A value added to a models.py enum fails here until a migration adds it to the ENUM type
+    for column, (type_name, enum_class) in db_config.CATEGORICAL_TYPES.items():
+        assert v0003_enum_columns.ENUM_COLUMNS[column] == (type_name, tuple(member.value for member in enum_class))
+
+
+def test_enum_migration_does_not_import_the_models_or_other_migrations():
+    code = re.sub(r"#.*", "", open(v0003_enum_columns.__file__).read())
+    assert "db_config" not in code and "models" not in code
+    assert "import" not in code.replace("from sqlalchemy import", "").replace("from sqlalchemy.engine import", "")
+
+
+def test_enum_migration_casts_the_stats_columns_to_text():
+    conn = RecordingConnection()
+    v0003_enum_columns.upgrade(conn)
+    trigger = next(sql for sql, _ in conn.statements if "apply_dinosaur_stats_delta" in sql)
+    for column in v0001_baseline.STATS_GROUP_COLUMNS:
+        assert trigger.count(f"{column}::text AS {column}") == 4
+        assert trigger.count(f"SELECT '{column}', {column}, sum(sign)") == 3
@@ -0,0 +1,82 @@
+import random
+import statistics
+
+import numpy as np
+import pytest
+
+from bitmap_index import iter_bits
+from numeric_columns import NumericColumns, bits_from_mask
+
+
+@pytest.fixture
+def values():
+    rng = random.Random(16)
+    return {doc_id: rng.choice([None, round(rng.uniform(0, 40), 1)]) for doc_id in range(1, 3000)}
+
+
+@pytest.fixture
+def columns(values):
+    # A small capacity, so the columns have to grow
+    columns = NumericColumns(("length",), capacity=8)
+    for doc_id, value in values.items():
+        columns.set(doc_id, {"length": value})
+    return columns
+
+
+def test_bits_from_mask():
+    assert list(iter_bits(bits_from_mask(np.array([True, False, True, True] + [False] * 12 + [True])))) == [0, 2, 3, 16]
+    assert bits_from_mask(np.zeros(5, dtype=bool)) == 0
+
+
+@pytest.mark.parametrize("low, high", [(None, None), (10, None), (None, 5.5), (12.3, 12.3), (20, 10)])
+def test_range_bits_match_brute_force(columns, values, low, high):
+    expected = [
+        doc_id for doc_id, value in values.items()
+        if value is not None and (low is None or value >= low) and (high is None or value <= high)
+    ]
+    assert list(iter_bits(columns.range_bits("length", low, high))) == expected
+
+
+def test_overlap_bits():
+    columns = NumericColumns(("low", "high"))
+    columns.set(1, {"low": 66, "high": 68})
+    columns.set(2, {"low": 145, "high": 156})
+    columns.set(3, {"low": None, "high": None})
+    assert list(iter_bits(columns.overlap_bits("low", "high", 67, 150))) == [1, 2]
+    assert list(iter_bits(columns.overlap_bits("low", "high", 69, 100))) == []
+    assert list(iter_bits(columns.overlap_bits("low", "high", None, 66))) == [1]
+
+
+def test_cleared_values_never_match(columns, values):
+    cleared = [doc_id for doc_id, value in values.items() if value is not None][:10]
+    for doc_id in cleared:
+        columns.clear(doc_id)
+    assert not set(cleared) & set(iter_bits(columns.range_bits("length")))
+    assert not columns.column("length").flags.writeable
+
+
+def test_describe(columns, values):
+    known = [value for value in values.values() if value is not None]
+    description = columns.describe("length", percentiles=(50,), bins=4)
+    assert description["count"] == len(known)
+    assert description["mean"] == pytest.approx(statistics.fmean(known))
+    assert (description["min"], description["max"]) == (min(known), max(known))
+    assert description["percentiles"]["p50"] == pytest.approx(statistics.median(known))
+    assert sum(description["histogram"]["counts"]) == len(known)
+    assert len(description["histogram"]["edges"]) == 5
+    assert NumericColumns(("empty",)).describe("empty")["count"] == 0
+
+
+def test_length_filters_and_numeric_stats(memory_db):
+    dinosaurs = memory_db.get_all(limit=1000)
+    for low, high in [(9, None), (None, 9), (8.5, 12.3)]:
+        expected = [
+            d.id for d in dinosaurs
+            if d.length_meters is not None and (low is None or d.length_meters >= low)
+            and (high is None or d.length_meters <= high)
+        ]
+        assert [d.id for d in memory_db.get_all(limit=1000, min_length=low, max_length=high)] == expected
+    weights = [d.weight_kg for d in dinosaurs if d.weight_kg is not None]
+    stats = memory_db.get_numeric_stats()["weight_kg"]
+    assert stats["count"] == len(weights)
+    assert stats["mean"] == pytest.approx(statistics.fmean(weights))
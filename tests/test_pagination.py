@@ -0,0 +1,106 @@
+import base64
+import json
+
+import pytest
+
+from models import DinosaurDiet, DinosaurPeriod, DinosaurSortField
+from pagination import decode_cursor, encode_cursor
+from postgres_queries import needs_total_query
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def walk(db, sort, limit=3, **filters):
+    """Every row, following next_cursor from the first page"""
+    rows, cursor = [], None
+    while True:
+        page = db.get_page(limit=limit, sort=sort, cursor=cursor, **filters)
+        rows.extend(page.dinosaurs)
+        cursor = page.next_cursor
+        if cursor is None:
+            return rows, page.total
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(DinosaurSortField.NAME, "Triceratops", 2)
+    assert decode_cursor(cursor, DinosaurSortField.NAME) == ("Triceratops", 2)
+
+
+@pytest.mark.parametrize("payload, sort", [
+    (["name", None, 3], DinosaurSortField.NAME),
+    (["name", [1], 3], DinosaurSortField.NAME),
+    (["name", 7, 3], DinosaurSortField.NAME),
+    (["id", "7", 3], DinosaurSortField.ID),
+    (["id", 7, True], DinosaurSortField.ID),
+    (["name", "a", "3"], DinosaurSortField.NAME),
+    (["name", "a"], DinosaurSortField.NAME),
+    (["id", 1, -5], DinosaurSortField.ID),
+    (["id", -1, 3], DinosaurSortField.ID),
+    (["name", "a", -1], DinosaurSortField.NAME),
+    (["id", 2 ** 31, 2 ** 31], DinosaurSortField.ID),
+])
+def test_malformed_cursor_is_rejected(payload, sort):
+    with pytest.raises(ValueError):
+        decode_cursor(raw_cursor(payload), sort)
+
+
+def test_cursor_for_another_sort_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(DinosaurSortField.ID, 3, 3), DinosaurSortField.NAME)
+
+
+@pytest.mark.parametrize("payload", [["id", 1, -5], ["id", 2 ** 63, 2 ** 63], ["id", 1, "x"]])
+def test_invalid_cursor_is_a_400(api, payload):
+    response = api.get("/dinosaurs", params={"cursor": raw_cursor(payload)})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid pagination cursor"
+
+
+def test_not_base64_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor("!!!", DinosaurSortField.ID)
+
+
+@pytest.mark.parametrize("sort", list(DinosaurSortField))
+@pytest.mark.parametrize("filters", [{}, {"period": DinosaurPeriod.LATE_CRETACEOUS}, {"min_length": 10.0}])
+def test_cursor_walk_visits_every_match_once_in_order(memory_db, sort, filters):
+    expected = sorted(memory_db.get_all(limit=1000, **filters), key=lambda d: (getattr(d, sort.value), d.id))
+    rows, total = walk(memory_db, sort, **filters)
+    assert [d.id for d in rows] == [d.id for d in expected]
+    assert total == len(expected)
+
+
+def test_offset_pages_by_name(memory_db):
+    expected = sorted(memory_db.get_all(limit=1000), key=lambda d: (d.name, d.id))
+    page = memory_db.get_page(skip=2, limit=4, sort=DinosaurSortField.NAME)
+    assert [d.id for d in page.dinosaurs] == [d.id for d in expected[2:6]]
+    assert page.total == len(expected)
+
+
+def test_name_order_follows_renames(memory_db):
+    from models import DinosaurUpdate
+    memory_db.update(1, DinosaurUpdate(name="Aaaasaurus"))
+    page = memory_db.get_page(limit=1, sort=DinosaurSortField.NAME)
+    assert page.dinosaurs[0].id == 1
+
+
+@pytest.mark.parametrize("filters", [{}, {"diet": DinosaurDiet.HERBIVORE}, {"diet": DinosaurDiet.OMNIVORE}])
+def test_offset_pages_carry_the_exact_total(memory_db, filters):
+    matches = memory_db.get_all(limit=1000, **filters)
+    for skip in range(0, len(matches) + 6, 4):
+        page = memory_db.get_page(skip=skip, limit=4, **filters)
+        assert [d.id for d in page.dinosaurs] == [d.id for d in matches[skip:skip + 4]]
+        assert page.total == len(matches)
+        assert (page.next_cursor is not None) == (skip + 4 < len(matches))
+
+
+@pytest.mark.parametrize("rows, skip, cursor, expected", [
+    ([], 0, None, False),  # no matches at all: the total is 0
+    ([object()], 5, "c", False),  # rows carry the total
+    ([], 5, None, True),  # past the last page
+    ([], 0, "c", True),
+])
+def test_needs_total_query(rows, skip, cursor, expected):
+    assert needs_total_query(rows, skip, cursor) == expected
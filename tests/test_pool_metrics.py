@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool
+
+from pool_metrics import InstrumentedQueuePool, PoolMetrics, saturation
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=1, pool_timeout=0.05
+    )
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def metrics(engine):
+    metrics = PoolMetrics()
+    metrics.attach(engine.pool)
+    return metrics
+
+
+def test_counters_follow_checkouts(engine, metrics):
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    stats = metrics.snapshot(engine.pool)
+    assert stats["checkouts"] == stats["checkins"] == 3
+    assert stats["connections_opened"] == 1
+    assert stats["wait_max_ms"] >= stats["wait_avg_ms"] >= 0
+    assert (stats["size"], stats["max_overflow"], stats["checked_out"], stats["checked_in"]) == (2, 1, 0, 1)
+
+
+def test_saturation_and_timeouts(engine, metrics):
+    connections = [engine.connect() for _ in range(3)]
+    try:
+        assert saturation(engine.pool) == 1.0
+        stats = metrics.snapshot(engine.pool)
+        assert (stats["checked_out"], stats["overflow"], stats["saturation"]) == (3, 1, 1.0)
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        assert metrics.snapshot(engine.pool)["checkout_timeouts"] == 1
+    finally:
+        for connection in connections:
+            connection.close()
+    assert saturation(engine.pool) == 0.0
+
+
+def test_invalidation_and_close_are_counted(engine, metrics):
+    with engine.connect() as conn:
+        conn.invalidate()
+    engine.dispose()
+    stats = metrics.snapshot(engine.pool)
+    assert stats["invalidations"] == 1
+    assert stats["connections_closed"] >= 1
+
+
+def test_metrics_survive_pool_recreation(engine, metrics):
+    recreated = engine.pool.recreate()
+    assert recreated.metrics is metrics
+
+
+def test_no_saturation_without_a_fixed_capacity(tmp_path):
+    assert saturation(create_engine(f"sqlite:///{tmp_path / 'null.db'}", poolclass=NullPool).pool) is None
@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import asyncpg
+
+import postgres_queries as queries
+from models import DinosaurDiet, DinosaurSortField
+from pagination import encode_cursor
+from projection import parse_fields
+
+
+def compiled(stmt):
+    return stmt.compile(dialect=postgresql.dialect())
+
+
+@pytest.mark.parametrize("value, escaped", [
+    ("saurus", "saurus"),
+    ("_", "\\_"),
+    ("100%", "100\\%"),
+    ("a\\b", "a\\\\b"),
+    ("\\%", "\\\\\\%"),
+])
+def test_escape_like(value, escaped):
+    assert queries.escape_like(value) == escaped
+
+
+def test_substring_search_escapes_wildcards():
+    stmt = compiled(queries.substring_search_query("_"))
+    assert str(stmt).count("ESCAPE") == 3
+    assert set(stmt.params.values()) >= {"%\\_%"}
+
+
+def compiled_asyncpg(stmt):
+    # What the API's async engine sends: numbered $n parameters with casts
+    return stmt.compile(dialect=asyncpg.dialect())
+
+
+def test_page_query_with_an_id_cursor_seeks_past_it():
+    stmt = compiled_asyncpg(queries.page_query(
+        skip=20, limit=10, cursor=encode_cursor(DinosaurSortField.ID, 5, 5), diet=DinosaurDiet.CARNIVORE
+    ))
+    sql = str(stmt)
+    assert "dinosaurs.id > $3::INTEGER ORDER BY dinosaurs.id" in sql
+    # The total counts the filters only, not the keyset predicate
+    assert "(SELECT count(dinosaurs.id) AS count_1 \nFROM dinosaurs \nWHERE dinosaurs.diet = $1::dinosaur_diet) AS total" in sql
+    assert [stmt.params[name] for name in stmt.positiontup] == [DinosaurDiet.CARNIVORE, DinosaurDiet.CARNIVORE, 5, 11, 0]
+
+
+def test_page_query_with_a_name_cursor_and_projection():
+    fields = parse_fields("name,period")
+    stmt = compiled_asyncpg(queries.page_query(
+        limit=10, sort=DinosaurSortField.NAME, cursor=encode_cursor(DinosaurSortField.NAME, "T", 5), fields=fields
+    ))
+    sql = str(stmt)
+    assert sql.startswith("SELECT dinosaurs.name, dinosaurs.period, dinosaurs.id, (SELECT count")
+    assert "description" not in sql
+    assert "WHERE (dinosaurs.name, dinosaurs.id) > ($1::VARCHAR, $2::INTEGER) ORDER BY dinosaurs.name, dinosaurs.id" in sql
+    assert [stmt.params[name] for name in stmt.positiontup] == ["T", 5, 11, 0]
+
+
+def test_page_query_rejects_an_invalid_cursor():
+    with pytest.raises(ValueError):
+        queries.page_query(cursor="!!!")
+
+
+def test_export_query_is_unbounded_in_id_order():
+    sql = str(compiled_asyncpg(queries.export_query(diet=DinosaurDiet.CARNIVORE)))
+    assert sql.endswith("WHERE dinosaurs.diet = $1::dinosaur_diet ORDER BY dinosaurs.id")
+    assert "LIMIT" not in sql
+
+
+def test_by_ids_query_binds_one_array():
+    stmt = compiled_asyncpg(queries.by_ids_query([3, 1, 3]))
+    assert str(stmt).endswith("WHERE dinosaurs.id = ANY ($1::INTEGER[])")
+    assert stmt.params == {"ids": [3, 1, 3]}
+    # Same statement text whatever the number of IDs, so asyncpg reuses its prepared statement
+    assert str(compiled_asyncpg(queries.by_ids_query([1]))) == str(stmt)
+
+
+def test_search_query_ranks_and_limits():
+    stmt = compiled_asyncpg(queries.search_query("rex", parse_fields("name"), 5))
+    sql = str(stmt)
+    assert sql.startswith("SELECT dinosaurs.name, dinosaurs.id \nFROM dinosaurs")
+    assert "dinosaurs.search_vector @@ websearch_to_tsquery('english', $1::VARCHAR)" in sql
+    assert sql.endswith("ORDER BY ts_rank(dinosaurs.search_vector, websearch_to_tsquery('english', $1::VARCHAR)) DESC, dinosaurs.id \n LIMIT $2::INTEGER")
+    assert [stmt.params[name] for name in stmt.positiontup] == ["rex", 5]
+
+
+def test_contemporaries_query_pages():
+    stmt = compiled_asyncpg(queries.contemporaries_query(1, (68.0, 66.0), skip=10, limit=5))
+    assert str(stmt).endswith("ORDER BY dinosaurs.id \n LIMIT $4::INTEGER OFFSET $5::INTEGER")
+    assert queries.contemporaries_query(1, (None, None)) is None
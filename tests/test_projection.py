@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from models import DinosaurSortField
+from postgres_queries import page_query
+from projection import FIELDS, load_fields, parse_fields
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ("", None),
+    (" , ", None),
+    # Response order is the model's, where id comes last
+    ("name", ("name", "id")),
+    ("size,name,period", ("name", "period", "size", "id")),
+    (" name , name ,id", ("name", "id")),
+])
+def test_parse_fields(value, expected):
+    assert parse_fields(value) == expected
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(ValueError, match="Unknown fields: bogus, nope"):
+        parse_fields("name,nope,bogus")
+
+
+def test_load_fields_adds_the_sort_column():
+    assert load_fields(("id", "period")) == ("id", "period")
+    assert load_fields(("id", "period"), DinosaurSortField.NAME) == ("id", "period", "name")
+
+
+def test_page_query_selects_only_the_projection():
+    sql = str(page_query(fields=("id", "period")).compile(dialect=postgresql.dialect()))
+    select_list = sql.split(" FROM ")[0]
+    assert "dinosaurs.period" in select_list and "dinosaurs.id" in select_list
+    assert "dinosaurs.name" not in select_list and "dinosaurs.description" not in select_list
+
+
+def test_memory_pages_hold_only_the_fields(memory_db):
+    full = memory_db.get_page(limit=3)
+    page = memory_db.get_page(limit=3, fields=("id", "period", "special_features"))
+    assert page.total == full.total
+    assert page.next_cursor == full.next_cursor
+    assert page.dinosaurs == [
+        {"id": d.id, "period": d.period.value, "special_features": d.special_features} for d in full.dinosaurs
+    ]
+
+
+def test_dinosaurs_route(api):
+    body = api.get("/dinosaurs?fields=name,size&limit=2").json()
+    assert [set(d) for d in body["dinosaurs"]] == [{"id", "name", "size"}] * 2
+    assert body["total"] == 11
+
+
+def test_projected_cursor_walk_matches_the_full_one(api):
+    def walk(fields):
+        names, cursor = [], None
+        while True:
+            query = f"/dinosaurs?sort=name&limit=4{fields}" + (f"&cursor={cursor}" if cursor else "")
+            body = api.get(query).json()
+            names.extend(d["name"] for d in body["dinosaurs"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                return names
+    assert walk("&fields=name") == walk("")
+
+
+def test_search_route(api):
+    results = api.get("/dinosaurs/search/?q=raptor&fields=species").json()
+    assert results and all(set(result) == {"id", "species"} for result in results)
+
+
+@pytest.mark.parametrize("path", ["/dinosaurs?fields=weight", "/dinosaurs/search/?q=rex&fields=weight"])
+def test_unknown_field_is_a_400(api, path):
+    response = api.get(path)
+    assert response.status_code == 400
+    assert "weight" in response.json()["detail"]
+
+
+def test_every_field_can_be_requested(api):
+    body = api.get(f"/dinosaurs?fields={','.join(FIELDS)}&limit=1").json()
+    assert list(body["dinosaurs"][0]) == list(FIELDS)
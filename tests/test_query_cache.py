@@ -0,0 +1,137 @@
+import pytest
+
+import query_cache
+from models import DinosaurDiet, DinosaurUpdate
+from pagination import Page
+from query_cache import QueryCache, approximate_size, make_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_make_key_normalizes_arguments():
+    assert make_key("get_all", (), {"diet": DinosaurDiet.HERBIVORE}) == make_key("get_all", (), {"diet": "Herbivore"})
+    assert make_key("get_all", (), {"diet": None, "skip": 0}) == make_key("get_all", (), {"skip": 0})
+    assert make_key("get_many", ([1, 2],), {}) == make_key("get_many", ((1, 2),), {})
+    assert make_key("get_all", (), {"skip": 0}) != make_key("search", (), {"skip": 0})
+
+
+def test_lru_eviction():
+    cache = QueryCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == (True, 1)
+    cache.set("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire(clock):
+    cache = QueryCache(max_size=10, ttl=5)
+    cache.set("a", 1)
+    clock.now += 4.9
+    assert cache.get("a") == (True, 1)
+    clock.now += 0.2
+    assert cache.get("a") == (False, None)
+    assert cache.stats()["size"] == 0
+
+
+def test_new_version_drops_everything():
+    cache = QueryCache()
+    cache.validate(1)
+    cache.set("a", 1)
+    cache.validate(1)
+    assert cache.get("a") == (True, 1)
+    cache.validate(2)
+    assert cache.get("a") == (False, None)
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_byte_bound_evicts_least_recently_used():
+    size = approximate_size("x" * 100)
+    cache = QueryCache(max_size=10, max_bytes=2 * size)
+    cache.set("a", "a" * 100)
+    cache.set("b", "b" * 100)
+    assert cache.get("a")[0]
+    cache.set("c", "c" * 100)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a")[0] and cache.get("c")[0]
+    assert cache.stats()["bytes"] == 2 * size
+    cache.set("huge", "h" * 1000)
+    assert cache.get("huge") == (False, None)
+    assert cache.stats()["evictions"] == 1
+    cache.clear()
+    assert cache.stats()["bytes"] == 0
+
+
+def test_approximate_size_scales_with_the_result(memory_db):
+    one = approximate_size([memory_db.get_by_id(1)])
+    assert one > 1000
+    assert 90 * one < approximate_size([memory_db.get_by_id(1)] * 100) < 110 * one
+
+
+def test_cached_values_are_not_shared(memory_db):
+    cache = QueryCache()
+    dinosaur = memory_db.get_by_id(1)
+    stored = [dinosaur]
+    cache.set("list", stored)
+    cache.set("page", Page([{"id": 1, "synonyms": ["a"]}], 1, None))
+    stored.clear()
+    dinosaur.synonyms.append("changed")
+
+    _, value = cache.get("list")
+    assert [d.synonyms for d in value] == [memory_db.get_by_id(1).synonyms]
+    value[0].synonyms.append("changed")
+    value[0].name = "changed"
+    value.clear()
+    assert cache.get("list")[1] == [memory_db.get_by_id(1)]
+
+    _, page = cache.get("page")
+    assert isinstance(page, Page)
+    page.dinosaurs[0]["synonyms"].append("b")
+    assert cache.get("page")[1] == Page([{"id": 1, "synonyms": ["a"]}], 1, None)
+
+
+def test_database_results_can_be_modified_by_callers(memory_db):
+    memory_db.get_stats()["periods"].clear()
+    assert memory_db.get_stats()["periods"]
+    results = memory_db.search("tyrannosaurus")
+    results[0].name = "changed"
+    assert memory_db.search("tyrannosaurus")[0].name == "Tyrannosaurus Rex"
+
+
+def test_size_zero_disables_the_cache():
+    cache = QueryCache(max_size=0)
+    cache.set("a", 1)
+    assert cache.get("a") == (False, None)
+
+
+def test_database_queries_are_cached_until_a_write(memory_db):
+    first = memory_db.get_all(limit=5, diet=DinosaurDiet.HERBIVORE)
+    assert memory_db.get_all(limit=5, diet="Herbivore") == first
+    assert memory_db.cache.stats()["hits"] == 1
+
+    memory_db.update(first[0].id, DinosaurUpdate(diet=DinosaurDiet.OMNIVORE))
+    refreshed = memory_db.get_all(limit=5, diet=DinosaurDiet.HERBIVORE)
+    assert first[0].id not in [d.id for d in refreshed]
+    assert memory_db.cache.stats()["invalidations"] == 1
+
+
+def test_stats_are_never_stale(memory_db, make_dinosaur):
+    before = memory_db.get_stats()["total_dinosaurs"]
+    memory_db.create(make_dinosaur())
+    assert memory_db.get_stats()["total_dinosaurs"] == before + 1
@@ -0,0 +1,59 @@
+import pytest
+
+from models import Dinosaur
+from record_store import DinosaurRecord, RecordStore
+
+
+@pytest.fixture
+def dinosaurs(memory_db, make_dinosaur):
+    for overrides in ({}, {"fossil_quality": None, "special_features": None, "synonyms": ["Alias"]}):
+        memory_db.create(make_dinosaur(**overrides))
+    return [record.to_model() for record in memory_db.records]
+
+
+def test_round_trip_keeps_every_value(dinosaurs):
+    for dinosaur in dinosaurs:
+        restored = DinosaurRecord.from_model(dinosaur).to_model()
+        assert restored == dinosaur
+        assert restored.model_dump(mode="json") == dinosaur.model_dump(mode="json")
+
+
+def test_records_are_compact(dinosaurs):
+    # Equal strings built separately, as when decoded from different requests
+    copies = [dinosaur.model_copy(update={"location_found": "".join(["Hell Creek", f", {part}"])})
+              for dinosaur, part in zip(dinosaurs[:2], ["USA", "USA"])]
+    assert copies[0].location_found is not copies[1].location_found
+    first, second = (DinosaurRecord.from_model(dinosaur) for dinosaur in copies)
+    assert not hasattr(first, "__dict__")
+    assert isinstance(first.period, int)
+    assert isinstance(first.special_features, tuple)
+    # Shared strings are stored once
+    assert first.location_found is second.location_found
+
+
+def test_project_returns_json_values(dinosaurs):
+    dinosaur = dinosaurs[0]
+    values = DinosaurRecord.from_model(dinosaur).project(("id", "period", "special_features", "fossil_quality"))
+    assert values == {key: dinosaur.model_dump(mode="json")[key] for key in values}
+    assert list(values) == ["id", "period", "special_features", "fossil_quality"]
+
+
+def test_store_operations(dinosaurs):
+    store = RecordStore()
+    for dinosaur in dinosaurs:
+        store.put(dinosaur)
+    first = dinosaurs[0]
+    assert len(store) == len(dinosaurs)
+    assert first.id in store
+    assert store.get(first.id) == first
+    assert store.get(10**6) is None
+    assert [record.id for record in store] == [dinosaur.id for dinosaur in dinosaurs]
+    assert store.materialize(store.records([first.id])) == [first]
+    assert store.project(store.records([first.id]), ("id", "name")) == [{"id": first.id, "name": first.name}]
+
+    renamed = Dinosaur(**{**first.model_dump(), "name": "Renamed"})
+    store.put(renamed)
+    assert store.get(first.id).name == "Renamed"
+    assert store.pop(first.id) == renamed
+    assert store.pop(first.id) is None
+    assert first.id not in store
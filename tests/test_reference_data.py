@@ -0,0 +1,58 @@
+import json
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+import main
+from reference_data import REFERENCE, REFERENCE_ENUMS, REFERENCE_MAX_AGE
+
+ROUTES = {
+    "/periods": "periods",
+    "/clades": "clades",
+    "/groups": "groups",
+    "/diets": "diets",
+    "/sizes": "sizes",
+    "/locomotion": "locomotion",
+    "/habitats": "habitats",
+}
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("path, name", ROUTES.items())
+def test_lists_hold_the_enum_values(client, path, name):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.json() == [member.value for member in REFERENCE_ENUMS[name]]
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["cache-control"] == f"public, max-age={REFERENCE_MAX_AGE}"
+    assert response.headers["etag"].removeprefix("W/") == REFERENCE[name].etag
+
+
+def test_reference_combines_every_list(client):
+    assert client.get("/reference").json() == {
+        name: [member.value for member in enum] for name, enum in REFERENCE_ENUMS.items()
+    }
+
+
+@pytest.mark.parametrize("name", REFERENCE)
+def test_bodies_match_the_default_encoder(name):
+    assert JSONResponse(json.loads(REFERENCE[name].body)).body == REFERENCE[name].body
+
+
+def test_etags_differ_per_payload():
+    assert len({payload.etag for payload in REFERENCE.values()}) == len(REFERENCE)
+
+
+@pytest.mark.parametrize("accept_encoding", ["identity", "gzip"])
+def test_revalidation(client, accept_encoding):
+    etag = client.get("/periods", headers={"Accept-Encoding": accept_encoding}).headers["etag"]
+    response = client.get("/periods", headers={"Accept-Encoding": accept_encoding, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+    assert client.get("/periods", headers={"If-None-Match": '"other"'}).status_code == 200
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import DBAPIError, ProgrammingError
+
+from replicas import ReplicaRouter
+
+
+class FakeSession:
+    def __init__(self, name):
+        self.name = name
+        self.info = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeReplica:
+    """What the router uses of a Replica, without an engine"""
+
+    def __init__(self, name, healthy=True, in_use=0):
+        self.name = name
+        self.healthy = healthy
+        self.error = None
+        self.sessions = 0
+        self._in_use = in_use
+
+    def session_factory(self):
+        return FakeSession(self.name)
+
+    def in_use(self):
+        return self._in_use
+
+    def mark_down(self, error):
+        self.healthy = False
+        self.error = error
+
+
+def router(*replicas, strategy="round_robin"):
+    return ReplicaRouter(lambda: FakeSession("primary"), list(replicas), strategy)
+
+
+def disconnect():
+    return DBAPIError("SELECT 1", {}, ConnectionResetError("connection lost"), connection_invalidated=True)
+
+
+def test_round_robin_skips_unhealthy_replicas():
+    a, b, c = FakeReplica("a"), FakeReplica("b", healthy=False), FakeReplica("c")
+    spread = router(a, b, c)
+    chosen = [spread.choose().name for _ in range(4)]
+    assert chosen == ["a", "c", "a", "c"]
+
+
+def test_least_connections_prefers_the_idlest_replica():
+    busy, idle = FakeReplica("busy", in_use=3), FakeReplica("idle", in_use=1)
+    spread = router(busy, idle, strategy="least_connections")
+    assert {spread.choose().name for _ in range(4)} == {"idle"}
+
+
+def test_primary_when_no_replica_is_healthy():
+    spread = router(FakeReplica("a", healthy=False))
+    session = spread.read_session()
+    assert session.name == "primary"
+    assert "replica" not in session.info
+    assert spread.primary_sessions == 1
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        router(strategy="random")
+
+
+def test_read_session_is_tagged_with_its_replica():
+    replica = FakeReplica("a")
+    session = router(replica).read_session()
+    assert session.info["replica"] is replica
+    assert replica.sessions == 1
+
+
+@pytest.mark.parametrize("error", [disconnect(), ConnectionRefusedError(111, "refused")])
+def test_lost_replica_is_taken_out_and_the_read_retried_on_the_primary(error):
+    replica = FakeReplica("a")
+    spread = router(replica)
+    sessions = []
+
+    async def work(session):
+        sessions.append(session.name)
+        if session.name == "a":
+            raise error
+        return "rows"
+
+    assert asyncio.run(spread.run(work)) == "rows"
+    assert sessions == ["a", "primary"]
+    assert not replica.healthy and replica.error
+
+
+def test_query_errors_are_not_retried():
+    replica = FakeReplica("a")
+    spread = router(replica)
+    calls = []
+
+    async def work(session):
+        calls.append(session.name)
+        raise ProgrammingError("SELECT nope", {}, Exception("column does not exist"))
+
+    with pytest.raises(ProgrammingError):
+        asyncio.run(spread.run(work))
+    assert calls == ["a"]
+    assert replica.healthy
+
+
+def test_primary_failures_are_not_retried():
+    spread = router()
+    calls = []
+
+    async def work(session):
+        calls.append(session.name)
+        raise disconnect()
+
+    with pytest.raises(DBAPIError):
+        asyncio.run(spread.run(work))
+    assert calls == ["primary"]
@@ -0,0 +1,88 @@
+import random
+from collections import Counter
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from models import DinosaurSize, DinosaurUpdate
+from postgres_queries import build_stats
+from running_stats import RunningStats
+
+
+def recomputed(db):
+    """get_stats computed from scratch, the way the original per-request aggregation did"""
+    dinosaurs = [record.to_model() for record in db.records]
+    lengths = [d.length_meters for d in dinosaurs if d.length_meters is not None]
+    weights = [d.weight_kg for d in dinosaurs if d.weight_kg is not None]
+    return {
+        "total_dinosaurs": len(dinosaurs),
+        "periods": dict(Counter(d.period.value for d in dinosaurs)),
+        "diets": dict(Counter(d.diet.value for d in dinosaurs)),
+        "sizes": dict(Counter(d.size.value for d in dinosaurs)),
+        "average_length": sum(lengths) / len(lengths) if lengths else 0,
+        "average_weight": sum(weights) / len(weights) if weights else 0,
+    }
+
+
+def assert_same_stats(actual, expected):
+    assert {key: value for key, value in actual.items() if not key.startswith("average")} == {
+        key: value for key, value in expected.items() if not key.startswith("average")
+    }
+    assert actual["average_length"] == pytest.approx(expected["average_length"])
+    assert actual["average_weight"] == pytest.approx(expected["average_weight"])
+
+
+def test_stats_follow_every_write(memory_db, make_dinosaur):
+    rng = random.Random(11)
+    assert_same_stats(memory_db.get_stats(), recomputed(memory_db))
+    for _ in range(60):
+        ids = [record.id for record in memory_db.records]
+        action = rng.random()
+        if action < 0.5 or not ids:
+            memory_db.create(make_dinosaur(weight_kg=rng.choice([None, 120.5])))
+        elif action < 0.8:
+            memory_db.update(rng.choice(ids), DinosaurUpdate(
+                size=rng.choice(list(DinosaurSize)), length_meters=rng.uniform(1, 30)
+            ))
+        else:
+            memory_db.delete(rng.choice(ids))
+        assert_same_stats(memory_db.get_stats(), recomputed(memory_db))
+
+
+def test_removing_everything_returns_to_zero(memory_db):
+    for record in list(memory_db.records):
+        memory_db.delete(record.id)
+    assert memory_db.get_stats() == {
+        "total_dinosaurs": 0, "periods": {}, "diets": {}, "sizes": {}, "average_length": 0, "average_weight": 0
+    }
+
+
+def test_means_do_not_drift():
+    stats = RunningStats(("kind",), ("value",))
+    base = SimpleNamespace(kind="a", value=0.1)
+    stats.add(base)
+    for value in (0.2, 0.3, 1e16, 1e-9):
+        record = SimpleNamespace(kind="b", value=value)
+        stats.add(record)
+        stats.remove(record)
+    assert stats.mean("value") == 0.1
+    assert stats.counts("kind") == {"a": 1}
+
+
+def test_build_stats_from_summary_rows():
+    rows = [
+        SimpleNamespace(dimension="total", value="", dinosaurs=3, length_sum=Decimal("30"), length_count=2,
+                        weight_sum=Decimal("0"), weight_count=0),
+        SimpleNamespace(dimension="period", value="Late Jurassic", dinosaurs=3),
+        SimpleNamespace(dimension="diet", value="Herbivore", dinosaurs=2),
+        SimpleNamespace(dimension="diet", value="Carnivore", dinosaurs=1),
+    ]
+    assert build_stats(rows) == {
+        "total_dinosaurs": 3,
+        "periods": {"Late Jurassic": 3},
+        "diets": {"Herbivore": 2, "Carnivore": 1},
+        "sizes": {},
+        "average_length": 15.0,
+        "average_weight": 0,
+    }
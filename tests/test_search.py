@@ -0,0 +1,133 @@
+import pytest
+
+from models import DinosaurCreate, DinosaurUpdate
+from search_index import SUBSTRING_FIELDS, InvertedIndex, TrigramIndex, similarity, tokenize
+
+
+def names(results):
+    return [dinosaur.name for dinosaur in results]
+
+
+def test_tokenize():
+    assert tokenize("T-Rex, King of the tyrant lizards!") == ["t", "rex", "king", "of", "the", "tyrant", "lizards"]
+
+
+def test_every_token_has_to_match():
+    index = InvertedIndex()
+    index.add(1, {"name": ["Tyrannosaurus Rex"], "description": ["large predator"]})
+    index.add(2, {"name": ["Triceratops"], "description": ["large herbivore"]})
+    assert {doc_id for doc_id, _ in index.search("large")} == {1, 2}
+    assert [doc_id for doc_id, _ in index.search("large predator")] == [1]
+
+
+def test_name_outranks_description():
+    index = InvertedIndex()
+    index.add(1, {"name": ["Raptor"], "description": ["fast"]})
+    index.add(2, {"name": ["Other"], "description": ["not a raptor at all, but fast"]})
+    assert [doc_id for doc_id, _ in index.search("raptor")] == [1, 2]
+
+
+def test_prefix_matching():
+    index = InvertedIndex()
+    index.add(1, {"name": ["Velociraptor"]})
+    assert index.search("veloc")
+    assert index.search("elociraptor") == []
+
+
+def test_removed_documents_stop_matching():
+    index = InvertedIndex()
+    index.add(1, {"name": ["Velociraptor"]})
+    index.search("velociraptor")
+    index.remove(1)
+    assert index.search("velociraptor") == []
+
+
+def test_similarity():
+    assert similarity("word", "word") == 1.0
+    assert similarity("word", "") == 0.0
+    assert similarity("Stegosaurus", "saurus") > similarity("Tyrannosaurus Rex", "saurus")
+
+
+def test_search_by_name_and_synonym(memory_db):
+    assert "Tyrannosaurus Rex" in names(memory_db.search("tyrannosaurus"))
+    assert names(memory_db.search("king of the tyrant lizards"))[0] == "Tyrannosaurus Rex"
+
+
+def test_substring_fallback_when_no_token_matches(memory_db):
+    results = memory_db.search("saurus")
+    assert results
+    for dinosaur in results:
+        assert any("saurus" in getattr(dinosaur, field).lower() for field in SUBSTRING_FIELDS)
+    assert names(memory_db.search("SAURUS")) == names(results)
+
+
+@pytest.mark.parametrize("query", ["_", "%", "\\", "zzzz"])
+def test_substring_fallback_is_literal(memory_db, query):
+    assert memory_db.search(query) == []
+
+
+def test_search_sees_writes(memory_db):
+    created = memory_db.create(DinosaurCreate(**{
+        **memory_db.get_by_id(1).model_dump(exclude={"id"}), "name": "Quuxodon", "synonyms": []
+    }))
+    assert names(memory_db.search("quuxodon")) == ["Quuxodon"]
+    memory_db.update(created.id, DinosaurUpdate(name="Zorbodon"))
+    assert memory_db.search("quuxodon") == []
+    memory_db.delete(created.id)
+    assert memory_db.search("zorbodon") == []
+
+
+def test_search_projection(memory_db):
+    results = memory_db.search("saurus", fields=("id", "name"))
+    assert results and all(set(result) == {"id", "name"} for result in results)
+
+
+def test_trigram_candidates_cover_every_substring_match():
+    index = TrigramIndex(SUBSTRING_FIELDS)
+    values = {
+        1: {"name": "Stegosaurus", "species": "Stegosaurus stenops", "genus": "Stegosaurus"},
+        2: {"name": "Tyrannosaurus Rex", "species": "Tyrannosaurus rex", "genus": None},
+        3: {"name": "Triceratops", "species": "Triceratops horridus", "genus": "Triceratops"},
+    }
+    for doc_id, fields in values.items():
+        index.add(doc_id, fields)
+    for needle in ["saurus", "us re", "s r", "ra", "x", "cera", "osaurus ste", "zzz"]:
+        matches = {doc_id for doc_id, fields in values.items()
+                   if any(value and needle in value.lower() for value in fields.values())}
+        assert matches <= index.candidates(needle)
+    assert index.candidates("zzz") == set()
+    assert index.candidates("_") is None
+
+
+def test_trigram_similarities_match_similarity():
+    index = TrigramIndex(SUBSTRING_FIELDS)
+    index.add(1, {"name": "Stegosaurus", "species": "Stegosaurus stenops", "genus": ""})
+    index.add(2, {"name": "Tyrannosaurus Rex", "species": None, "genus": "Tyrannosaurus"})
+    scores = index.similarities([1, 2], "saurus")
+    assert scores[1] == similarity("Stegosaurus", "saurus")
+    assert scores[2] == max(similarity("Tyrannosaurus Rex", "saurus"), similarity("Tyrannosaurus", "saurus"))
+
+
+def test_trigram_remove():
+    index = TrigramIndex(SUBSTRING_FIELDS)
+    fields = {"name": "Stegosaurus", "species": None, "genus": None}
+    index.add(1, fields)
+    index.remove(1, fields)
+    assert index.candidates("saurus") == set()
+    assert len(index) == 0
+
+
+def test_search_limit(memory_db):
+    for query in ["saurus", "dinosaur"]:
+        everything = memory_db.search(query, limit=1000)
+        assert len(everything) > 2
+        assert memory_db.search(query, limit=2) == everything[:2]
+
+
+def test_substring_fallback_matches_a_full_scan(memory_db):
+    expected = sorted(
+        (dinosaur for dinosaur in memory_db.export()
+         if any("aurus" in (getattr(dinosaur, field) or "").lower() for field in SUBSTRING_FIELDS)),
+        key=lambda dinosaur: (-max(similarity(getattr(dinosaur, field) or "", "aurus") for field in SUBSTRING_FIELDS), dinosaur.id)
+    )
+    assert memory_db.search("aurus", limit=1000) == expected
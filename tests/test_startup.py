@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_import_creates_no_engine():
+    # A fresh interpreter, since other tests may have created engines in this one
+    script = (
+        "import sys, main, db_config\n"
+        "assert not db_config._ENGINES, db_config._ENGINES\n"
+        "assert not {'psycopg2', 'asyncpg'} & set(sys.modules)\n"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=os.path.dirname(main.__file__))
+
+
+def test_unknown_init_mode_is_rejected():
+    with pytest.raises(ValueError, match="Unknown init mode"):
+        asyncio.run(main.db.initialize("bogus"))
+
+
+def test_skip_touches_nothing():
+    assert asyncio.run(main.db.initialize("skip")) == {}
+
+
+class Router:
+    def __init__(self):
+        self.checks = 0
+        self.monitoring = False
+
+    async def check(self):
+        self.checks += 1
+
+    async def monitor(self, interval):
+        self.monitoring = True
+        await asyncio.sleep(3600)
+
+
+def test_lifespan_records_and_logs_the_phases(monkeypatch, caplog):
+    router = Router()
+    calls = []
+
+    async def initialize(mode):
+        calls.append(("initialize", mode))
+        return {"migrate": 0.25}
+
+    async def warm_up(connections):
+        calls.append(("warm_up", connections))
+        return 3
+
+    monkeypatch.setattr(main.db, "initialize", initialize)
+    monkeypatch.setattr(main.db, "warm_up", warm_up)
+    monkeypatch.setattr(main, "get_read_router", lambda: router)
+    monkeypatch.setattr(main, "STARTUP", {})
+    with caplog.at_level(logging.INFO, logger="uvicorn.error"):
+        with TestClient(main.app) as client:
+            startup = client.get("/metrics/startup").json()
+    assert calls == [("initialize", main.DB_INIT_MODE), ("warm_up", main.DB_POOL_WARMUP)]
+    assert router.checks == 1 and router.monitoring
+    assert startup["mode"] == main.DB_INIT_MODE
+    assert startup["connections_warmed"] == 3
+    assert set(startup["seconds"]) == {"import", "migrate", "replica_check", "warm_up", "startup"}
+    assert startup["seconds"]["migrate"] == 0.25
+    assert any(record.getMessage().startswith(f"Startup ({main.DB_INIT_MODE}): import ") for record in caplog.records)